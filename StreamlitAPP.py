@@ -6,20 +6,27 @@ import streamlit as st
 import traceback
 from dotenv import load_dotenv
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from mcqgenerator.utils import read_file, get_table_data
-from mcqgenerator.mcqgenerator import generate_evaluate_chain, RESPONSE_JSON
-from mcqgenerator.logger import logging
+from mcqgenerator.utils import MCQStreamParser
+from mcqgenerator.quiz_table import QuizTable, quiz_table
+from mcqgenerator.mcqgenerator import load_response_json, get_job_queue, get_extraction_cache, TEMPLATE
+from mcqgenerator.extraction_cache import data_digest
+from mcqgenerator.jobs import ACTIVE_STATUSES
+from mcqgenerator.question_bank import document_hash
+from mcqgenerator.prompting import build_quiz_inputs
+from mcqgenerator.pdf_export import create_pdf
+from mcqgenerator.exporters import EXPORT_FORMATS, export_file
+from mcqgenerator.logger import logging, configure_logging
+from mcqgenerator.metrics import get_metrics, serve_metrics, track_run
+
+configure_logging()
+
+# Prometheus-style metrics at http://127.0.0.1:$MCQGEN_METRICS_PORT/metrics
+if os.getenv("MCQGEN_METRICS_PORT"):
+    serve_metrics()
 
 # Load environment variables
 load_dotenv()
@@ -255,90 +262,20 @@ st.markdown("<h1>📝 MCQ Generator AI</h1>", unsafe_allow_html=True)
 st.markdown("<p style='text-align: center; color: white; font-size: 1.2rem; margin-top: -1rem; margin-bottom: 2rem; text-shadow: 1px 1px 2px rgba(0,0,0,0.2);'>Powered by LangChain & GroqAI 🤖</p>", unsafe_allow_html=True)
 
 
-# Function to create PDF
-def create_pdf(df, review, subject, mcq_count, tone):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
-                           topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#764ba2'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=12,
-        alignment=TA_LEFT
-    )
-    
-    # Add title
-    title = Paragraph(f"<b>{subject} - Multiple Choice Questions</b>", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Add metadata
-    meta_data = f"""
-    <b>Generated on:</b> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}<br/>
-    <b>Number of Questions:</b> {mcq_count}<br/>
-    <b>Difficulty Level:</b> {tone}<br/>
-    """
-    elements.append(Paragraph(meta_data, normal_style))
-    elements.append(Spacer(1, 20))
-    
-    # Add questions
-    for idx, row in df.iterrows():
-        # Question number and text
-        q_text = f"<b>Question {idx}:</b> {row['MCQ']}"
-        elements.append(Paragraph(q_text, heading_style))
-        elements.append(Spacer(1, 6))
-        
-        # Choices
-        choices = row['Choices'].replace('||', '<br/>')
-        elements.append(Paragraph(choices, normal_style))
-        elements.append(Spacer(1, 6))
-        
-        # Correct Answer
-        correct = f"<b>Correct Answer:</b> <font color='green'>{row['Correct']}</font>"
-        elements.append(Paragraph(correct, normal_style))
-        elements.append(Spacer(1, 20))
-    
-    # Add page break before review
-    elements.append(PageBreak())
-    
-    # Add review section
-    elements.append(Paragraph("<b>AI Review & Analysis</b>", title_style))
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph(review, normal_style))
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+# Review modes offered in the form, mapped to generate_quiz modes
+REVIEW_MODES = {
+    "Standard (quiz, then review)": "standard",
+    "Fused (one AI call)": "fused",
+    "Skip review (fastest)": "skip",
+    "Review in background": "deferred",
+}
+
+# How the model returns the quiz, mapped to generate_quiz outputs
+OUTPUT_MODES = {
+    "Free text": "text",
+    "JSON mode": "json_mode",
+    "Tool calling": "function_calling",
+}
 
 with st.form("user input"):
     col1, col2 = st.columns(2)
@@ -350,6 +287,11 @@ with st.form("user input"):
     with col2:
         mcq_count = st.number_input("🔢 Number of MCQs", min_value=5, max_value=50, value=10)
         tone = st.text_input("🎯 Complexity Level", max_chars=20, placeholder="Easy, Medium, or Hard", value="Medium")
+        review_mode = st.selectbox("🧪 Review Mode", list(REVIEW_MODES), index=0)
+        output_mode = st.selectbox("🧩 Response Format", list(OUTPUT_MODES), index=0)
+        bypass_cache = st.checkbox("🔄 Bypass cache (always call the AI)", value=False)
+        use_bank = st.checkbox("📚 Reuse questions from the question bank", value=False)
+        incremental = st.checkbox("♻️ Only regenerate what changed since this file's last version", value=False)
 
     st.markdown("<br>", unsafe_allow_html=True)
     button = st.form_submit_button("✨ Generate MCQs")
@@ -357,67 +299,190 @@ with st.form("user input"):
 # Store generated data in session state
 if 'generated_df' not in st.session_state:
     st.session_state.generated_df = None
+if 'generated_table' not in st.session_state:
+    st.session_state.generated_table = None
 if 'generated_review' not in st.session_state:
     st.session_state.generated_review = None
 if 'generation_params' not in st.session_state:
     st.session_state.generation_params = {}
+if 'generation_metrics' not in st.session_state:
+    st.session_state.generation_metrics = None
+if 'metrics_run' not in st.session_state:
+    st.session_state.metrics_run = None
+# Background jobs submitted in this session (newest first) and the one being shown
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+if 'current_job' not in st.session_state:
+    st.session_state.current_job = None
+if 'loaded_job' not in st.session_state:
+    st.session_state.loaded_job = None
+
+job_queue = get_job_queue()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def extract_upload(digest, name, _data):
+    # Keyed by the file digest only; misses fall through to the on-disk cache shared with the CLI
+    return get_extraction_cache().get_or_extract(name, _data, digest=digest)
+
 
 if button and uploaded_file is not None and mcq_count and subject and tone:
-    with st.spinner("🎨 Generating MCQs with AI magic..."):
-        try:
-            # Read and extract text from the uploaded file
-            text = read_file(uploaded_file)
-
-            # Generate MCQs using the chain (Groq doesn't have token callbacks like OpenAI)
-            response = generate_evaluate_chain.invoke(
-                {
-                "text": text,
-                "number": mcq_count,
-                "subject": subject,
-                "tone": tone,
-                "RESPONSE_JSON": json.dumps(RESPONSE_JSON)}
-            )
+    try:
+        # Extract the uploaded file's text, reusing earlier extractions of the same bytes
+        data = uploaded_file.getvalue()
+        extraction = extract_upload(data_digest(data), uploaded_file.name, data)
+        text = extraction.text
+
+        # Compact schema example and boilerplate-free text keep the prompt small
+        inputs = build_quiz_inputs(text, mcq_count, subject, tone, load_response_json(), TEMPLATE,
+                                   page_offsets=extraction.page_offsets)
+
+        # Generation runs in a background worker, so this rerun returns right away.
+        # Submitting the same request again while it runs joins the existing job.
+        job_id = job_queue.submit(
+            inputs,
+            mode=REVIEW_MODES[review_mode],
+            bypass_cache=bypass_cache,
+            use_bank=use_bank,
+            output=OUTPUT_MODES[output_mode],
+            source_hash=document_hash(text),
+            document=uploaded_file.name if incremental else None,
+            metadata={'subject': subject, 'mcq_count': mcq_count, 'tone': tone, 'file_name': uploaded_file.name}
+        )
+
+    except Exception as e:
+        traceback.print_exception(type(e), e, e.__traceback__)
+        st.error(f"❌ Error: {e}")
+
+    else:
+        if job_id not in st.session_state.jobs:
+            st.session_state.jobs.insert(0, job_id)
+        st.session_state.current_job = job_id
+        st.toast("🚀 Job queued. You can submit more documents while it runs.")
+
+
+def export_bytes(table, fmt, options):
+    """A quiz export for st.download_button, written when the button is clicked"""
+    with export_file(table, fmt, **options) as f:
+        return f.read()
 
-        except Exception as e:
-            traceback.print_exception(type(e), e, e.__traceback__)
-            st.error(f"❌ Error: {e}")
-
-        else:
-            if isinstance(response, dict):
-                #Extract the quiz from the response dictionary
-                quiz = response.get("quiz", None)
-                if quiz is not None:
-                    table_data = get_table_data(quiz)
-                    if table_data is not None:
-                        df = pd.DataFrame(table_data)
-                        df.index = df.index + 1  # Start index from 1
-                        
-                        # Store in session state
-                        st.session_state.generated_df = df
-                        st.session_state.generated_review = response.get("review", "")
-                        st.session_state.generation_params = {
-                            'subject': subject,
-                            'mcq_count': mcq_count,
-                            'tone': tone
-                        }
-                        
-                        st.markdown("<div class='success-box'>✅ MCQs Generated Successfully!</div>", unsafe_allow_html=True)
-                        st.balloons()
-                        
-                        # Display the table
-                        st.subheader("📋 Generated Questions")
-                        st.dataframe(df, use_container_width=True)
-
-                        # Display the review
-                        st.subheader("🔍 AI Review & Analysis")
-                        st.text_area(label="", value=response.get("review", ""), height=200, label_visibility="collapsed")
-                        
-                    else:
-                        st.error("❌ Error in the table data.")
-                else:
-                    st.error("❌ No quiz generated.")
-            else:
-                st.write(response)
+
+def load_job(job):
+    """Show a finished job's quiz, review and metrics"""
+    result = job["result"]
+    try:
+        table = quiz_table(result["quiz"])
+        df = table.to_dataframe()
+    except Exception:
+        st.error("❌ Error in the table data.")
+        return
+    df.index = df.index + 1  # Start index from 1
+
+    st.session_state.generated_df = df
+    st.session_state.generated_table = table
+    st.session_state.generated_review = result.get("review")
+    st.session_state.generation_metrics = {**result.get("metrics", {}),
+                                           'validation': result.get("validation"), 'bank': result.get("bank"),
+                                           'structured': result.get("structured"), 'hedge': result.get("hedge"),
+                                           'incremental': result.get("incremental")}
+    st.session_state.metrics_run = result.get("metrics", {}).get("run_id")
+    st.session_state.generation_params = {
+        'subject': job["metadata"]['subject'],
+        'mcq_count': job["metadata"]['mcq_count'],
+        'tone': job["metadata"]['tone'],
+        'generated_on': datetime.fromtimestamp(job["finished"])
+    }
+    st.session_state.loaded_job = (job["id"], result.get("review") is not None)
+
+
+def job_pending(job):
+    # Still running, or finished in deferred mode with the review not in yet (the queue gives
+    # up on reviews whose process is gone, so this can't poll forever)
+    return job["status"] in ACTIVE_STATUSES or job["review_pending"]
+
+
+def show_jobs():
+    """Job list and the current job's live progress, polled while anything is pending"""
+    jobs = [job for job in map(job_queue.get, st.session_state.jobs) if job is not None]
+    current = next((job for job in jobs if job["id"] == st.session_state.current_job), None)
+
+    if current is not None and current["status"] in ACTIVE_STATUSES:
+        st.info(f"🎨 Generating MCQs for {current['metadata'].get('file_name', 'your document')} ({current['status']})...")
+        # Show each question of the streamed response as soon as it is complete
+        parser = MCQStreamParser()
+        live_table = QuizTable.from_mcqs(mcq for _, mcq in parser.feed(current["partial"]))
+        if len(live_table):
+            live_df = live_table.to_dataframe()
+            live_df.index = live_df.index + 1
+            st.dataframe(live_df, use_container_width=True)
+    elif current is not None and current["status"] == "failed":
+        st.error(f"❌ Error: {current['error']}")
+    elif current is not None and current["status"] == "done":
+        loaded = (current["id"], current["result"]["review"] is not None)
+        if st.session_state.loaded_job != loaded:
+            first_load = st.session_state.loaded_job is None or st.session_state.loaded_job[0] != current["id"]
+            load_job(current)
+            if first_load:
+                st.balloons()
+            st.rerun()
+
+    if len(jobs) > 1:
+        with st.expander(f"🗂️ Your jobs ({len(jobs)})"):
+            for job in jobs:
+                col_name, col_status, col_show = st.columns([3, 1, 1])
+                col_name.write(f"{job['metadata'].get('file_name', job['id'])} · {job['metadata'].get('subject', '')}")
+                col_status.write(job["status"])
+                if job["status"] == "done" and job["id"] != st.session_state.current_job:
+                    if col_show.button("Show", key=f"show_{job['id']}"):
+                        st.session_state.current_job = job["id"]
+                        st.rerun()
+
+
+polling = any(job_pending(job) for job in map(job_queue.get, st.session_state.jobs) if job is not None)
+st.fragment(run_every=1.0 if polling else None)(show_jobs)()
+
+# Display the generated questions of the current job
+if st.session_state.generated_df is not None:
+    st.markdown("<div class='success-box'>✅ MCQs Generated Successfully!</div>", unsafe_allow_html=True)
+    st.subheader("📋 Generated Questions")
+    st.dataframe(st.session_state.generated_df, use_container_width=True)
+
+    metrics = st.session_state.generation_metrics or {}
+    st.caption(
+        f"⏱️ {metrics.get('latency_s', 0):.1f}s · {metrics.get('llm_calls', 0)} AI call(s) · "
+        f"~{metrics.get('prompt_tokens', 0)} prompt / ~{metrics.get('completion_tokens', 0)} completion tokens "
+        f"({metrics.get('mode', '')} mode)"
+    )
+    structured = metrics.get("structured")
+    if structured and structured["schema_failures"]:
+        st.caption(f"🧩 {structured['invalid_mcqs']} MCQ(s) failed the schema and were regenerated "
+                   f"({structured['attempts']} structured-output call(s))")
+    hedge = metrics.get("hedge")
+    if hedge and hedge["candidates"] > 1:
+        st.caption(f"⚡ {hedge['candidates']} generations raced, the first valid one was kept "
+                   f"({hedge['cancelled']} cancelled)")
+    incremental_stats = metrics.get("incremental")
+    if incremental_stats and incremental_stats["previous"]:
+        st.caption(f"♻️ {incremental_stats['kept']} question(s) kept from the previous version, "
+                   f"{incremental_stats['generated']} generated for {incremental_stats['changed_sections']} "
+                   f"changed section(s)")
+    bank_stats = metrics.get("bank")
+    if bank_stats and bank_stats["served"]:
+        st.caption(f"📚 {bank_stats['served']} question(s) served from the question bank")
+    validation = metrics.get("validation")
+    if validation and validation["rejected"]:
+        st.caption(
+            f"🧹 {validation['rejected']} malformed or duplicate question(s) rejected, "
+            f"{validation['regenerated']} regenerated"
+        )
+
+# Display the review (a deferred review shows up once the background task finishes)
+if st.session_state.generated_df is not None:
+    if st.session_state.generated_review is None:
+        st.info("⏳ The AI review is being generated in the background.")
+    elif st.session_state.generated_review:
+        st.subheader("🔍 AI Review & Analysis")
+        st.text_area(label="", value=st.session_state.generated_review, height=200, label_visibility="collapsed")
 
 # Display download button if MCQs have been generated
 if st.session_state.generated_df is not None:
@@ -426,14 +491,17 @@ if st.session_state.generated_df is not None:
     
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        # Create PDF
-        pdf_buffer = create_pdf(
-            st.session_state.generated_df,
-            st.session_state.generated_review,
-            st.session_state.generation_params['subject'],
-            st.session_state.generation_params['mcq_count'],
-            st.session_state.generation_params['tone']
-        )
+        # Create PDF (memoized by job id, so reruns reuse the bytes without rehashing the quiz)
+        with track_run(st.session_state.metrics_run):
+            pdf_buffer = create_pdf(
+                st.session_state.generated_df,
+                st.session_state.generated_review,
+                st.session_state.generation_params['subject'],
+                st.session_state.generation_params['mcq_count'],
+                st.session_state.generation_params['tone'],
+                st.session_state.generation_params['generated_on'],
+                quiz_key=st.session_state.loaded_job[0]
+            )
         
         # Download button
         st.download_button(
@@ -442,4 +510,32 @@ if st.session_state.generated_df is not None:
             file_name=f"{st.session_state.generation_params['subject']}_MCQs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
             mime="application/pdf",
             use_container_width=True
-        )
\ No newline at end of file
+        )
+
+        # Other formats are written only when their button is clicked
+        export_labels = {"csv": "CSV", "xlsx": "Excel (XLSX)", "jsonl": "JSON Lines",
+                         "gift": "Moodle GIFT", "qti": "QTI 1.2 (Canvas, Blackboard)"}
+        export_fmt = st.selectbox("Other formats", list(EXPORT_FORMATS), format_func=export_labels.get)
+        table = st.session_state.generated_table
+        subject = st.session_state.generation_params['subject']
+        export_options = {"gift": {"category": subject}, "qti": {"title": f"{subject} MCQs"}}.get(export_fmt, {})
+        suffix, mime = EXPORT_FORMATS[export_fmt]
+        st.download_button(
+            label=f"📦 Download MCQs as {export_labels[export_fmt]}",
+            data=lambda: export_bytes(table, export_fmt, export_options),
+            file_name=f"{subject}_MCQs_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}",
+            mime=mime,
+            use_container_width=True
+        )
+
+# Per-stage timings and tokens of the last generation
+if st.session_state.metrics_run:
+    stage_summary = get_metrics().summary(st.session_state.metrics_run)
+    if stage_summary:
+        st.sidebar.subheader("⏱️ Last Run")
+        summary_df = pd.DataFrame.from_dict(stage_summary, orient="index")
+        st.sidebar.dataframe(
+            summary_df[["calls", "wall_s", "ttft_s", "prompt_tokens", "completion_tokens"]],
+            use_container_width=True
+        )
+        st.sidebar.caption(f"Total {summary_df['wall_s'].sum():.2f}s · run {st.session_state.metrics_run}")
@@ -0,0 +1,33 @@
+"""Throughput of generate_quizzes_async against a fake LLM at several concurrencies.
+
+Run with: python benchmarks/bench_batch.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcqgenerator.backends import create_backend
+from mcqgenerator.batch import generate_quizzes_async
+from mcqgenerator.mcqgenerator import build_generate_evaluate_chain
+
+LATENCY = 0.05
+JOBS = 64
+
+
+def main():
+    chain = build_generate_evaluate_chain(create_backend("fake", latency=LATENCY))
+    jobs = [("Some source text " * 50, 3, "Biology", "Medium")] * JOBS
+    print(f"{'concurrency':>12} {'seconds':>10} {'quizzes/s':>10}")
+    for concurrency in (1, 2, 4, 8, 16, 32):
+        start = time.perf_counter()
+        results = asyncio.run(generate_quizzes_async(jobs, max_concurrency=concurrency, chain=chain))
+        elapsed = time.perf_counter() - start
+        assert len(results) == JOBS
+        print(f"{concurrency:>12} {elapsed:>10.2f} {JOBS / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
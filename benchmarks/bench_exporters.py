@@ -0,0 +1,93 @@
+"""Peak memory and throughput of the streaming exporters.
+
+Exports the same synthetic MCQs, generated lazily, in every format at two
+bank sizes and reports the peak memory traced during the export (tracemalloc).
+A streaming export peaks at the same memory at both sizes. The pandas
+to_csv/to_excel path the CLI used before is measured for comparison.
+
+Run with: python benchmarks/bench_exporters.py [--questions 100000]
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+WORDS = ("cell energy light enzyme protein gene market price demand supply force mass velocity "
+         "atom bond reaction poem novel rhythm theorem matrix vector integral river climate").split()
+
+
+def mcqs(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(8))
+        yield {
+            "no": str(i + 1),
+            "mcq": f"Question {i}: which statement about {words} is correct?",
+            "options": {key: f"{rng.choice(WORDS)} {rng.choice(WORDS)} {key}{i}" for key in "abcd"},
+            "correct": rng.choice("abcd"),
+        }
+
+
+def measure(run):
+    """(seconds, peak traced MiB) of run()"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    import pandas as pd
+
+    from mcqgenerator.exporters import EXPORT_FORMATS, export
+    from mcqgenerator.utils import get_table_data
+
+    directory = tempfile.mkdtemp()
+    sizes = (args.questions // 10, args.questions)
+    print(f"{'export':>18} " + " ".join(f"{f'{size:,} peak MiB':>17}" for size in sizes)
+          + f" {'MB/s':>7} {'questions/s':>12}")
+
+    def report(name, run_for, suffix):
+        run_for(1)  # imports and caches out of the measurement
+        peaks = []
+        for size in sizes:
+            elapsed, peak = measure(lambda: run_for(size))
+            peaks.append(peak)
+        path = os.path.join(directory, f"out{suffix}")
+        print(f"{name:>18} " + " ".join(f"{peak:>17.1f}" for peak in peaks)
+              + f" {os.path.getsize(path) / 1e6 / elapsed:>7.1f} {sizes[-1] / elapsed:>12,.0f}")
+
+    for fmt, (suffix, _) in EXPORT_FORMATS.items():
+        report(fmt, lambda size: export(mcqs(size), os.path.join(directory, f"out{suffix}"), fmt), suffix)
+
+    def pandas_export(size, suffix):
+        quiz = {str(i): mcq for i, mcq in enumerate(mcqs(size), 1)}
+        df = pd.DataFrame(get_table_data(quiz))
+        path = os.path.join(directory, f"out{suffix}")
+        if suffix == ".csv":
+            df.to_csv(path, index=False)
+        else:
+            df.to_excel(path, index=False)
+
+    for suffix in (".csv", ".xlsx"):
+        report(f"pandas {suffix[1:]}", lambda size: pandas_export(size, suffix), suffix)
+
+
+if __name__ == "__main__":
+    main()
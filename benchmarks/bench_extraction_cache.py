@@ -0,0 +1,87 @@
+"""Repeat-submit latency of text extraction with and without the extraction cache.
+
+A submit hashes the upload and gets its text. Before the cache every submit ran
+read_file; with it the first submit extracts (cold), later ones are served from
+memory, or from SQLite after a restart (disk). Also checks eviction by bytes.
+
+Run with: python benchmarks/bench_extraction_cache.py [--pages 100] [--repeats 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bench_read_file import make_pdf  # noqa: E402
+
+
+def timed_ms(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    from mcqgenerator.extraction_cache import ExtractionCache, data_digest
+    from mcqgenerator.utils import read_file
+
+    workdir = tempfile.mkdtemp(prefix="mcqgen-extraction-")
+    pdf_path = os.path.join(workdir, "doc.pdf")
+    make_pdf(pdf_path, args.pages)
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    db_path = os.path.join(workdir, "extractions.sqlite")
+
+    def before():
+        upload = BytesIO(data)
+        upload.name = "doc.pdf"
+        read_file(upload)
+
+    def cold():
+        cache = ExtractionCache(db_path)
+        cache.clear()
+        cache.get_or_extract("doc.pdf", data, digest=data_digest(data))
+
+    warm = ExtractionCache(db_path)
+    warm.get_or_extract("doc.pdf", data)
+
+    def memory():
+        warm.get_or_extract("doc.pdf", data, digest=data_digest(data))
+
+    def disk():
+        ExtractionCache(db_path).get_or_extract("doc.pdf", data, digest=data_digest(data))
+
+    print(f"{args.pages}-page PDF ({len(data) / 1024:.0f} KiB), median of {args.repeats} submits")
+    results = {}
+    for name, func, repeats in [("read_file (before)", before, max(3, args.repeats // 4)),
+                                ("cache cold", cold, max(3, args.repeats // 4)),
+                                ("cache disk", disk, args.repeats),
+                                ("cache memory", memory, args.repeats)]:
+        results[name] = timed_ms(func, repeats)
+        print(f"  {name:<20}{results[name]:>10.2f} ms")
+    print(f"  repeat submit speedup {results['read_file (before)'] / results['cache memory']:.0f}x (memory), "
+          f"{results['read_file (before)'] / results['cache disk']:.0f}x (disk)")
+
+    # Eviction: room for about three copies of the document's text
+    size = len(warm.get_or_extract("doc.pdf", data).text.encode("utf-8"))
+    bounded = ExtractionCache(os.path.join(workdir, "bounded.sqlite"), max_bytes=size * 3)
+    for copy in range(10):
+        bounded.get_or_extract("doc.pdf", data, digest=f"copy-{copy}")
+    stats = bounded.stats()
+    print(f"  eviction: {stats['entries']} entries, {stats['bytes']} / {bounded.max_bytes} bytes kept")
+
+
+if __name__ == "__main__":
+    main()
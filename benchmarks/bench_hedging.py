@@ -0,0 +1,96 @@
+"""p50/p99 quiz latency and token cost of hedged generation.
+
+Runs offline on the fake backend with a latency tail: every call waits
+`--latency` seconds before its first token, a fraction `--tail-rate` waits
+`--tail-latency` more, and a fraction `--error-rate` of responses is
+malformed. Faults and slow calls are drawn per call, so hedged candidates
+for the same prompt behave independently. Each policy generates the same
+quizzes (skip mode, with validation) `--concurrency` at a time.
+
+Run with: python benchmarks/bench_hedging.py [--quizzes 300] [--tail-rate 0.05] [--tail-latency 3]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data.txt')
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quizzes", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=800)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ["MCQGEN_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "responses.sqlite")
+    os.environ["MCQGEN_BACKEND"] = "fake"
+    os.environ["MCQGEN_FAKE_LATENCY"] = str(args.latency)
+    os.environ["MCQGEN_FAKE_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["MCQGEN_FAKE_TAIL_RATE"] = str(args.tail_rate)
+    os.environ["MCQGEN_FAKE_TAIL_LATENCY"] = str(args.tail_latency)
+    os.environ["MCQGEN_FAKE_ERROR_RATE"] = str(args.error_rate)
+    os.environ["MCQGEN_FAKE_VARY"] = "1"
+    logging.disable(logging.WARNING)
+    from mcqgenerator.hedging import Hedge
+    from mcqgenerator.mcqgenerator import generate_quiz, load_response_json
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        text = f.read()[:4000]
+    deadline = round(args.latency * 2, 3)
+    policies = [
+        ("no hedging", Hedge(1)),
+        ("2 parallel", Hedge(2)),
+        ("3 parallel", Hedge(3)),
+        (f"hedge after {deadline}s", Hedge(3, deadline)),
+        (f"hedge after {deadline}s, 3x tokens", Hedge(3, deadline, max_tokens=0)),
+    ]
+
+    def generate(index, hedge):
+        inputs = {"text": text, "number": args.number, "subject": f"AI {index}", "tone": "Medium",
+                  "RESPONSE_JSON": json.dumps(load_response_json())}
+        start = time.perf_counter()
+        try:
+            result = generate_quiz(inputs, mode="skip", bypass_cache=True, hedge=hedge)
+        except Exception:
+            return time.perf_counter() - start, None
+        return time.perf_counter() - start, result["metrics"]
+
+    print(f"{args.quizzes} quizzes, first token after {args.latency}s, {args.tail_rate:.0%} of calls "
+          f"{args.tail_latency}s slower, {args.error_rate:.0%} malformed")
+    print(f"{'policy':>30} {'p50 s':>7} {'p99 s':>7} {'failed':>7} {'calls/quiz':>11} {'tokens/quiz':>12}")
+    single_tokens = None
+    for name, hedge in policies:
+        if hedge.max_tokens == 0:
+            # A ceiling of three times what an unhedged quiz costs on average
+            hedge = hedge._replace(max_tokens=int(single_tokens * 3))
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            runs = list(pool.map(lambda index: generate(index, hedge), range(args.quizzes)))
+        latencies = [latency for latency, _ in runs]
+        metrics = [metric for _, metric in runs if metric is not None]
+        calls = statistics.mean(metric["llm_calls"] for metric in metrics)
+        tokens = statistics.mean(metric["prompt_tokens"] + metric["completion_tokens"] for metric in metrics)
+        single_tokens = single_tokens or tokens
+        print(f"{name:>30} {percentile(latencies, 50):>7.2f} {percentile(latencies, 99):>7.2f} "
+              f"{args.quizzes - len(metrics):>7} {calls:>11.2f} {tokens:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
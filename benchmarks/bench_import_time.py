@@ -0,0 +1,50 @@
+"""Cold-import regression check for the mcqgenerator package.
+
+Runs `python -X importtime` in a fresh interpreter for each module and fails
+(exit status 1) when the cumulative import time exceeds the budget. Importing
+must not construct the LLM client, read Response.json or create log files.
+
+Run with: python benchmarks/bench_import_time.py [--budget-ms 150]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+MODULES = ["mcqgenerator.mcqgenerator", "mcqgenerator.utils", "mcqgenerator.logger"]
+BUDGET_MS = 150
+RUNS = 5
+
+
+def import_time_ms(module):
+    env = {**os.environ, "PYTHONPATH": SRC, "GROQ_API_KEY": ""}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        best = min(import_time_ms(module) for _ in range(RUNS))
+        status = "ok" if best <= args.budget_ms else "OVER BUDGET"
+        failed = failed or best > args.budget_ms
+        print(f"{module:<30} {best:>8.1f} ms  (budget {args.budget_ms:.0f} ms)  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
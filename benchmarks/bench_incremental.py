@@ -0,0 +1,92 @@
+"""LLM cost of regenerating a quiz after small edits: full vs incremental.
+
+Builds a long synthetic document, generates a quiz for it once, then edits
+1, 5 and 20 paragraphs and regenerates the quiz both from scratch and
+incrementally (generate_incremental) on the fake backend. Reports the LLM
+calls, estimated tokens and latency of each, and how fast documents are
+split into fingerprinted sections.
+
+Run with: python benchmarks/bench_incremental.py [--paragraphs 120] [--number 30]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+WORDS = ("cell energy light enzyme protein gene market price demand supply force mass velocity "
+         "atom bond reaction poem novel rhythm theorem matrix vector integral river climate").split()
+
+
+def paragraph(rng, index):
+    sentences = []
+    for _ in range(6):
+        words = " ".join(rng.choice(WORDS) for _ in range(12))
+        sentences.append(f"Topic{index} {words.capitalize()}.")
+    return " ".join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=120)
+    parser.add_argument("--number", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["MCQGEN_CACHE_PATH"] = os.path.join(directory, "responses.sqlite")
+    os.environ["MCQGEN_BACKEND"] = "fake"
+    os.environ["MCQGEN_FAKE_LATENCY"] = str(args.latency)
+    os.environ["MCQGEN_FAKE_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    logging.disable(logging.WARNING)
+    from mcqgenerator.incremental import QuizVersions, split_sections
+    from mcqgenerator.mcqgenerator import generate_incremental, generate_quiz, load_response_json
+
+    rng = random.Random(0)
+    paragraphs = [paragraph(rng, i) for i in range(args.paragraphs)]
+    inputs = {"number": args.number, "subject": "Science", "tone": "Medium",
+              "RESPONSE_JSON": json.dumps(load_response_json())}
+    versions = QuizVersions(os.path.join(directory, "versions.sqlite"))
+
+    def incremental(text):
+        start = time.perf_counter()
+        result = generate_incremental({**inputs, "text": text}, "document.txt", mode="skip", versions=versions)
+        return time.perf_counter() - start, result
+
+    original = "\n\n".join(paragraphs)
+    incremental(original)
+    print(f"{args.paragraphs} paragraphs ({len(original):,} chars), {args.number} MCQs, review skipped")
+    print(f"{'edit':>16} {'run':>12} {'calls':>6} {'prompt tok':>11} {'output tok':>11} {'latency s':>10} "
+          f"{'kept':>5}")
+    for edited in (1, 5, 20):
+        revised = list(paragraphs)
+        for index in rng.sample(range(len(paragraphs)), edited):
+            revised[index] = paragraph(rng, index)
+        text = "\n\n".join(revised)
+
+        start = time.perf_counter()
+        full = generate_quiz({**inputs, "text": text}, mode="skip", bypass_cache=True)
+        full_s = time.perf_counter() - start
+        incremental(original)  # back to the original version before each edit
+        incremental_s, result = incremental(text)
+        for name, run, elapsed, kept in (("full", full, full_s, 0),
+                                         ("incremental", result, incremental_s, result["incremental"]["kept"])):
+            metrics = run["metrics"]
+            print(f"{f'{edited} paragraph(s)':>16} {name:>12} {metrics['llm_calls']:>6} "
+                  f"{metrics['prompt_tokens']:>11,} {metrics['completion_tokens']:>11,} {elapsed:>10.2f} {kept:>5}")
+
+    big = "\n\n".join(paragraph(rng, i) for i in range(2000))
+    start = time.perf_counter()
+    sections = split_sections(big)
+    elapsed = time.perf_counter() - start
+    print(f"\nsplit_sections: {len(big) / 1e6:.1f} MB into {len(sections):,} sections in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
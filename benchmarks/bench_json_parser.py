@@ -0,0 +1,101 @@
+"""Micro-benchmark of quiz JSON extraction: regex cascade vs single-pass scanner.
+
+Builds model-like responses (prose + fenced JSON) from 10 KB to 1 MB, complete,
+truncated and with unbalanced braces, and times the old `extract_json_from_text` + brace
+counting repair against `scan_json_object`.
+
+Run with: python benchmarks/bench_json_parser.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcqgenerator.utils import scan_json_object
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def old_extract(text):
+    # The original regex cascade, kept here as the baseline
+    json_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if json_match:
+        return json_match.group(1)
+    json_match = re.search(r'```\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if json_match:
+        return json_match.group(1)
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if json_match:
+        return json_match.group(0)
+    return text
+
+
+def old_parse(text):
+    quiz_str = old_extract(text.strip())
+    try:
+        return json.loads(quiz_str)
+    except json.JSONDecodeError:
+        open_braces = quiz_str.count('{') - quiz_str.count('}')
+        open_brackets = quiz_str.count('[') - quiz_str.count(']')
+        try:
+            return json.loads(quiz_str + ('}' * open_braces) + (']' * open_brackets))
+        except json.JSONDecodeError:
+            return None
+
+
+def new_parse(text):
+    scan = scan_json_object(text)
+    try:
+        return json.loads(scan.json)
+    except (TypeError, json.JSONDecodeError):
+        return None
+
+
+def make_response(size, list_options=False):
+    quiz = {}
+    i = 0
+    while len(json.dumps(quiz)) < size:
+        i += 1
+        quiz[str(i)] = {
+            "no": str(i),
+            "mcq": f"Which statement about topic {i} is correct?",
+            "options": {"a": "first choice", "b": "second choice", "c": "third choice", "d": "fourth choice"},
+            "choices": [{"key": "a", "text": "first"}, {"key": "b", "text": "second"}] if list_options else [],
+            "correct": "b",
+        }
+    return "Here is the quiz you asked for:\n```json\n" + json.dumps(quiz, indent=2) + "\n```\nLet me know!"
+
+
+def best_time(func, text, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    print(f"{'size':>9} {'case':>14} {'old ms':>9} {'new ms':>9} {'old ok':>7} {'new ok':>7}")
+    for size in SIZES:
+        complete = make_response(size)
+        # Cut mid-way through an MCQ, like a response that hit max_tokens
+        truncated = complete[:complete.rindex('"correct"', 0, len(complete) - 200)]
+        # Cut inside a list: brace-then-bracket counting closes these in the wrong order
+        with_lists = make_response(size, list_options=True)
+        truncated_list = with_lists[:with_lists.rindex('"second"', 0, len(with_lists) - 200)]
+        # Many opening braces and no closing one: the greedy \{.*\} retries from each brace
+        unbalanced = "Template: " + "{placeholder " * (size // 13)
+        for case, text in (("complete", complete), ("truncated", truncated),
+                           ("truncated-list", truncated_list), ("unbalanced", unbalanced)):
+            old_time, old_result = best_time(old_parse, text)
+            new_time, new_result = best_time(new_parse, text)
+            print(f"{size:>9} {case:>14} {old_time * 1000:>9.2f} {new_time * 1000:>9.2f} "
+                  f"{str(old_result is not None):>7} {str(new_result is not None):>7}")
+
+
+if __name__ == "__main__":
+    main()
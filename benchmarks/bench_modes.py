@@ -0,0 +1,54 @@
+"""Latency and token cost of each generation mode (standard, fused, skip, deferred).
+
+Runs offline on the fake backend, which sleeps `--latency` seconds per call and
+streams at `--tokens-per-second`, so the numbers show how the number of LLM
+round-trips affects each mode.
+
+Run with: python benchmarks/bench_modes.py [--latency 0.5] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data.txt')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ["MCQGEN_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "responses.sqlite")
+    os.environ["MCQGEN_BACKEND"] = "fake"
+    os.environ["MCQGEN_FAKE_LATENCY"] = str(args.latency)
+    os.environ["MCQGEN_FAKE_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    from mcqgenerator.mcqgenerator import GENERATION_MODES, generate_quiz, load_response_json
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        text = f.read()
+    inputs = {"text": text, "number": args.number, "subject": "AI", "tone": "Medium",
+              "RESPONSE_JSON": json.dumps(load_response_json())}
+
+    print(f"{'mode':>10} {'latency p50':>12} {'calls':>6} {'prompt tok':>11} {'completion tok':>15}")
+    for mode in GENERATION_MODES:
+        latencies = []
+        for _ in range(args.runs):
+            result = generate_quiz(inputs, mode=mode, bypass_cache=True)
+            latencies.append(result["metrics"]["latency_s"])
+            if result.get("review_future"):
+                result["review_future"].result()
+        metrics = result["metrics"]
+        print(f"{mode:>10} {statistics.median(latencies):>11.2f}s {metrics['llm_calls']:>6} "
+              f"{metrics['prompt_tokens']:>11} {metrics['completion_tokens']:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""PDF export time for 50- and 1000-question quizzes.
+
+Compares the original create_pdf (styles rebuilt and df.iterrows() on every
+call) with pdf_export: a fresh render, a memoized rerun, and bulk export of
+many quizzes in a process pool.
+
+Run with: python benchmarks/bench_pdf_export.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+from mcqgenerator.pdf_export import create_pdf, export_pdfs, quiz_rows
+
+SIZES = [50, 1000]
+BULK_QUIZZES = 16
+
+
+def old_create_pdf(df, review, subject, mcq_count, tone):
+    # The original StreamlitAPP.create_pdf, kept here as the baseline
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
+                                 textColor=colors.HexColor('#667eea'), spaceAfter=30, alignment=TA_CENTER,
+                                 fontName='Helvetica-Bold')
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=16,
+                                   textColor=colors.HexColor('#764ba2'), spaceAfter=12, spaceBefore=12,
+                                   fontName='Helvetica-Bold')
+    normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=11, spaceAfter=12,
+                                  alignment=TA_LEFT)
+    elements.append(Paragraph(f"<b>{subject} - Multiple Choice Questions</b>", title_style))
+    elements.append(Spacer(1, 12))
+    meta_data = f"""
+    <b>Generated on:</b> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}<br/>
+    <b>Number of Questions:</b> {mcq_count}<br/>
+    <b>Difficulty Level:</b> {tone}<br/>
+    """
+    elements.append(Paragraph(meta_data, normal_style))
+    elements.append(Spacer(1, 20))
+    for idx, row in df.iterrows():
+        elements.append(Paragraph(f"<b>Question {idx}:</b> {row['MCQ']}", heading_style))
+        elements.append(Spacer(1, 6))
+        elements.append(Paragraph(row['Choices'].replace('||', '<br/>'), normal_style))
+        elements.append(Spacer(1, 6))
+        elements.append(Paragraph(f"<b>Correct Answer:</b> <font color='green'>{row['Correct']}</font>",
+                                  normal_style))
+        elements.append(Spacer(1, 20))
+    elements.append(PageBreak())
+    elements.append(Paragraph("<b>AI Review & Analysis</b>", title_style))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(review, normal_style))
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def make_df(size):
+    df = pd.DataFrame([
+        {
+            "MCQ": f"Which statement about topic {i} is correct?",
+            "Choices": "a -> first choice || b -> second choice || c -> third choice || d -> fourth choice",
+            "Correct": "b",
+        }
+        for i in range(size)
+    ])
+    df.index = df.index + 1
+    return df
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    review = "Complexity analysis: the questions suit the students. " * 5
+    generated_on = datetime.now()
+    print(f"{'questions':>10} {'old':>9} {'new':>9} {'memo hit':>10} {f'bulk x{BULK_QUIZZES}':>10}")
+    for size in SIZES:
+        df = make_df(size)
+        old = timed(lambda: old_create_pdf(df, review, "Biology", size, "Medium"))
+        new = timed(lambda: create_pdf(df, review, "Biology", size, "Medium", generated_on))
+        memo = timed(lambda: create_pdf(df, review, "Biology", size, "Medium", generated_on))
+        with tempfile.TemporaryDirectory() as tmp:
+            rows = quiz_rows(df)
+            jobs = [{"rows": rows, "review": review, "subject": "Biology", "tone": "Medium",
+                     "path": os.path.join(tmp, f"quiz_{i}.pdf")} for i in range(BULK_QUIZZES)]
+            bulk = timed(lambda: export_pdfs(jobs))
+        print(f"{size:>10} {old:>8.3f}s {new:>8.3f}s {memo:>9.4f}s {bulk:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Retrieval latency of the question bank at up to 1M stored questions.
+
+Fills a temporary bank with synthetic MCQs spread over subjects, tones and
+source documents, then times the lookups generate_quiz does before calling the
+LLM (subject + tone + source, limit = MCQ count) and FTS5 keyword searches.
+
+Run with: python benchmarks/bench_question_bank.py [--size 1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcqgenerator.question_bank import QuestionBank
+
+SUBJECTS = [f"Subject {i}" for i in range(50)]
+TONES = ["Easy", "Medium", "Hard"]
+SOURCES = 2000
+WORDS = ("cell energy light enzyme protein gene market price demand supply force mass velocity "
+         "atom bond reaction poem novel rhythm theorem matrix vector integral river climate").split()
+BATCH = 20000
+
+
+def fill(bank, size, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    rows = []
+    for i in range(size):
+        words = " ".join(rng.choice(WORDS) for _ in range(8))
+        rows.append((
+            f"Question {i}: which statement about {words}?",
+            '{"a": "one", "b": "two", "c": "three", "d": "four"}', "a",
+            rng.choice(SUBJECTS), rng.choice(TONES), f"source-{rng.randrange(SOURCES)}", "", 0.0,
+        ))
+        if len(rows) == BATCH:
+            bank._insert(rows)
+            rows = []
+    if rows:
+        bank._insert(rows)
+    return time.perf_counter() - start
+
+
+def time_queries(run, repeats):
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        run(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = QuestionBank(os.path.join(tmp, "bank.sqlite"))
+        elapsed = fill(bank, args.size)
+        print(f"Inserted {args.size:,} questions in {elapsed:.1f}s "
+              f"({os.path.getsize(bank.path) / 1e6:.0f} MB on disk)")
+
+        rng = random.Random(1)
+        cases = {
+            "subject + tone + source, limit 10": lambda i: bank.query(
+                rng.choice(SUBJECTS), rng.choice(TONES), f"source-{rng.randrange(SOURCES)}", limit=10),
+            "subject + tone, limit 50": lambda i: bank.query(rng.choice(SUBJECTS), rng.choice(TONES), limit=50),
+            "FTS keyword, limit 20": lambda i: bank.query(search=rng.choice(WORDS), limit=20),
+            "subject + FTS phrase, limit 20": lambda i: bank.query(
+                rng.choice(SUBJECTS), search=f'"{rng.choice(WORDS)} {rng.choice(WORDS)}"', limit=20),
+        }
+        print(f"{'query':<36}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, run in cases.items():
+            p50, p99 = time_queries(run, args.repeats)
+            print(f"{name:<36}{p50:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Memory per 1M questions: get_table_data list-of-dicts and DataFrame vs QuizTable.
+
+Builds the same synthetic MCQs into each representation and reports the
+memory it holds (traced with tracemalloc, input freed), plus how long the
+columnar table takes to save as Arrow IPC / Parquet and to memory-map back.
+
+Run with: python benchmarks/bench_quiz_table.py [--questions 1000000]
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+WORDS = ("cell energy light enzyme protein gene market price demand supply force mass velocity "
+         "atom bond reaction poem novel rhythm theorem matrix vector integral river climate").split()
+
+
+def mcqs(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(8))
+        yield {
+            "no": str(i + 1),
+            "mcq": f"Question {i}: which statement about {words} is correct?",
+            "options": {key: f"{rng.choice(WORDS)} {rng.choice(WORDS)} {key}{i}" for key in "abcd"},
+            "correct": rng.choice("abcd"),
+        }
+
+
+def arrow_allocated():
+    # pandas keeps strings in Arrow memory, which tracemalloc doesn't see
+    try:
+        import pyarrow
+    except ImportError:
+        return 0
+    return pyarrow.total_allocated_bytes()
+
+
+def held(build):
+    """(object, bytes it holds) for the object returned by build()"""
+    gc.collect()
+    arrow_before = arrow_allocated()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size + arrow_allocated() - arrow_before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    import pandas as pd
+
+    from mcqgenerator.quiz_table import QuizTable
+    from mcqgenerator.utils import get_table_data
+
+    count = args.questions
+    per_million = 1_000_000 / count
+    results = []
+
+    def table_data():
+        quiz = {str(i): mcq for i, mcq in enumerate(mcqs(count), 1)}
+        rows = get_table_data(quiz)
+        del quiz
+        return rows
+
+    rows, size = held(table_data)
+    results.append(("get_table_data list of dicts", size))
+    df, size = held(lambda: pd.DataFrame(rows))
+    results.append(("DataFrame of get_table_data", size))
+    del rows, df
+
+    table, size = held(lambda: QuizTable.from_mcqs(mcqs(count)))
+    results.append(("QuizTable", size))
+    df, size = held(table.to_dataframe)
+    results.append(("QuizTable.to_dataframe (extra)", size))
+    del df
+
+    print(f"{count:,} questions")
+    print(f"{'representation':>32} {'MiB per 1M':>11}")
+    for name, size in results:
+        print(f"{name:>32} {size * per_million / 2 ** 20:>11.1f}")
+
+    directory = tempfile.mkdtemp()
+    print(f"\n{'file':>32} {'MiB':>11} {'write s':>8} {'read s':>8}")
+    for name in ("quiz.arrow", "quiz.parquet"):
+        path = os.path.join(directory, name)
+        start = time.perf_counter()
+        table.write(path)
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = QuizTable.read(path)
+        loaded.row(len(loaded) - 1)
+        read = time.perf_counter() - start
+        print(f"{name:>32} {os.path.getsize(path) / 2 ** 20:>11.1f} {written:>8.2f} {read:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
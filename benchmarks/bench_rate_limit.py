@@ -0,0 +1,105 @@
+"""429s and per-priority latency with and without the client-side rate limiter.
+
+Starts the fake Groq server (mcqgenerator/fake_server.py) with a small
+requests/min limit, fires a burst of batch requests at it and, while they are
+queued, a trickle of interactive ones. Without the limiter the Groq SDK's own
+retries hammer the server; with it, requests wait in the priority queue and
+interactive ones overtake the batch backlog.
+
+Run with: python benchmarks/bench_rate_limit.py [--rpm 300] [--batch 360] [--interactive 20]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def run(args, limited):
+    import httpx
+
+    from mcqgenerator.backends import create_backend
+    from mcqgenerator.fake_server import FakeGroqServer
+    from mcqgenerator.rate_limit import BATCH, INTERACTIVE, RateLimiter, request_priority
+
+    server = FakeGroqServer(args.rpm, args.tpm).start()
+    params = {"groq_api_base": server.base_url, "max_retries": args.sdk_retries}
+    if limited:
+        limiter = RateLimiter(args.rpm, args.tpm)
+        params.update(http_client=limiter.http_client(), http_async_client=limiter.async_http_client())
+    else:
+        params.update(http_client=httpx.Client(), http_async_client=httpx.AsyncClient())
+    llm = create_backend("groq", **params)
+
+    latencies = {INTERACTIVE: [], BATCH: []}
+    failures = {INTERACTIVE: 0, BATCH: 0}
+    lock = threading.Lock()
+
+    def call(priority, index):
+        start = time.perf_counter()
+        try:
+            with request_priority(priority):
+                llm.invoke(f"Text: topic {priority} {index}. Create a quiz of 3 multiple choice questions")
+        except Exception:
+            with lock:
+                failures[priority] += 1
+            return
+        with lock:
+            latencies[priority].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=call, args=(BATCH, index)) for index in range(args.batch)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    # Interactive requests arrive while the batch backlog is queued
+    interval = args.spread / max(1, args.interactive)
+    for index in range(args.interactive):
+        time.sleep(interval)
+        thread = threading.Thread(target=call, args=(INTERACTIVE, index))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.stop()
+    return server, latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rpm", type=float, default=300, help="server requests/min (also the burst size)")
+    parser.add_argument("--tpm", type=float, default=1_000_000, help="server tokens/min")
+    parser.add_argument("--batch", type=int, default=360)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=8.0, help="seconds over which interactive requests arrive")
+    parser.add_argument("--sdk-retries", type=int, default=2, help="retries of the Groq SDK itself")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "test")
+    logging.disable(logging.WARNING)
+
+    print(f"{args.batch} batch + {args.interactive} interactive requests, server limit {args.rpm:g} req/min")
+    print(f"{'limiter':>8} {'429s':>6} {'failed':>7} {'wall s':>7} "
+          f"{'interactive p50/p99 s':>22} {'batch p50/p99 s':>16}")
+    for limited in (False, True):
+        server, latencies, failures, elapsed = run(args, limited)
+        interactive, batch = sorted(latencies["interactive"]), sorted(latencies["batch"])
+        print(f"{'on' if limited else 'off':>8} {server.rate_limited:>6} {sum(failures.values()):>7} {elapsed:>7.1f} "
+              f"{percentile(interactive, 50):>10.2f}/{percentile(interactive, 99):<11.2f} "
+              f"{percentile(batch, 50):>7.2f}/{percentile(batch, 99):<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Wall time and peak RSS of read_file on a synthetic 500-page PDF.
+
+Compares the original `text += page.extract_text()` loop with the streaming
+extractor, sequentially and with a process pool. Each variant runs in its own
+subprocess so peak RSS is measured independently.
+
+Run with: python benchmarks/bench_read_file.py [--pages 500]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+VARIANTS = ["old", "streaming", "parallel"]
+
+
+def make_pdf(path, pages):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    line = "Generative models learn the patterns of their training data and produce new data. "
+    for page in range(pages):
+        text = pdf.beginText(40, 800)
+        for row in range(60):
+            text.textLine(f"{page}.{row} {line}")
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+
+
+def read_old(file):
+    # The original implementation, kept here as the baseline
+    from PyPDF2 import PdfReader
+    pdf_reader = PdfReader(file)
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text()
+    return text
+
+
+def run_variant(variant, path):
+    from mcqgenerator.utils import read_file
+
+    with open(path, "rb") as file:
+        start = time.perf_counter()
+        if variant == "old":
+            text = read_old(file)
+        elif variant == "streaming":
+            text = read_file(file)
+        else:
+            text = read_file(file, workers=os.cpu_count())
+        elapsed = time.perf_counter() - start
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(f"{variant:>10} {elapsed:>9.2f}s {peak_kb / 1024:>9.1f} MB {len(text):>10} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--variant", choices=VARIANTS)
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        make_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB PDF")
+        print(f"{'variant':>10} {'wall':>10} {'peak RSS':>12} {'length':>16}")
+        for variant in VARIANTS:
+            subprocess.run([sys.executable, __file__, "--variant", variant, "--path", path], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Parse-failure rate and wasted tokens of free-text vs structured output.
+
+Runs offline on the fake backend, which corrupts a fraction `--error-rate` of
+quiz responses (truncated, malformed JSON or an MCQ that breaks the schema;
+JSON mode and tool calling rule out malformed JSON). Each quiz is generated
+once with a clean model and once with the faulty one. Tokens come from the
+per-stage metrics. Wasted tokens are the extra tokens the faulty run used,
+or all of them if the quiz failed.
+
+Run with: python benchmarks/bench_structured_output.py [--quizzes 1000] [--error-rate 0.1]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data.txt')
+
+
+def run_tokens(run_id):
+    from mcqgenerator.metrics import get_metrics
+
+    stages = get_metrics().summary(run_id).values()
+    return sum(stage["prompt_tokens"] + stage["completion_tokens"] for stage in stages)
+
+
+def generate(inputs, output):
+    """(result or None if the quiz failed, tokens used)"""
+    from mcqgenerator.mcqgenerator import generate_quiz
+    from mcqgenerator.metrics import track_run
+
+    with track_run() as run_id:
+        try:
+            result = generate_quiz(inputs, mode="skip", output=output, bypass_cache=True)
+        except Exception:
+            result = None
+    return result, run_tokens(run_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quizzes", type=int, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["MCQGEN_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "responses.sqlite")
+    os.environ["MCQGEN_BACKEND"] = "fake"
+    logging.disable(logging.WARNING)
+    from mcqgenerator.mcqgenerator import OUTPUT_MODES, get_chains, load_response_json
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        text = f.read()[:4000]
+    llm = get_chains().llm
+
+    print(f"{args.quizzes} quizzes of {args.number} MCQs, {args.error_rate:.0%} of responses corrupted")
+    print(f"{'output':>17} {'parse failures':>15} {'failed quizzes':>15} {'calls/quiz':>11} "
+          f"{'wasted tok/1k quizzes':>22}")
+    for output in OUTPUT_MODES:
+        failures = failed = calls = wasted = 0
+        for index in range(args.quizzes):
+            # A different subject per quiz gives each one its own (deterministic) faults
+            inputs = {"text": text, "number": args.number, "subject": f"AI {index}", "tone": "Medium",
+                      "RESPONSE_JSON": json.dumps(load_response_json())}
+            llm.error_rate = 0.0
+            _, clean_tokens = generate(inputs, output)
+            llm.error_rate = args.error_rate
+            result, tokens = generate(inputs, output)
+            if result is None:
+                failures += 1
+                failed += 1
+                wasted += tokens
+                continue
+            calls += result["metrics"]["llm_calls"]
+            structured = result.get("structured") or {}
+            if structured.get("schema_failures") or result["validation"]["rejected"]:
+                failures += 1
+            wasted += max(0, tokens - clean_tokens)
+        succeeded = max(1, args.quizzes - failed)
+        print(f"{output:>17} {failures / args.quizzes:>14.1%} {failed / args.quizzes:>14.1%} "
+              f"{calls / succeeded:>11.2f} {wasted * 1000 / args.quizzes:>22,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Offline benchmark suite for the whole pipeline, with JSON baselines.
+
+Times read_file on synthetic TXT and PDF files of increasing size,
+extract_json_from_text and get_table_data on large and truncated responses,
+create_pdf at 10 to 1000 questions, the streaming exporters, and
+generate_evaluate_chain throughput against the fake LLM at several
+concurrencies. Each case runs once to warm up, then --rounds times; the
+fastest and median rounds are saved as JSON. `compare` flags every case
+whose fastest round got slower than the baseline by more than --threshold
+and exits with status 1, so it can gate CI.
+
+Run with:
+    python benchmarks/suite.py run [--quick] [--only read_file,create_pdf] [--save benchmarks/results/latest.json]
+    python benchmarks/suite.py run --baseline benchmarks/results/main.json  # run, save and compare
+    python benchmarks/suite.py compare benchmarks/results/main.json benchmarks/results/latest.json [--threshold 0.15]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bench_exporters import mcqs
+from bench_json_parser import make_response
+from bench_read_file import make_pdf
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+DEFAULT_THRESHOLD = 0.15
+# Cases faster than this in both runs are too noisy to flag
+MIN_DELTA_S = 0.0005
+CHAIN_JOBS = 32
+CHAIN_LATENCY = 0.02
+
+# name -> (setup, params, quick params); setup(param, directory) returns the callable to time,
+# which may return {"items": n} to also report items per second
+CASES = {}
+
+
+def case(name, params, quick=None):
+    def register(setup):
+        CASES[name] = (setup, params, quick or params[:2])
+        return setup
+    return register
+
+
+@case("read_file_txt", ["100KB", "1MB", "10MB"])
+def read_file_txt(size, directory):
+    from mcqgenerator.utils import read_file
+
+    path = os.path.join(directory, f"source-{size}.txt")
+    line = "Generative models learn the patterns of their training data and produce new data.\n"
+    with open(path, "w") as f:
+        f.write(line * (int(size.replace("KB", "000").replace("MB", "000000")) // len(line)))
+
+    def run():
+        with open(path, "rb") as f:
+            read_file(f)
+    return run
+
+
+@case("read_file_pdf", [10, 100, 500])
+def read_file_pdf(pages, directory):
+    from mcqgenerator.utils import read_file
+
+    path = os.path.join(directory, f"source-{pages}.pdf")
+    make_pdf(path, pages)
+
+    def run():
+        with open(path, "rb") as f:
+            read_file(f)
+        return {"items": pages}
+    return run
+
+
+def response(variant):
+    # "1MB" or "1MB-truncated" (cut off a tenth from the end, mid-question)
+    size, _, truncated = variant.partition("-")
+    text = make_response(int(size.replace("KB", "000").replace("MB", "000000")))
+    return text[:len(text) * 9 // 10] if truncated else text
+
+
+@case("extract_json_from_text", ["100KB", "100KB-truncated", "1MB", "1MB-truncated"],
+      quick=["100KB", "100KB-truncated"])
+def extract_json(variant, directory):
+    from mcqgenerator.utils import extract_json_from_text
+
+    text = response(variant)
+    return lambda: extract_json_from_text(text)
+
+
+@case("get_table_data", ["100KB", "100KB-truncated", "1MB", "1MB-truncated"],
+      quick=["100KB", "100KB-truncated"])
+def table_data(variant, directory):
+    from mcqgenerator.utils import get_table_data
+
+    text = response(variant)
+    return lambda: get_table_data(text)
+
+
+@case("create_pdf", [10, 100, 1000])
+def create_pdf_case(questions, directory):
+    from mcqgenerator.pdf_export import create_pdf
+    from mcqgenerator.quiz_table import quiz_table
+
+    df = quiz_table({mcq["no"]: mcq for mcq in mcqs(questions)}).to_dataframe()
+    df.index = df.index + 1
+
+    def run():
+        # generated_on defaults to now(), so the memo never serves a round
+        create_pdf(df, "The quiz covers the material evenly.", "Science", questions, "Medium")
+        return {"items": questions}
+    return run
+
+
+@case("export", ["csv-10000", "jsonl-10000", "qti-10000", "xlsx-1000"], quick=["csv-1000", "xlsx-100"])
+def export_case(variant, directory):
+    from mcqgenerator.exporters import EXPORT_FORMATS, export
+
+    fmt, questions = variant.split("-")
+    path = os.path.join(directory, f"export{EXPORT_FORMATS[fmt][0]}")
+
+    def run():
+        export(mcqs(int(questions)), path, fmt)
+        return {"items": int(questions)}
+    return run
+
+
+@case("generate_evaluate_chain", [1, 4, 16], quick=[4, 16])
+def chain_throughput(concurrency, directory):
+    from mcqgenerator.backends import create_backend
+    from mcqgenerator.batch import generate_quizzes_async
+    from mcqgenerator.mcqgenerator import build_generate_evaluate_chain
+
+    chain = build_generate_evaluate_chain(create_backend("fake", latency=CHAIN_LATENCY))
+    jobs = [("Some source text " * 50, 3, "Biology", "Medium")] * CHAIN_JOBS
+
+    def run():
+        results = asyncio.run(generate_quizzes_async(jobs, max_concurrency=concurrency, chain=chain))
+        assert len(results) == CHAIN_JOBS
+        return {"items": CHAIN_JOBS}
+    return run
+
+
+def measure(run, rounds):
+    extra = run() or {}  # warm-up: imports, file caches, lazy clients
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    result = {"min_s": min(times), "median_s": statistics.median(times), "rounds": rounds}
+    if "items" in extra:
+        result["items_per_s"] = extra["items"] / result["median_s"]
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(names, quick, rounds):
+    directory = tempfile.mkdtemp()
+    results = {}
+    for name in names:
+        setup, params, quick_params = CASES[name]
+        for param in (quick_params if quick else params):
+            key = f"{name}[{param}]"
+            results[key] = measure(setup(param, directory), rounds)
+            line = f"{key:>42} {results[key]['min_s'] * 1000:>10.2f} {results[key]['median_s'] * 1000:>10.2f}"
+            if "items_per_s" in results[key]:
+                line += f" {results[key]['items_per_s']:>10,.1f}"
+            print(line, flush=True)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "rounds": rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA_S):
+    """Print baseline vs current per case and return the names of the regressed cases"""
+    for field in ("platform", "cpus", "python"):
+        if baseline["meta"].get(field) != current["meta"].get(field):
+            print(f"note: {field} differs ({baseline['meta'].get(field)} vs {current['meta'].get(field)}); "
+                  f"timings may not be comparable")
+    print(f"{'case':>42} {'base ms':>10} {'now ms':>10} {'change':>8}  status")
+    regressions = []
+    before, after = baseline["results"], current["results"]
+    for key in list(before) + [key for key in after if key not in before]:
+        if key not in after or key not in before:
+            print(f"{key:>42} {'-':>10} {'-':>10} {'-':>8}  {'missing' if key not in after else 'new'}")
+            continue
+        old, new = before[key]["min_s"], after[key]["min_s"]
+        change = new / old - 1 if old else 0.0
+        status = "ok"
+        if change > threshold and new - old > min_delta:
+            status = "REGRESSION"
+            regressions.append(key)
+        elif change < -threshold and old - new > min_delta:
+            status = "faster"
+        print(f"{key:>42} {old * 1000:>10.2f} {new * 1000:>10.2f} {change:>+8.1%}  {status}")
+    print(f"\n{len(regressions)} regression(s) above {threshold:.0%}" if regressions
+          else f"\nNo regressions above {threshold:.0%}")
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and save the results as JSON")
+    run_parser.add_argument("--quick", action="store_true", help="smaller sizes and 3 rounds")
+    run_parser.add_argument("--only", help=f"comma-separated cases: {', '.join(CASES)}")
+    run_parser.add_argument("--rounds", type=int, help="timed rounds per case (default 5, 3 with --quick)")
+    run_parser.add_argument("--save", default=DEFAULT_RESULTS, help="results file")
+    run_parser.add_argument("--baseline", help="compare the results against this file")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = commands.add_parser("compare", help="flag regressions of a results file against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slowdown of the fastest round to flag (default 0.15)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(1 if compare(load(args.baseline), load(args.current), args.threshold) else 0)
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s) {', '.join(unknown)}; available: {', '.join(CASES)}")
+    logging.disable(logging.WARNING)
+    print(f"{'case':>42} {'min ms':>10} {'median ms':>10} {'items/s':>10}")
+    current = run_suite(names, args.quick, args.rounds or (3 if args.quick else 5))
+    os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+    with open(args.save, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"\nSaved {args.save}")
+    if args.baseline:
+        print()
+        sys.exit(1 if compare(load(args.baseline), current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
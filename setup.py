@@ -13,6 +13,18 @@ setup(
         "python-dotenv",
         "PyPDF2",
         "pandas",
+        "numpy",
+        "reportlab",
+        "openpyxl",
     ],
-    packages=find_packages()
+    extras_require={
+        # Parquet and Arrow IPC outputs (mcqgen --formats parquet,arrow, QuizTable.write)
+        "arrow": ["pyarrow"],
+    },
+    packages=find_packages(),
+    entry_points={
+        "console_scripts": [
+            "mcqgen=src.mcqgenerator.cli:main",
+        ],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""Registry of chat-model backends the pipeline can run on.
+
+The backend is picked by name (``MCQGEN_BACKEND``, default ``groq``):
+
+- ``groq``: ChatGroq, the production model, behind the client-side rate
+  limiter in rate_limit.py (``MCQGEN_RATE_LIMIT=0`` turns it off)
+- ``langchain``: any LangChain chat model, given as ``model_class="package.module:ClassName"``
+- ``fake``: a deterministic offline model for load tests and benchmarks
+  (``MCQGEN_FAKE_LATENCY``, ``MCQGEN_FAKE_TOKENS_PER_SECOND``,
+  ``MCQGEN_FAKE_ERROR_RATE``, ``MCQGEN_FAKE_TAIL_RATE``,
+  ``MCQGEN_FAKE_TAIL_LATENCY`` and ``MCQGEN_FAKE_VARY`` tune it)
+- ``replay``: answers with the responses recorded in a request journal
+  (``journal="path.jsonl"`` or ``MCQGEN_REPLAY_JOURNAL``)
+"""
+import importlib
+import os
+
+DEFAULT_BACKEND = "groq"
+DEFAULT_GROQ_MODEL = "llama-3.3-70b-versatile"
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """Decorator that registers a factory returning a LangChain chat model"""
+    def decorator(factory):
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def create_backend(name=None, **params):
+    """Create the chat model for backend `name` (defaults to $MCQGEN_BACKEND)"""
+    name = name or os.getenv("MCQGEN_BACKEND", DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise Exception(f"Unknown LLM backend '{name}'. Available backends: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name](**params)
+
+
+def model_id(llm):
+    """Name that identifies the model behind `llm` (used in cache keys and metrics)"""
+    for attr in ("model_name", "model"):
+        value = getattr(llm, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(llm).__name__
+
+
+@register_backend("groq")
+def groq_backend(model_name=None, **params):
+    from langchain_groq import ChatGroq
+    from dotenv import load_dotenv
+
+    from .rate_limit import get_rate_limiter
+
+    load_dotenv()
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        params.setdefault("http_client", limiter.http_client())
+        params.setdefault("http_async_client", limiter.async_http_client())
+    return ChatGroq(
+        groq_api_key=os.getenv("GROQ_API_KEY"),  # Ensure this is in your .env file
+        model_name=model_name or os.getenv("MCQGEN_MODEL", DEFAULT_GROQ_MODEL),
+        **params
+    )
+
+
+@register_backend("langchain")
+def langchain_backend(model_class=None, **params):
+    model_class = model_class or os.getenv("MCQGEN_MODEL_CLASS")
+    if not model_class:
+        raise Exception("The langchain backend needs model_class='package.module:ClassName'")
+    module_name, _, class_name = model_class.replace(":", ".").rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)(**params)
+
+
+@register_backend("fake")
+def fake_backend(**params):
+    from .fake_llm import FakeQuizChatModel
+
+    # Latency and token rate can also come from the environment for load tests
+    params.setdefault("latency", float(os.getenv("MCQGEN_FAKE_LATENCY", "0")))
+    params.setdefault("tokens_per_second", float(os.getenv("MCQGEN_FAKE_TOKENS_PER_SECOND", "0")))
+    params.setdefault("error_rate", float(os.getenv("MCQGEN_FAKE_ERROR_RATE", "0")))
+    params.setdefault("tail_rate", float(os.getenv("MCQGEN_FAKE_TAIL_RATE", "0")))
+    params.setdefault("tail_latency", float(os.getenv("MCQGEN_FAKE_TAIL_LATENCY", "0")))
+    params.setdefault("vary_per_call", os.getenv("MCQGEN_FAKE_VARY", "0").lower() in ("1", "true", "on"))
+    return FakeQuizChatModel(**params)
+
+
+@register_backend("replay")
+def replay_backend(journal=None, **params):
+    from .fake_llm import ReplayChatModel
+    from .journal import recorded_responses
+
+    journal = journal or os.getenv("MCQGEN_REPLAY_JOURNAL")
+    if not journal:
+        raise Exception("The replay backend needs journal='path/to/journal.jsonl'")
+    params.setdefault("latency", float(os.getenv("MCQGEN_FAKE_LATENCY", "0")))
+    return ReplayChatModel(responses=recorded_responses(journal), **params)
@@ -0,0 +1,62 @@
+"""Concurrent batch generation of quizzes for many documents at once."""
+import asyncio
+import json
+import logging
+
+from .mcqgenerator import get_chains, load_response_json
+from .rate_limit import BATCH, request_priority
+
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_ATTEMPTS = 5
+
+
+def rate_limit_errors():
+    """Exception types that should be retried with backoff (HTTP 429 from Groq)"""
+    try:
+        from groq import RateLimitError
+    except ImportError:
+        return ()
+    return (RateLimitError,)
+
+
+def job_inputs(job):
+    """Turn a (text, number, subject, tone) tuple or a dict into chain inputs"""
+    if isinstance(job, dict):
+        inputs = dict(job)
+    else:
+        text, number, subject, tone = job
+        inputs = {"text": text, "number": number, "subject": subject, "tone": tone}
+    inputs.setdefault("RESPONSE_JSON", json.dumps(load_response_json()))
+    return inputs
+
+
+async def generate_quizzes_async(jobs, max_concurrency=DEFAULT_MAX_CONCURRENCY, chain=None,
+                                 max_attempts=MAX_ATTEMPTS, retry_on=None, return_exceptions=False):
+    """Run many quiz jobs concurrently and return the responses in input order.
+
+    At most `max_concurrency` jobs are in flight at a time. Rate-limit errors are
+    retried with jittered exponential backoff, up to `max_attempts` tries per job.
+    """
+    chain = chain or get_chains().generate_evaluate_chain
+    retry_on = rate_limit_errors() if retry_on is None else tuple(retry_on)
+    if retry_on:
+        chain = chain.with_retry(
+            retry_if_exception_type=retry_on,
+            wait_exponential_jitter=True,
+            stop_after_attempt=max_attempts,
+        )
+
+    inputs = [job_inputs(job) for job in jobs]
+    logging.info(f"Generating {len(inputs)} quizzes with max_concurrency={max_concurrency}")
+    # Batch requests yield to interactive ones at the client-side rate limiter
+    with request_priority(BATCH):
+        return await chain.abatch(
+            inputs,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=return_exceptions,
+        )
+
+
+def generate_quizzes(jobs, max_concurrency=DEFAULT_MAX_CONCURRENCY, **kwargs):
+    """Blocking wrapper around generate_quizzes_async"""
+    return asyncio.run(generate_quizzes_async(jobs, max_concurrency=max_concurrency, **kwargs))
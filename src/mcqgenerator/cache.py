@@ -0,0 +1,171 @@
+"""Persistent, content-addressed cache for LLM chain responses."""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+_hit_lists = contextvars.ContextVar("mcqgen_cache_hits", default=())
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different extractions share a cache entry"""
+    return re.sub(r'\s+', ' ', str(text)).strip()
+
+
+def cache_key(**fields):
+    """Hash the given fields (text is normalized) into a stable cache key"""
+    payload = {name: normalize_text(value) for name, value in fields.items()}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache with LRU eviction, a TTL and hit/miss counters."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Connect on first use so importing the module never touches the disk
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # Every get() commits an access time; WAL without a per-commit fsync keeps that cheap
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Evict the least recently used entries beyond max_entries
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+        }
+
+
+@contextmanager
+def cache_hits():
+    """Collect the (inputs, response) of every cache hit inside the block.
+
+    Callers use it to count only real model calls; chunk batches and deferred
+    reviews report here too, since they run in copies of the caller's context.
+    """
+    hits = []
+    token = _hit_lists.set(_hit_lists.get() + (hits,))
+    try:
+        yield hits
+    finally:
+        _hit_lists.reset(token)
+
+
+def record_hit(inputs, response):
+    for hits in _hit_lists.get():
+        hits.append((inputs, response))
+
+
+def with_cache(chain, cache, key_fields, cacheable=None):
+    """Wrap a string-output chain so responses are served from `cache` when possible.
+
+    `key_fields(inputs)` returns the dict of fields that identify a response.
+    Pass {"configurable": {"bypass_cache": True}} in the run config to skip the
+    lookup; the fresh response still replaces the cached one. Responses for
+    which `cacheable(response)` is false (e.g. truncated JSON) are not stored.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def lookup(inputs, config):
+        key = cache_key(**key_fields(inputs))
+        if (config or {}).get("configurable", {}).get("bypass_cache", False):
+            return key, None
+        cached = cache.get(key)
+        if cached is not None:
+            logging.info(f"Response cache hit {key[:12]}")
+            record_hit(inputs, cached)
+        return key, cached
+
+    def store(key, result):
+        if cacheable is None or cacheable(result):
+            cache.set(key, result)
+        else:
+            logging.info(f"Not caching response {key[:12]}: rejected by {cacheable.__name__}")
+
+    def invoke(inputs, config):
+        key, cached = lookup(inputs, config)
+        if cached is not None:
+            return cached
+        result = chain.invoke(inputs, config)
+        store(key, result)
+        return result
+
+    async def ainvoke(inputs, config):
+        key, cached = lookup(inputs, config)
+        if cached is not None:
+            return cached
+        result = await chain.ainvoke(inputs, config)
+        store(key, result)
+        return result
+
+    return RunnableLambda(invoke, afunc=ainvoke)
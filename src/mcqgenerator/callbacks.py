@@ -0,0 +1,168 @@
+"""LangChain callback handlers for the LCEL pipeline stages.
+
+A stage is any runnable whose run name is in `stages` (the chains are named
+with .with_config(run_name=...) in mcqgenerator.py). StageCallbackHandler
+reports stages to metrics.MetricsRecorder, adding the time to first token and
+token usage of nested chat-model calls; JournalCallbackHandler records their
+raw outputs in the request journal.
+"""
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .journal import prompt_hash
+from .metrics import current_run_id
+
+
+def usage_from_result(response):
+    """(prompt_tokens, completion_tokens) from an LLMResult, or (None, None) if the model sent none"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("prompt_tokens") is not None:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    prompt_tokens = completion_tokens = None
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class StageCallbackHandler(BaseCallbackHandler):
+    """Records wall time, time to first token and token usage of named pipeline stages."""
+
+    # The events only update a few dicts under a lock; on async runs (hedging, batch.py) this
+    # avoids a trip through the default executor for every streamed token
+    run_inline = True
+
+    def __init__(self, recorder, stages=("quiz_chain", "review_chain", "fused_chain", "structured_quiz_chain")):
+        self.recorder = recorder
+        self.stages = frozenset(stages)
+        self._lock = threading.Lock()
+        self._parents = {}
+        self._open = {}
+
+    def _stage_of(self, run_id):
+        # Walk up to the nearest enclosing stage run
+        while run_id is not None and run_id not in self._open:
+            run_id = self._parents.get(run_id)
+        return self._open.get(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            if kwargs.get("name") in self.stages and self._stage_of(parent_run_id) is None:
+                self._open[run_id] = {
+                    "stage": kwargs["name"], "start": time.perf_counter(), "run": current_run_id(),
+                    "first_token": None, "prompt_tokens": 0, "completion_tokens": 0, "streamed": 0,
+                }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def on_llm_new_token(self, token, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            stage = self._stage_of(run_id)
+            if stage is not None:
+                if stage["first_token"] is None:
+                    stage["first_token"] = time.perf_counter()
+                stage["streamed"] += 1
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        prompt_tokens, completion_tokens = usage_from_result(response)
+        with self._lock:
+            stage = self._stage_of(run_id)
+            self._parents.pop(run_id, None)
+            if stage is not None:
+                stage["prompt_tokens"] += prompt_tokens or 0
+                # Without usage metadata, count streamed chunks as completion tokens
+                stage["completion_tokens"] += stage["streamed"] if completion_tokens is None else completion_tokens
+                stage["streamed"] = 0
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents.pop(run_id, None)
+
+    def _finish(self, run_id, error=None):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            stage = self._open.pop(run_id, None)
+        if stage is None:
+            return
+        first_token = stage["first_token"]
+        self.recorder.record(
+            stage["stage"],
+            time.perf_counter() - stage["start"],
+            ttft_s=None if first_token is None else first_token - stage["start"],
+            prompt_tokens=stage["prompt_tokens"],
+            completion_tokens=stage["completion_tokens"],
+            error=error,
+            run_id=stage["run"],
+        )
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._finish(run_id, str(error)[:200])
+
+
+class JournalCallbackHandler(BaseCallbackHandler):
+    """Adds the raw output of each stage in `prompts` to the journal, keyed by its prompt hash.
+
+    Outputs are taken at the stage level, so cached responses are journaled
+    too and replay sees the same prompts as the original run.
+    """
+
+    run_inline = True
+
+    def __init__(self, journal, prompts):
+        self.journal = journal
+        self.prompts = prompts
+        self._lock = threading.Lock()
+        self._parents = {}
+        self._open = {}
+
+    def _in_stage(self, run_id):
+        while run_id is not None:
+            if run_id in self._open:
+                return True
+            run_id = self._parents.get(run_id)
+        return False
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            if kwargs.get("name") in self.prompts and not self._in_stage(parent_run_id):
+                output_mode = (metadata or {}).get("output", "text")
+                self._open[run_id] = (kwargs["name"], output_mode, inputs, current_run_id(), time.perf_counter())
+
+    def _finish(self, run_id, output_text=None, inputs=None):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            opened = self._open.pop(run_id, None)
+        if opened is None or output_text is None:
+            return
+        stage, output_mode, start_inputs, run, start = opened
+        # Streamed runs only know their inputs once the stream has finished
+        inputs = inputs if isinstance(inputs, dict) else start_inputs
+        self.journal.add_call(run, {
+            "stage": stage,
+            "prompt_hash": prompt_hash(self.prompts[stage].format(**inputs)),
+            "output_mode": output_mode,
+            "output": output_text,
+            "wall_s": round(time.perf_counter() - start, 6),
+        })
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._finish(run_id, outputs if isinstance(outputs, str) else None, kwargs.get("inputs"))
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._finish(run_id)
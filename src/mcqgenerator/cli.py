@@ -0,0 +1,245 @@
+"""Headless command line for generating quizzes from whole directories of documents.
+
+    mcqgen run docs/ --subject Biology --number 10 --tone Medium --workers 4
+
+Text is extracted in a process pool, quizzes are generated with bounded
+concurrency and written as CSV/XLSX/JSON/PDF (and optionally JSONL, Moodle GIFT,
+QTI, Parquet or Arrow IPC) to <document>.quiz.<ext> in the output directory
+(docs/x.pdf gives x.pdf.quiz.csv, ...). Every finished document is appended to a manifest, so rerunning the
+same command after a crash skips the work that is already done.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+DOCUMENT_EXTENSIONS = (".pdf", ".txt")
+OUTPUT_FORMATS = ("csv", "xlsx", "json", "pdf", "jsonl", "gift", "qti", "parquet", "arrow")
+DEFAULT_FORMATS = OUTPUT_FORMATS[:4]
+# Written through QuizTable.write, which needs the optional pyarrow
+ARROW_FORMATS = ("parquet", "arrow")
+MANIFEST_NAME = "manifest.jsonl"
+# Outputs keep the source extension, so x.pdf and x.txt in one directory don't overwrite each other
+OUTPUT_SUFFIX = ".quiz"
+
+
+def find_documents(root):
+    """PDF and TXT files under `root` (or `root` itself), in a stable order"""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for directory, _, files in os.walk(root):
+        found.extend(os.path.join(directory, name) for name in files if name.lower().endswith(DOCUMENT_EXTENSIONS))
+    return sorted(found)
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_document(path, max_pages=None, digest=None, workers=1):
+    """Extract one document (runs in a worker process) into an Extraction, going through the extraction cache"""
+    from .mcqgenerator import get_extraction_cache
+
+    with open(path, "rb") as f:
+        data = f.read()
+    return get_extraction_cache().get_or_extract(path, data, max_pages, digest=digest, workers=workers)
+
+
+class Manifest:
+    """Append-only JSONL record of finished documents, used to resume interrupted runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a half-written last line
+                        continue
+                    self.entries[entry["document"]] = entry
+
+    def is_done(self, document, digest, params):
+        entry = self.entries.get(document)
+        return bool(entry) and entry["status"] == "done" and entry["digest"] == digest and entry["params"] == params
+
+    def add(self, entry):
+        self.entries[entry["document"]] = entry
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def write_outputs(base, result, formats, subject, tone):
+    """Write the quiz in each format to base.<ext> and return the written paths"""
+    from .exporters import EXPORT_FORMATS, export
+    from .pdf_export import render_quiz_pdf
+    from .quiz_table import quiz_table
+    from .utils import parse_quiz_json
+
+    table = quiz_table(result["quiz"])
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    review = result.get("review") or ""
+    written = []
+    for fmt in formats:
+        path = base + EXPORT_FORMATS[fmt][0] if fmt in EXPORT_FORMATS else f"{base}.{fmt}"
+        if fmt in ("gift", "qti"):
+            export(table, path, fmt, **({"category": subject} if fmt == "gift" else {"title": subject}))
+        elif fmt in EXPORT_FORMATS:
+            export(table, path, fmt)
+        elif fmt == "json":
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"quiz": parse_quiz_json(result["quiz"]), "review": review,
+                           "metrics": result.get("metrics", {})}, f, indent=2)
+        elif fmt == "pdf":
+            pdf_bytes = render_quiz_pdf(table.table_rows(), review, subject, len(table), tone, datetime.now())
+            with open(path, "wb") as f:
+                f.write(pdf_bytes)
+        else:
+            table.write(path)
+        written.append(path)
+    return written
+
+
+def generate_document(text, args, document=None, page_offsets=None):
+    from .hedging import Hedge
+    from .mcqgenerator import TEMPLATE, generate_incremental, generate_quiz, load_response_json
+    from .prompting import build_quiz_inputs
+    from .rate_limit import BATCH, request_priority
+
+    inputs = build_quiz_inputs(text, args.number, args.subject, args.tone, load_response_json(), TEMPLATE,
+                               page_offsets=page_offsets)
+    hedge = Hedge(args.hedge, args.hedge_deadline, args.hedge_max_tokens) if args.hedge else None
+    # Interactive requests from the app go ahead of these at the rate limiter
+    with request_priority(BATCH):
+        if args.incremental and document:
+            return generate_incremental(inputs, document, mode=args.mode, output=args.output_mode, hedge=hedge)
+        return generate_quiz(inputs, mode=args.mode, output=args.output_mode, hedge=hedge)
+
+
+def run(args):
+    documents = find_documents(args.source)
+    root = args.source if os.path.isdir(args.source) else os.path.dirname(args.source)
+    os.makedirs(args.out, exist_ok=True)
+    manifest = Manifest(os.path.join(args.out, MANIFEST_NAME))
+    params = {"subject": args.subject, "number": args.number, "tone": args.tone, "mode": args.mode}
+    if args.output_mode != "text":
+        params["output"] = args.output_mode
+
+    pending = []
+    for path in documents:
+        document = os.path.relpath(path, root)
+        digest = file_digest(path)
+        if not manifest.is_done(document, digest, params):
+            pending.append((document, path, digest))
+    print(f"{len(documents)} document(s), {len(documents) - len(pending)} already done, {len(pending)} to go",
+          file=sys.stderr)
+
+    done = failed = 0
+    start = time.perf_counter()
+    # Bounded batches keep at most a few extracted texts in memory at once
+    batch_size = max(args.workers, args.concurrency) * 2
+    with ProcessPoolExecutor(max_workers=args.workers) as extractors, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as generators:
+        for offset in range(0, len(pending), batch_size):
+            batch = pending[offset:offset + batch_size]
+            # With fewer documents than workers (e.g. one long PDF), the spare workers split pages instead
+            page_workers = max(1, args.workers // len(batch))
+            extractions = [extractors.submit(extract_document, path, args.max_pages, digest, page_workers)
+                           for _, path, digest in batch]
+            generations = []
+            for (document, path, digest), extraction in zip(batch, extractions):
+                generations.append(generators.submit(
+                    lambda e=extraction, d=document: generate_document(e.result().text, args, d,
+                                                                       e.result().page_offsets)))
+
+            for (document, path, digest), generation in zip(batch, generations):
+                entry = {"document": document, "digest": digest, "params": params, "finished": time.time()}
+                try:
+                    result = generation.result()
+                    base = os.path.join(args.out, document + OUTPUT_SUFFIX)
+                    entry.update(status="done", outputs=write_outputs(base, result, args.formats, args.subject,
+                                                                      args.tone))
+                    done += 1
+                except Exception as e:
+                    logging.exception(f"Failed to generate a quiz for {path}")
+                    entry.update(status="failed", error=str(e)[:500])
+                    failed += 1
+                manifest.add(entry)
+                print(f"[{done + failed}/{len(pending)}] {entry['status']}: {document}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Finished {done} document(s), {failed} failed in {elapsed:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def formats_arg(value):
+    formats = tuple(fmt.strip().lower() for fmt in value.split(",") if fmt.strip())
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown format(s): {', '.join(unknown)}")
+    arrow = [fmt for fmt in formats if fmt in ARROW_FORMATS]
+    if arrow:
+        from .quiz_table import PYARROW_MISSING, has_pyarrow
+
+        if not has_pyarrow():
+            # Fail before any document is processed rather than with an ImportError after generating
+            raise argparse.ArgumentTypeError(f"{'/'.join(arrow)} output: {PYARROW_MISSING}")
+    return formats
+
+
+def build_parser():
+    from .mcqgenerator import GENERATION_MODES, OUTPUT_MODES
+
+    parser = argparse.ArgumentParser(prog="mcqgen", description="Generate MCQ quizzes from documents")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="generate a quiz for every PDF/TXT file in a directory")
+    run_cmd.add_argument("source", help="directory (searched recursively) or a single document")
+    run_cmd.add_argument("--subject", required=True)
+    run_cmd.add_argument("--number", type=int, default=10, help="MCQs per document")
+    run_cmd.add_argument("--tone", default="Medium", help="complexity level")
+    run_cmd.add_argument("--mode", choices=GENERATION_MODES, default="standard", help="review mode")
+    run_cmd.add_argument("--output-mode", choices=OUTPUT_MODES, default="text",
+                         help="free-text responses or the model's structured output")
+    run_cmd.add_argument("--hedge", type=int, help="race up to N quiz generations (default: $MCQGEN_HEDGE_N)")
+    run_cmd.add_argument("--hedge-deadline", type=float,
+                         help="start the next hedged generation after this many seconds without a first token "
+                              "(default: start all N at once)")
+    run_cmd.add_argument("--hedge-max-tokens", type=int, help="token ceiling for all hedged generations")
+    run_cmd.add_argument("--incremental", action="store_true",
+                         help="keep the MCQs of unchanged sections of documents generated before (by relative path)")
+    run_cmd.add_argument("--out", default="mcqgen-output", help="output directory (holds the resume manifest)")
+    run_cmd.add_argument("--formats", type=formats_arg, default=DEFAULT_FORMATS,
+                         help=f"comma-separated output formats out of {','.join(OUTPUT_FORMATS)} "
+                              f"(default: {','.join(DEFAULT_FORMATS)})")
+    run_cmd.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="text extraction processes")
+    run_cmd.add_argument("--concurrency", type=int, default=4, help="documents generated at the same time")
+    run_cmd.add_argument("--max-pages", type=int, help="only read the first pages of each PDF")
+    return parser
+
+
+def main(argv=None):
+    from .logger import configure_logging
+
+    configure_logging()
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Streaming quiz exporters: CSV, XLSX, JSONL, Moodle GIFT and IMS QTI 1.2.
+
+Every exporter reads MCQs one at a time and writes each question as soon as
+it is read, so exporting a 100k-question bank holds one row in memory rather
+than the whole document. Sources can be a QuizTable, a quiz dict or response
+string, Response.json-style MCQ dicts (such as QuestionBank.iter_query) or
+get_table_data rows. XLSX uses openpyxl's write-only mode, which streams rows
+to a temporary file until the workbook is zipped.
+
+    export(quiz_table(result["quiz"]), "quiz.xlsx")
+    with open("biology.gift.txt", "w", encoding="utf-8") as out:
+        write_gift(bank.iter_query(subject="Biology"), out, category="Biology")
+    for chunk in iter_export(bank.iter_query(), "qti"):  # e.g. a streamed HTTP response
+        ...
+"""
+import csv
+import io
+import json
+import re
+import tempfile
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+
+from .quiz_table import OPTION_COLUMN, QuizRow
+
+# format: (file suffix, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "jsonl": (".jsonl", "application/jsonl"),
+    "gift": (".gift.txt", "text/plain"),
+    "qti": (".qti.xml", "application/xml"),
+}
+# Rows per worksheet, header included; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+CHUNK_SIZE = 1 << 20
+
+_GIFT_ESCAPES = str.maketrans({char: "\\" + char for char in "\\~=#{}:"})
+
+
+def _mcqs(source):
+    """The MCQs of an export source, in order"""
+    if isinstance(source, (str, bytes)):
+        from .utils import parse_quiz_json
+
+        source = parse_quiz_json(source)
+    if isinstance(source, dict):
+        return source.values()
+    return source
+
+
+def parse_choices(choices):
+    """(key, value) pairs of a get_table_data "a -> x || b -> y" string"""
+    pairs = []
+    for choice in choices.split("||"):
+        key, arrow, value = choice.partition("->")
+        if arrow:
+            pairs.append((key.strip(), value.strip()))
+        elif choice.strip():
+            pairs.append((chr(ord("a") + len(pairs)), choice.strip()))
+    return tuple(pairs)
+
+
+def export_row(item):
+    """QuizRow of a QuizRow, a Response.json-style MCQ dict or a get_table_data row"""
+    if isinstance(item, QuizRow):
+        return item
+    if "Choices" in item:
+        return QuizRow(str(item.get("MCQ", "")), parse_choices(str(item["Choices"])), str(item.get("Correct", "")))
+    options = item.get("options", {})
+    options = tuple((str(key), str(value)) for key, value in options.items()) if isinstance(options, dict) else ()
+    return QuizRow(str(item.get("mcq", item.get("question", ""))), options,
+                   str(item.get("correct", item.get("answer", ""))))
+
+
+def correct_key(row):
+    """Option key of the row's correct answer (given as a key or as the option text), or None"""
+    correct = row.correct.strip().lower()
+    for key, value in row.options:
+        if correct == key.lower():
+            return key
+    for key, value in row.options:
+        if correct == value.strip().lower():
+            return key
+    return None
+
+
+def _extras(item, extra):
+    return [str(item.get(name, "")) if isinstance(item, dict) else "" for name in extra]
+
+
+def _table(mcqs, option_keys, extra):
+    """(header, cell lists) with one column per option key; keys default to a QuizTable's or the first MCQ's"""
+    if option_keys is None:
+        option_keys = getattr(mcqs, "option_keys", None)
+    records = ((export_row(item), _extras(item, extra)) for item in _mcqs(mcqs))
+    first = next(records, None)
+    if option_keys is None:
+        option_keys = [key for key, _ in first[0].options] if first else []
+    option_keys = list(option_keys)
+    header = ["MCQ", *(OPTION_COLUMN.format(key) for key in option_keys), "Correct", *extra]
+
+    def cells():
+        known = set(option_keys)
+        for number, (row, extras) in enumerate(chain([first] if first else [], records), 1):
+            options = dict(row.options)
+            unknown = options.keys() - known
+            if unknown:
+                raise Exception(f"Question {number} has option(s) {', '.join(sorted(unknown))} without a column; "
+                                f"pass option_keys to export them")
+            yield [row.mcq, *(options.get(key, "") for key in option_keys), row.correct, *extras]
+
+    return header, cells()
+
+
+def csv_chunks(mcqs, option_keys=None, extra=()):
+    header, cells = _table(mcqs, option_keys, extra)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in chain([header], cells):
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def jsonl_chunks(mcqs, extra=()):
+    for number, item in enumerate(_mcqs(mcqs), 1):
+        row = export_row(item)
+        record = {"no": str(number), "mcq": row.mcq, "options": dict(row.options), "correct": row.correct}
+        record.update(zip(extra, _extras(item, extra)))
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _gift_text(text):
+    # Blank lines end a GIFT question, so text goes on one line
+    return " ".join(text.translate(_GIFT_ESCAPES).split())
+
+
+def gift_chunks(mcqs, category=None):
+    """Moodle GIFT multiple-choice questions, one per blank-line separated block"""
+    if category:
+        yield f"$CATEGORY: {' '.join(category.split())}\n\n"
+    for number, item in enumerate(_mcqs(mcqs), 1):
+        row = export_row(item)
+        key = correct_key(row)
+        lines = [f"::Q{number}:: {_gift_text(row.mcq)} {{"]
+        if key is None:
+            lines.insert(0, f"// correct answer {_gift_text(row.correct)!r} is not one of the options")
+        lines.extend(f"\t{'=' if option == key else '~'}{_gift_text(value)}" for option, value in row.options)
+        yield "\n".join(lines) + "\n}\n\n"
+
+
+def _qti_text(text):
+    return f'<material><mattext texttype="text/plain">{escape(text)}</mattext></material>'
+
+
+def qti_chunks(mcqs, title="Quiz"):
+    """An IMS QTI 1.2 assessment (as imported by Canvas, Blackboard and other LMSs) of single-answer items"""
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<questestinterop xmlns="http://www.imsglobal.org/xsd/ims_qtiasiv1p2">\n'
+           f'<assessment ident="mcqgen_assessment" title={quoteattr(title)}>\n'
+           '<section ident="root_section">\n')
+    for number, item in enumerate(_mcqs(mcqs), 1):
+        row = export_row(item)
+        key = correct_key(row)
+        idents = {option: f"q{number}_{index}" for index, (option, _) in enumerate(row.options)}
+        labels = "".join(f'<response_label ident="{idents[option]}">{_qti_text(value)}</response_label>'
+                         for option, value in row.options)
+        scoring = ""
+        if key is not None:
+            scoring = (f'<respcondition continue="No"><conditionvar><varequal respident="response1">{idents[key]}'
+                       f'</varequal></conditionvar><setvar action="Set" varname="SCORE">100</setvar></respcondition>')
+        yield (f'<item ident="q{number}" title="Question {number}">'
+               '<itemmetadata><qtimetadata><qtimetadatafield><fieldlabel>question_type</fieldlabel>'
+               '<fieldentry>multiple_choice_question</fieldentry></qtimetadatafield></qtimetadata></itemmetadata>'
+               f'<presentation>{_qti_text(row.mcq)}<response_lid ident="response1" rcardinality="Single">'
+               f'<render_choice>{labels}</render_choice></response_lid></presentation>'
+               '<resprocessing><outcomes><decvar maxvalue="100" minvalue="0" varname="SCORE" vartype="Decimal"/>'
+               f'</outcomes>{scoring}</resprocessing></item>\n')
+    yield "</section>\n</assessment>\n</questestinterop>\n"
+
+
+def write_xlsx(mcqs, out, option_keys=None, extra=(), title="Quiz"):
+    """Write an XLSX workbook to a path or binary file handle with openpyxl's write-only mode"""
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    header, cells = _table(mcqs, option_keys, extra)
+    title = re.sub(r"[\[\]:*?/\\]", " ", title)[:24] or "Quiz"
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = 0
+    count = 0
+    for record in cells:
+        if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(title if sheet is None else f"{title} {len(workbook.worksheets) + 1}")
+            sheet.append(header)
+            sheet_rows = 1
+        sheet.append([ILLEGAL_CHARACTERS_RE.sub("", value) for value in record])
+        sheet_rows += 1
+        count += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(header)
+    workbook.save(out)
+    return count
+
+
+_TEXT_CHUNKS = {"csv": csv_chunks, "jsonl": jsonl_chunks, "gift": gift_chunks, "qti": qti_chunks}
+
+
+class _Counted:
+    __slots__ = ("items", "count")
+
+    def __init__(self, items):
+        self.items = items
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.items:
+            self.count += 1
+            yield item
+
+
+def _check_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise Exception(f"Unknown export format '{fmt}'. Use one of {', '.join(EXPORT_FORMATS)}")
+
+
+def iter_export(mcqs, fmt, **options):
+    """Yield the export in chunks: str for the text formats, bytes for xlsx"""
+    _check_format(fmt)
+    if fmt != "xlsx":
+        yield from _TEXT_CHUNKS[fmt](mcqs, **options)
+        return
+    # A zip file can't be written to a pipe, so the workbook goes through a temporary file
+    with tempfile.TemporaryFile() as f:
+        write_xlsx(mcqs, f, **options)
+        f.seek(0)
+        yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+
+def write_export(mcqs, out, fmt, **options):
+    """Write the export to an open file handle (binary for xlsx, text otherwise); returns the MCQs written"""
+    _check_format(fmt)
+    if fmt in ("csv", "xlsx") and options.get("option_keys") is None:
+        options["option_keys"] = getattr(mcqs, "option_keys", None)
+    counted = _Counted(_mcqs(mcqs))
+    if fmt == "xlsx":
+        return write_xlsx(counted, out, **options)
+    for chunk in _TEXT_CHUNKS[fmt](counted, **options):
+        out.write(chunk)
+    return counted.count
+
+
+def export_format(path):
+    """Export format of a file name, from its suffix"""
+    for fmt, (suffix, _) in EXPORT_FORMATS.items():
+        if path.endswith(suffix):
+            return fmt
+    for fmt in EXPORT_FORMATS:
+        if path.endswith(f".{fmt}"):
+            return fmt
+    raise Exception(f"Can't tell the export format of '{path}'. Use a {', '.join(EXPORT_FORMATS)} file name")
+
+
+def export(mcqs, path, fmt=None, **options):
+    """Write MCQs to `path` in `fmt` (by default from the suffix); returns the MCQs written"""
+    fmt = fmt or export_format(path)
+    _check_format(fmt)
+    if fmt == "xlsx":
+        return write_export(mcqs, path, fmt, **options)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        return write_export(mcqs, out, fmt, **options)
+
+
+def export_file(mcqs, fmt, **options):
+    """The export in a rewound binary temporary file (spilled to disk when large), e.g. for a download"""
+    f = tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE)
+    for chunk in iter_export(mcqs, fmt, **options):
+        f.write(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+    f.seek(0)
+    return f
+
+
+def write_csv(mcqs, out, option_keys=None, extra=()):
+    """CSV with the QuizTable.to_dataframe columns: MCQ, Option <key>..., Correct, then `extra`"""
+    return write_export(mcqs, out, "csv", option_keys=option_keys, extra=extra)
+
+
+def write_jsonl(mcqs, out, extra=()):
+    """One Response.json-style MCQ object per line"""
+    return write_export(mcqs, out, "jsonl", extra=extra)
+
+
+def write_gift(mcqs, out, category=None):
+    """Moodle GIFT questions, optionally under a $CATEGORY"""
+    return write_export(mcqs, out, "gift", category=category)
+
+
+def write_qti(mcqs, out, title="Quiz"):
+    """IMS QTI 1.2 assessment XML"""
+    return write_export(mcqs, out, "qti", title=title)
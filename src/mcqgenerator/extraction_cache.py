@@ -0,0 +1,197 @@
+"""Content-addressed cache of extracted document text.
+
+Uploads are keyed by the SHA-256 of their bytes, so re-submitting the same PDF
+with a different MCQ count or tone skips PyPDF2 entirely. Entries hold the
+normalized text, the offset where each page starts and basic stats. Recent
+entries stay in memory; all of them go to a SQLite file shared by the
+Streamlit app and the CLI, which evicts the least recently used entries once
+the total text size passes `max_bytes`.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .metrics import timed
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+
+Extraction = namedtuple("Extraction", ["text", "page_offsets", "stats"])
+
+
+def data_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_extracted(text):
+    """Unify line endings and drop NUL characters some PDFs produce"""
+    return text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+
+
+@timed("extract")
+def extract(name, data, max_pages=None, workers=None):
+    """Extract an uploaded PDF/TXT document into an Extraction (no caching).
+
+    With workers > 1, the pages of long PDFs are extracted in a process pool.
+    """
+    from io import BytesIO
+
+    from .utils import _iter_pdf_pages_parallel, iter_pdf_pages
+
+    start = time.perf_counter()
+    if name.lower().endswith(".pdf"):
+        try:
+            if workers and workers > 1:
+                raw_pages = _iter_pdf_pages_parallel(data, workers, max_pages)
+            else:
+                raw_pages = iter_pdf_pages(BytesIO(data), max_pages)
+            pages = [normalize_extracted(page) for page in raw_pages]
+        except Exception as e:
+            raise Exception(f"Error reading PDF file: {e}")
+    elif name.lower().endswith(".txt"):
+        pages = [normalize_extracted(data.decode("utf-8"))]
+    else:
+        raise Exception("Unsupported file format. Please upload a PDF or TXT file.")
+
+    offsets = []
+    position = 0
+    for page in pages:
+        offsets.append(position)
+        position += len(page)
+    text = "".join(pages)
+    stats = {
+        "pages": len(pages),
+        "chars": len(text),
+        "words": len(text.split()),
+        "file_bytes": len(data),
+        "extract_s": round(time.perf_counter() - start, 4),
+    }
+    return Extraction(text, offsets, stats)
+
+
+class ExtractionCache:
+    """Two-level (memory + SQLite) cache of Extractions keyed by file digest, bounded by total bytes."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, memory_bytes=DEFAULT_MEMORY_BYTES, workers=None):
+        self.path = path
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # The CLI's extraction processes share this file, so wait for locks and use WAL
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, page_offsets TEXT NOT NULL, "
+                "stats TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, extraction, size=None):
+        # Sized in UTF-8 bytes like the disk tier, so non-ASCII text counts what it weighs
+        size = len(extraction.text.encode("utf-8")) if size is None else size
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= self._memory.pop(key)[1]
+        self._memory[key] = (extraction, size)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_size -= evicted_size
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key][0]
+            conn = self._connect()
+            row = conn.execute("SELECT text, page_offsets, stats, size FROM extractions WHERE key = ?",
+                               (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE extractions SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            extraction = Extraction(row[0], json.loads(row[1]), json.loads(row[2]))
+            self._remember(key, extraction, row[3])
+            self.hits += 1
+            return extraction
+
+    def set(self, key, extraction):
+        size = len(extraction.text.encode("utf-8"))
+        with self._lock:
+            self._remember(key, extraction, size)
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, text, page_offsets, stats, size, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, extraction.text, json.dumps(extraction.page_offsets), json.dumps(extraction.stats),
+                 size, time.time()),
+            )
+            # Evict the least recently used entries until the total size fits
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in conn.execute(
+                        "SELECT key, size FROM extractions WHERE key != ? ORDER BY accessed", (key,)).fetchall():
+                    if total - evicted <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM extractions WHERE key = ?", (old_key,))
+                    self._memory.pop(old_key, None)
+                    evicted += old_size
+                self._memory_size = sum(size for _, size in self._memory.values())
+            conn.commit()
+
+    def get_or_extract(self, name, data, max_pages=None, digest=None, workers=None):
+        """The cached Extraction of a document's bytes, extracting it on a miss (in `workers` processes)"""
+        key = f"{digest or data_digest(data)}:{max_pages or ''}"
+        extraction = self.get(key)
+        if extraction is None:
+            extraction = extract(name, data, max_pages, self.workers if workers is None else workers)
+            self.set(key, extraction)
+            logging.info(f"Extracted {name}: {extraction.stats}")
+        return extraction
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            conn = self._connect()
+            conn.execute("DELETE FROM extractions")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": size,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+            }
@@ -0,0 +1,225 @@
+"""Deterministic offline chat model for load tests and benchmarks."""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages.tool import invalid_tool_call, tool_call, tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def fake_quiz(prompt, digest="0"):
+    """Build a RESPONSE_JSON-shaped quiz for a quiz generation prompt"""
+    number_match = re.search(r'quiz of (\d+) multiple choice', prompt)
+    number = int(number_match.group(1)) if number_match else 3
+    text_match = re.search(r'Text:(.*?)You are an expert', prompt, re.DOTALL)
+    words = re.findall(r'[A-Za-z]{5,}', text_match.group(1) if text_match else prompt) or ["topic"]
+    offset = int(digest[:8], 16)
+
+    quiz = {}
+    for i in range(1, number + 1):
+        picks = [words[(offset + i * 7 + k * 13) % len(words)] for k in range(4)]
+        correct = "abcd"[(offset + i) % 4]
+        quiz[str(i)] = {
+            "no": str(i),
+            # Numbered from the digest so regenerated MCQs don't near-duplicate the first ones
+            "mcq": f"Which term best completes statement {offset % 1000 + i} about {picks[0]}?",
+            "options": {letter: f"{word} ({letter}{i})" for letter, word in zip("abcd", picks)},
+            "correct": correct,
+        }
+    return quiz
+
+
+def fake_review(prompt):
+    subject_match = re.search(r'\nfor (.*?) students', prompt)
+    subject = subject_match.group(1) if subject_match else "the"
+    return (f"Complexity analysis: the questions suit {subject} students. "
+            "They test recall of key terms from the text; no changes are needed.")
+
+
+def corrupt_quiz(content, kind, structured=False):
+    """A quiz response with one of the faults models produce: "truncated", "syntax" or "schema".
+
+    JSON mode and tool calling guarantee well-formed JSON, so a "syntax" fault
+    leaves a structured response unchanged.
+    """
+    if kind == "truncated":
+        return content[:int(len(content) * 0.7)]
+    if kind == "syntax":
+        # A trailing comma before the closing brace
+        return content if structured else content.rstrip()[:-1].rstrip() + ",\n}"
+    # The last MCQ's answer is not one of its options
+    data = json.loads(content)
+    items = data["mcqs"] if "mcqs" in data else list(data.values())
+    items[-1]["correct"] = "e"
+    return json.dumps(data, indent=2)
+
+
+FAULT_KINDS = ("truncated", "syntax", "schema")
+
+
+class FakeQuizChatModel(BaseChatModel):
+    """Offline chat model that answers quiz and review prompts deterministically.
+
+    Quiz prompts get a RESPONSE_JSON-shaped quiz with the requested number of
+    MCQs built from words in the source text; review prompts get a short
+    analysis. `latency` is the time to first token in seconds and
+    `tokens_per_second` the streaming rate (0 means instant). A fraction
+    `error_rate` of quiz (not fused) responses is corrupted (see corrupt_quiz). Bound
+    tools are answered with a call to the first one, whose arguments are
+    {"mcqs": [...]}.
+
+    A fraction `tail_rate` of calls waits `tail_latency` more seconds before
+    the first token. Faults and slow calls follow from the prompt, so a prompt
+    always gets the same answer, unless `vary_per_call` is set: then every
+    call draws them (and the quiz) afresh, like a sampling model.
+    """
+
+    model_name: str = "fake-quiz"
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    seed: int = 0
+    error_rate: float = 0.0
+    tail_rate: float = 0.0
+    tail_latency: float = 0.0
+    vary_per_call: bool = False
+
+    @property
+    def _llm_type(self):
+        return "mcqgen-fake"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _respond(self, messages, tools=None, response_format=None, **kwargs):
+        prompt = "\n".join(str(message.content) for message in messages)
+        nonce = uuid.uuid4().hex if self.vary_per_call else ""
+        digest = hashlib.sha256(f"{self.seed}:{nonce}{prompt}".encode("utf-8")).hexdigest()
+        if "Quiz_MCQs:" in prompt:
+            return prompt, fake_review(prompt)
+        if '"review": "<analysis>"' in prompt:
+            return prompt, json.dumps({"quiz": fake_quiz(prompt, digest), "review": fake_review(prompt)}, indent=2)
+        if tools:
+            content = json.dumps({"mcqs": list(fake_quiz(prompt, digest).values())}, indent=2)
+        else:
+            content = json.dumps(fake_quiz(prompt, digest), indent=2)
+        if int(digest[8:16], 16) / 0xFFFFFFFF < self.error_rate:
+            kind = FAULT_KINDS[int(digest[16:18], 16) % len(FAULT_KINDS)]
+            content = corrupt_quiz(content, kind, structured=bool(tools or response_format))
+        return prompt, content
+
+    def _message(self, prompt, content, tools=None, **kwargs):
+        input_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(content) // 4)
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        if not tools:
+            return AIMessage(content=content, usage_metadata=usage)
+        name = tools[0]["function"]["name"]
+        try:
+            calls = {"tool_calls": [tool_call(name=name, args=json.loads(content), id="call_0")]}
+        except json.JSONDecodeError as e:
+            calls = {"invalid_tool_calls": [invalid_tool_call(name=name, args=content, id="call_0", error=str(e))]}
+        return AIMessage(content="", usage_metadata=usage, **calls)
+
+    def _first_token_delay(self, prompt):
+        if not self.tail_rate:
+            return self.latency
+        if self.vary_per_call:
+            draw = random.random()
+        else:
+            draw = int(hashlib.sha256(f"tail:{self.seed}:{prompt}".encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return self.latency + (self.tail_latency if draw < self.tail_rate else 0.0)
+
+    def _token_delay(self, content):
+        if not self.tokens_per_second:
+            return 0.0
+        return (len(content) / 4) / self.tokens_per_second
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, content = self._respond(messages, **kwargs)
+        time.sleep(self._first_token_delay(prompt) + self._token_delay(content))
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, content, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, content = self._respond(messages, **kwargs)
+        await asyncio.sleep(self._first_token_delay(prompt) + self._token_delay(content))
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, content, **kwargs))])
+
+    def _chunks(self, prompt, content, tools=None, **kwargs):
+        name = tools[0]["function"]["name"] if tools else None
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        for index, piece in enumerate(pieces):
+            if tools:
+                # Tool call arguments stream as chunks of one call, named in the first
+                chunk = AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk(
+                    name=name if index == 0 else None, args=piece, id="call_0" if index == 0 else None, index=0)])
+            else:
+                chunk = AIMessageChunk(content=piece)
+            if index == len(pieces) - 1:
+                chunk = chunk + AIMessageChunk(content="", usage_metadata=self._message(prompt, content).usage_metadata)
+            yield ChatGenerationChunk(message=chunk)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, content = self._respond(messages, **kwargs)
+        time.sleep(self._first_token_delay(prompt))
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        # Paced against a schedule, so sleep overshoot (about 1 ms per asyncio timer) doesn't add up
+        due = time.monotonic()
+        for chunk in self._chunks(prompt, content, **kwargs):
+            if delay:
+                due += delay
+                time.sleep(max(0.0, due - time.monotonic()))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, content = self._respond(messages, **kwargs)
+        await asyncio.sleep(self._first_token_delay(prompt))
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        due = time.monotonic()
+        for chunk in self._chunks(prompt, content, **kwargs):
+            if delay:
+                due += delay
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class ReplayChatModel(FakeQuizChatModel):
+    """Offline chat model that answers each prompt with the response recorded in a request journal.
+
+    Prompts with no recorded response (e.g. a changed template) fall back to
+    the deterministic fake answer and are counted in `misses`.
+    """
+
+    model_name: str = "replay"
+    responses: dict = {}
+    misses: int = 0
+
+    @property
+    def _llm_type(self):
+        return "mcqgen-replay"
+
+    def _respond(self, messages, **kwargs):
+        from .journal import prompt_hash, response_key
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        output_mode = "function_calling" if kwargs.get("tools") else "json_mode" if kwargs.get("response_format") else "text"
+        recorded = self.responses.get(response_key(prompt_hash(prompt), output_mode))
+        if recorded is None:
+            self.misses += 1
+            return super()._respond(messages, **kwargs)
+        return prompt, recorded
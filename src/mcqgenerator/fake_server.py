@@ -0,0 +1,160 @@
+"""Local stand-in for the Groq chat completions API, rate limits included.
+
+Answers /openai/v1/chat/completions (plain and streamed) with the fake quiz
+and review from fake_llm.py, enforces requests/min and tokens/min with the
+same token buckets the client uses, sends Groq's x-ratelimit-* headers and
+returns 429 with retry-after when a limit is hit. Point the groq backend at it
+to exercise the client-side rate limiter without network access:
+
+    python -m mcqgenerator.fake_server --port 8765 --rpm 30 --tpm 6000
+    GROQ_API_BASE=http://127.0.0.1:8765 GROQ_API_KEY=test streamlit run StreamlitAPP.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .fake_llm import fake_quiz, fake_review
+from .rate_limit import TokenBucket
+from .utils import estimate_tokens
+
+
+def fake_completion(prompt):
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    if "Quiz_MCQs:" in prompt:
+        return fake_review(prompt)
+    return json.dumps(fake_quiz(prompt, digest), indent=2)
+
+
+class FakeGroqServer:
+    """Threaded HTTP server with Groq-style rate limits; `base_url` is set once started."""
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000, latency=0.0, host="127.0.0.1", port=0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.served = 0
+        self.rate_limited = 0
+        self.base_url = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _admit(self, tokens):
+        """(admitted, headers) for a request of `tokens` tokens"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait <= 0:
+                self.requests.take(1, now)
+                self.tokens.take(tokens, now)
+                self.served += 1
+            else:
+                self.rate_limited += 1
+            headers = {}
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                headers[f"x-ratelimit-limit-{kind}"] = str(int(bucket.capacity))
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(bucket.level)))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{(bucket.capacity - bucket.level) / bucket.rate:.2f}s"
+            if wait > 0:
+                headers["retry-after"] = str(math.ceil(wait))
+            return wait <= 0, headers
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, body, headers, content_type="application/json"):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, b'{"error": {"message": "not found"}}', {})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = "\n".join(str(message.get("content") or "") for message in request.get("messages", []))
+                content = fake_completion(prompt)
+                usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(content)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                admitted, headers = server._admit(usage["total_tokens"])
+                if not admitted:
+                    error = {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}
+                    self._send(429, json.dumps(error).encode("utf-8"), headers)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                base = {"id": completion_id, "created": int(time.time()), "model": request.get("model", "fake")}
+                if not request.get("stream"):
+                    body = {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                        "index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop",
+                    }]}
+                    self._send(200, json.dumps(body).encode("utf-8"), headers)
+                    return
+
+                events = []
+                for start in range(0, len(content), 16):
+                    delta = {"content": content[start:start + 16]}
+                    if start == 0:
+                        delta["role"] = "assistant"
+                    events.append({**base, "object": "chat.completion.chunk",
+                                   "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                events.append({**base, "object": "chat.completion.chunk", "x_groq": {"usage": usage},
+                               "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+                self._send(200, body.encode("utf-8"), headers, "text/event-stream")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.base_url = f"http://{self.host}:{self.port}"
+        threading.Thread(target=self._server.serve_forever, name="mcqgen-fake-groq", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mcqgenerator.fake_server",
+                                     description="Serve a rate-limited fake Groq API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=float, default=30, help="requests per minute")
+    parser.add_argument("--tpm", type=float, default=6000, help="tokens per minute")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    args = parser.parse_args(argv)
+
+    server = FakeGroqServer(args.rpm, args.tpm, args.latency, args.host, args.port).start()
+    print(f"Fake Groq API at {server.base_url} ({args.rpm:g} req/min, {args.tpm:g} tokens/min)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Hedged (speculative) quiz generation with best-of-N selection.
+
+One slow or malformed response shouldn't decide how long the user waits. A
+hedged generation streams up to `n` candidate responses to the same prompt:
+all at once, or (with a `deadline`) one more whenever the newest candidate
+has produced no token `deadline` seconds after it started, or a finished one
+fails the checks. The first response that parses and whose MCQs all pass the
+schema and duplicate checks wins; the other streams are cancelled (they run
+as asyncio tasks, so even one still waiting for its first token stops), which
+ends the model calls. `max_tokens` is a cost ceiling: no candidate
+is started once the tokens already spent plus its estimate would exceed it.
+
+    quiz, stats = hedged_generate(chain, prompt, inputs, Hedge(n=3, deadline=1.5), response_json)
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from .metrics import get_metrics
+from .utils import estimate_tokens
+
+# deadline=None starts all n candidates at once; max_tokens=None means no ceiling
+Hedge = namedtuple("Hedge", ["n", "deadline", "max_tokens"], defaults=(2, None, None))
+# Completion tokens assumed per MCQ when checking a candidate against max_tokens
+COMPLETION_TOKENS_PER_MCQ = 120
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+class _Candidate:
+    __slots__ = ("index", "started", "first_token_s", "parts", "done", "error", "checked", "accepted", "task")
+
+    def __init__(self, index):
+        self.index = index
+        self.started = time.perf_counter()
+        self.first_token_s = None
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.checked = False
+        self.accepted = -1
+        self.task = None
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+
+def check_response(text, number, response_json):
+    """(valid MCQs in a quiz response, whether it has all `number` of them and nothing else)"""
+    from .utils import parse_quiz_json
+    from .validation import filter_quiz
+
+    try:
+        report = filter_quiz(parse_quiz_json(text), response_json)
+    except Exception:
+        return 0, False
+    return len(report.accepted), not report.rejected and len(report.accepted) >= number
+
+
+def hedged_generate(chain, prompt, inputs, hedge, response_json, config=None):
+    """Generate a quiz with up to hedge.n concurrent streams of `chain`; returns (quiz text, stats).
+
+    If no candidate passes the checks, the one with the most valid MCQs is
+    returned for validation to repair. Raises if every candidate failed.
+    """
+    # The caller's context carries the metrics run and the rate-limiter priority into the race
+    race = _in_context(contextvars.copy_context(), _race(chain, prompt, inputs, hedge, response_json, config))
+    return asyncio.run_coroutine_threadsafe(race, _hedge_loop()).result()
+
+
+def _hedge_loop():
+    """The event loop every race runs on, in a daemon thread.
+
+    One long-lived loop lets the model's async client keep its pooled
+    connections between calls, and callers that are already inside an event
+    loop don't start a nested one.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="mcqgen-hedge", daemon=True).start()
+        return _loop
+
+
+async def _in_context(context, coroutine):
+    # A task runs in a copy of the context it was created in
+    return await context.run(asyncio.ensure_future, coroutine)
+
+
+async def _race(chain, prompt, inputs, hedge, response_json, config):
+    number = int(inputs["number"])
+    prompt_tokens = estimate_tokens(prompt.format(**inputs))
+    estimate = prompt_tokens + COMPLETION_TOKENS_PER_MCQ * number
+    changed = asyncio.Event()
+    candidates = []
+    start = time.perf_counter()
+
+    async def run(candidate):
+        try:
+            async for text in chain.astream(inputs, config):
+                if not text:
+                    continue
+                candidate.parts.append(text)
+                if candidate.first_token_s is None:
+                    candidate.first_token_s = time.perf_counter() - candidate.started
+                    changed.set()
+        except Exception as e:
+            candidate.error = e
+        finally:
+            candidate.done = True
+            changed.set()
+
+    def spent():
+        return sum(prompt_tokens + estimate_tokens(candidate.text) for candidate in candidates)
+
+    def launch():
+        if len(candidates) >= hedge.n or (hedge.max_tokens and spent() + estimate > hedge.max_tokens):
+            return False
+        candidate = _Candidate(len(candidates))
+        candidates.append(candidate)
+        # A task per candidate, in a copy of the caller's context so it reports to its metrics run.
+        # Cancelling the task ends the model call wherever it is, even before the first token.
+        candidate.task = asyncio.create_task(run(candidate), name=f"mcqgen-hedge-{candidate.index}")
+        return True
+
+    winner = None
+    launch()
+    while hedge.deadline is None and launch():
+        pass
+    while winner is None:
+        for candidate in candidates:
+            if candidate.done and not candidate.checked:
+                candidate.checked = True
+                candidate.accepted, passed = check_response(candidate.text, number, response_json)
+                if candidate.error is None and passed:
+                    winner = candidate
+                    break
+                logging.info(f"Hedged candidate {candidate.index} failed "
+                             f"({candidate.error or f'{candidate.accepted}/{number} valid MCQs'})")
+                launch()
+        if winner is not None or (all(candidate.done for candidate in candidates) and not launch()):
+            break
+        timeout = None
+        newest = candidates[-1]
+        if hedge.deadline is not None and newest.first_token_s is None and not newest.done:
+            timeout = newest.started + hedge.deadline - time.perf_counter()
+            if timeout <= 0:
+                if launch():
+                    logging.info(f"No first token after {hedge.deadline}s, started hedged candidate "
+                                 f"{len(candidates) - 1}")
+                    continue
+                timeout = None
+        # Nothing changes between the checks above and here, so no wake-up is lost
+        changed.clear()
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    losers = [candidate for candidate in candidates if candidate is not winner and not candidate.done]
+    for candidate in losers:
+        candidate.task.cancel()
+    # Wait until the cancelled calls have actually stopped before counting what they generated
+    await asyncio.gather(*(candidate.task for candidate in candidates), return_exceptions=True)
+    cancelled = len(losers)
+    chosen = winner or max(candidates, key=lambda candidate: candidate.accepted)
+    completion_tokens = sum(estimate_tokens(candidate.text) for candidate in candidates)
+
+    if winner is None and chosen.accepted <= 0:
+        error = next((candidate.error for candidate in candidates if candidate.error is not None), None)
+        raise Exception(f"None of {len(candidates)} hedged candidates produced a usable quiz"
+                        + (f": {error}" if error else ""))
+
+    stats = {
+        "candidates": len(candidates),
+        "winner": winner.index if winner is not None else None,
+        "cancelled": cancelled,
+        "first_token_s": None if chosen.first_token_s is None else round(chosen.first_token_s, 6),
+        "prompt_tokens": prompt_tokens * len(candidates),
+        "completion_tokens": completion_tokens,
+        "wasted_tokens": prompt_tokens * (len(candidates) - 1) + completion_tokens - estimate_tokens(chosen.text),
+    }
+    get_metrics().record("hedge", time.perf_counter() - start, ttft_s=chosen.first_token_s,
+                         candidates=stats["candidates"], cancelled=cancelled, winner=stats["winner"])
+    return chosen.text, stats
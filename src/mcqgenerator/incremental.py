@@ -0,0 +1,227 @@
+"""Incremental quiz regeneration for revised documents.
+
+The quiz text is split into sections (paragraphs; long paragraphs are cut
+where a rolling hash over the last few words hits a boundary pattern, so an
+edit only moves the cuts next to it) and every section is fingerprinted.
+Each generated MCQ records the section it was written from. When a revised
+version of the same document comes in, its fingerprints are diffed against
+the stored version: MCQs from unchanged sections are kept, and quiz_chain
+only sees the new or edited sections (plus the least covered unchanged ones
+when those are too short for the MCQs to replace), so LLM cost scales with
+the diff.
+
+    result = generate_incremental(inputs, "notes.pdf")  # see mcqgenerator.py
+    result["incremental"]  # sections changed, MCQs kept and generated
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque, namedtuple
+
+from .cache import normalize_text
+from .prompting import _STOPWORDS, count_tokens
+
+# Paragraphs longer than this are cut at content-defined boundaries
+SECTION_CHARS = 1500
+MIN_SECTION_CHARS = 300
+MAX_SECTION_CHARS = 4000
+# Rolling hash over the last ROLLING_WINDOW words; a cut where its low bits are all set (1 word in 128)
+ROLLING_WINDOW = 8
+BOUNDARY_MASK = 127
+_BASE = 257
+_MOD = (1 << 61) - 1
+_BASE_POW = pow(_BASE, ROLLING_WINDOW - 1, _MOD)
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_WORDS = re.compile(r"\S+")
+_TERMS = re.compile(r"[A-Za-z]{3,}|\d+")
+
+Section = namedtuple("Section", ["start", "end", "fingerprint"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    document TEXT NOT NULL,
+    subject TEXT NOT NULL COLLATE NOCASE,
+    tone TEXT NOT NULL COLLATE NOCASE,
+    sections TEXT NOT NULL,
+    mcqs TEXT NOT NULL,
+    review TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL,
+    PRIMARY KEY (document, subject, tone)
+);
+"""
+
+
+def fingerprint(text):
+    """Stable 64-bit hash of a section's whitespace-normalized text"""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def content_cuts(text, start, end):
+    """Offsets in text[start:end] after which to cut, chosen by a rolling hash of the preceding words"""
+    cuts = []
+    window = deque()
+    rolling = 0
+    last = start
+    for match in _WORDS.finditer(text, start, end):
+        if len(window) == ROLLING_WINDOW:
+            rolling = (rolling - window.popleft() * _BASE_POW) % _MOD
+        word = zlib.crc32(match.group().encode("utf-8"))
+        rolling = (rolling * _BASE + word) % _MOD
+        window.append(word)
+        size = match.end() - last
+        if size >= MAX_SECTION_CHARS or (size >= MIN_SECTION_CHARS and rolling & BOUNDARY_MASK == BOUNDARY_MASK):
+            cuts.append(match.end())
+            last = match.end()
+    if cuts and end - cuts[-1] < MIN_SECTION_CHARS:
+        cuts.pop()
+    return cuts
+
+
+def _stripped(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_sections(text):
+    """Sections of `text` in order: paragraphs, with long ones cut at content-defined boundaries"""
+    sections = []
+    start = 0
+    for end in [match.start() for match in _PARAGRAPH_BREAK.finditer(text)] + [len(text)]:
+        paragraph_start, paragraph_end = _stripped(text, start, end)
+        start = end
+        if paragraph_start == paragraph_end:
+            continue
+        bounds = [paragraph_start]
+        if paragraph_end - paragraph_start > SECTION_CHARS:
+            bounds.extend(content_cuts(text, paragraph_start, paragraph_end))
+        bounds.append(paragraph_end)
+        for piece_start, piece_end in zip(bounds, bounds[1:]):
+            piece_start, piece_end = _stripped(text, piece_start, piece_end)
+            sections.append(Section(piece_start, piece_end, fingerprint(text[piece_start:piece_end])))
+    return sections
+
+
+def _terms(text):
+    return {term.lower() for term in _TERMS.findall(text)} - _STOPWORDS
+
+
+def attribute_mcqs(mcqs, text, sections, candidates=None):
+    """Index of the section each MCQ was most likely written from.
+
+    Scores the terms of the question and its correct answer against each
+    candidate section (all sections by default), weighting terms found in
+    few sections more. MCQs with no term in common go to the first candidate.
+    """
+    candidates = list(range(len(sections))) if candidates is None else list(candidates)
+    postings = defaultdict(list)
+    for index in candidates:
+        for term in _terms(text[sections[index].start:sections[index].end]):
+            postings[term].append(index)
+    attributed = []
+    for mcq in mcqs:
+        options = mcq.get("options") if isinstance(mcq.get("options"), dict) else {}
+        correct = str(mcq.get("correct", ""))
+        scores = defaultdict(float)
+        for term in _terms(f"{mcq.get('mcq', '')} {options.get(correct, correct)}"):
+            found = postings.get(term, ())
+            for index in found:
+                scores[index] += 1 / len(found)
+        attributed.append(max(scores, key=lambda index: (scores[index], -index)) if scores
+                          else (candidates[0] if candidates else None))
+    return attributed
+
+
+def plan_update(previous, text, sections, number):
+    """What to regenerate after a revision, from the stored `previous` version.
+
+    Returns (kept, generate_from, count, changed): the (section index, MCQ)
+    pairs to keep, the indices of the sections to generate `count` new MCQs
+    from, and the indices of the new or edited sections. The changed text
+    gets at least its share of `number` by size; kept MCQs from the most
+    covered sections are dropped to make room. When the changed text is too
+    short for `count` MCQs, the least covered unchanged sections are added
+    until the text's share reaches it.
+    """
+    positions = {}
+    for index, section in enumerate(sections):
+        positions.setdefault(section.fingerprint, index)
+    kept = [(positions[mcq["source"]], mcq) for mcq in previous["mcqs"] if mcq.get("source") in positions]
+    old = set(previous["sections"])
+    changed = [index for index, section in enumerate(sections) if section.fingerprint not in old]
+
+    sizes = [count_tokens(text[section.start:section.end]) for section in sections]
+    total = sum(sizes) or 1
+    quota = [number * size / total for size in sizes]
+    share = round(sum(quota[index] for index in changed))
+    count = min(number, max(number - len(kept), share))
+    for _ in range(len(kept) + count - number):
+        covered = Counter(index for index, _ in kept)
+        busiest = max(covered, key=lambda index: (covered[index], index))
+        kept.pop(max(position for position, (index, _) in enumerate(kept) if index == busiest))
+
+    generate_from = list(changed)
+    room = sum(quota[index] for index in changed)
+    covered = Counter(index for index, _ in kept)
+    unchanged = sorted(set(range(len(sections))) - set(changed), key=lambda index: covered[index] - quota[index])
+    for index in unchanged:
+        if room >= count:
+            break
+        generate_from.append(index)
+        room += quota[index]
+    return kept, sorted(generate_from), count, changed
+
+
+class QuizVersions:
+    """Latest fingerprints, MCQs (with their source section) and review per document, subject and tone."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, document, subject, tone):
+        """{"sections": [fingerprint, ...], "mcqs": [mcq with "source", ...], "review": str} or None"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT sections, mcqs, review FROM versions WHERE document = ? AND subject = ? AND tone = ?",
+                (document, subject, tone),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"sections": json.loads(row[0]), "mcqs": json.loads(row[1]), "review": row[2]}
+
+    def put(self, document, subject, tone, sections, mcqs, review=""):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO versions (document, subject, tone, sections, mcqs, review, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document, subject, tone, json.dumps([section.fingerprint for section in sections]),
+                 json.dumps(mcqs), review or "", time.time()),
+            )
+            conn.commit()
+
+    def set_review(self, document, subject, tone, review):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE versions SET review = ? WHERE document = ? AND subject = ? AND tone = ?",
+                         (review or "", document, subject, tone))
+            conn.commit()
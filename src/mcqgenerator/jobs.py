@@ -0,0 +1,321 @@
+"""Background job queue for quiz generation.
+
+submit() stores the job in SQLite and returns its id immediately; a pool of
+worker threads runs generate_quiz for queued jobs and writes the streamed
+partial response, the result or the error back to the job row, where the UI
+polls it. Submitting the same request while an identical job is still queued
+or running returns that job's id instead of starting duplicate work.
+
+Several processes (Streamlit sessions, the CLI) can share one jobs.sqlite. A
+worker claims a queued job with a conditional UPDATE, so a job runs once, and
+holds a lease on it that a heartbeat thread keeps renewing. Running jobs (and
+deferred reviews) whose owner process is gone or whose lease expired are
+queued again (or the review marked unavailable); live ones are left alone.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import cache_key
+from .rate_limit import INTERACTIVE, request_priority
+
+DEFAULT_WORKERS = 4
+# Partial responses are written back at most this often while a quiz streams
+PARTIAL_WRITE_INTERVAL = 0.5
+ACTIVE_STATUSES = ("queued", "running")
+# A running job whose owner hasn't renewed its lease for this long is considered abandoned
+LEASE_SECONDS = 30
+REVIEW_UNAVAILABLE = "Review unavailable: the process generating it stopped before it was done."
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    partial TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    owner TEXT,
+    lease REAL,
+    review_pending INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_key_status ON jobs (key, status);
+"""
+# Columns added after the first release, for jobs.sqlite files created before them
+_ADDED_COLUMNS = {"owner": "TEXT", "lease": "REAL", "review_pending": "INTEGER NOT NULL DEFAULT 0"}
+
+
+def job_key(request):
+    """Identity of a request; identical in-flight requests share one job"""
+    inputs = request["inputs"]
+    return cache_key(
+        text=inputs["text"], number=inputs["number"], subject=inputs["subject"], tone=inputs["tone"],
+        schema=inputs.get("RESPONSE_JSON", ""), mode=request["mode"], bypass_cache=request["bypass_cache"],
+        use_bank=request["use_bank"], source_hash=request.get("source_hash") or "",
+        output=request.get("output", "text"),
+        **({"document": request["document"]} if request.get("document") else {}),
+    )
+
+
+def _abandoned(owner, lease, now):
+    """Whether the process holding a claim is gone: its lease expired, or it exited (if on this host)"""
+    if lease is None or lease < now:
+        return True
+    host, _, rest = (owner or "").partition(":")
+    pid = rest.partition(":")[0]
+    # os.kill(pid, 0) only probes on POSIX; on Windows it would terminate the process
+    if os.name == "nt" or host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+class JobQueue:
+    """SQLite-backed queue of quiz generation jobs with a worker thread pool."""
+
+    def __init__(self, path, workers=DEFAULT_WORKERS, runner=None):
+        self.path = path
+        self.workers = workers
+        self._runner = runner or run_generation
+        self._conn = None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stop = threading.Event()
+        # Identifies this queue's claims: host, pid and a per-instance token
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            self._conn.commit()
+        return self._conn
+
+    def _start(self):
+        # Start the workers and the heartbeat on first use, and resume jobs no live process owns
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mcqgen-job")
+            threading.Thread(target=self._heartbeat, name="mcqgen-job-heartbeat", daemon=True).start()
+            for (job_id,) in self._connect().execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created").fetchall():
+                self._executor.submit(self._work, job_id)
+            self._recover()
+
+    def _heartbeat(self):
+        while not self._stop.wait(LEASE_SECONDS / 3):
+            with self._lock:
+                conn = self._connect()
+                conn.execute("UPDATE jobs SET lease = ? WHERE owner = ? AND (status = 'running' OR review_pending = 1)",
+                             (time.time() + LEASE_SECONDS, self.owner))
+                conn.commit()
+                self._recover()
+
+    def _recover(self):
+        # Requeue running jobs and give up on deferred reviews whose owner is gone; call with the lock held
+        conn = self._connect()
+        now = time.time()
+        rows = conn.execute("SELECT id, status, owner, lease FROM jobs WHERE status = 'running' OR review_pending = 1"
+                            ).fetchall()
+        for row in rows:
+            if not _abandoned(row["owner"], row["lease"], now):
+                continue
+            if row["status"] == "running":
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = 'queued', partial = '', owner = NULL, lease = NULL "
+                    "WHERE id = ? AND status = 'running' AND owner IS ?", (row["id"], row["owner"])).rowcount
+                if requeued:
+                    logging.warning(f"Requeued job {row['id']} abandoned by {row['owner']}")
+                    self._executor.submit(self._work, row["id"])
+            else:
+                conn.execute(
+                    "UPDATE jobs SET review_pending = 0, result = json_set(result, '$.review', ?) "
+                    "WHERE id = ? AND review_pending = 1 AND owner IS ?", (REVIEW_UNAVAILABLE, row["id"], row["owner"]))
+        conn.commit()
+
+    def close(self):
+        """Stop the heartbeat and wait for running jobs (their leases then expire for other processes)"""
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def submit(self, inputs, mode="standard", bypass_cache=False, use_bank=False, source_hash=None, metadata=None,
+               output="text", priority=INTERACTIVE, document=None):
+        """Queue a generate_quiz call and return its job id (an identical in-flight job's id if any)
+
+        `priority` is the job's rate-limiter priority ("interactive" or "batch"). With a
+        `document` name the quiz is regenerated incrementally (see generate_incremental).
+        """
+        request = {
+            "inputs": inputs, "mode": mode, "bypass_cache": bypass_cache, "use_bank": use_bank,
+            "source_hash": source_hash, "metadata": metadata or {}, "output": output, "priority": priority,
+            "document": document,
+        }
+        key = job_key(request)
+        with self._lock:
+            self._start()
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running') ORDER BY created LIMIT 1",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                logging.info(f"Coalesced request into in-flight job {row['id']}")
+                return row["id"]
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, key, status, request, created) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, key, json.dumps(request), time.time()),
+            )
+            conn.commit()
+            self._executor.submit(self._work, job_id)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        # Only while this queue owns the job, so a worker whose job was requeued can't overwrite the new run
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?",
+                         (*fields.values(), job_id, self.owner))
+            conn.commit()
+
+    def _claim(self, job_id):
+        """The job's request if this queue claimed it, None if it isn't queued (anymore)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', started = ?, owner = ?, lease = ? WHERE id = ? AND status = 'queued'",
+                (now, self.owner, now + LEASE_SECONDS, job_id),
+            ).rowcount
+            conn.commit()
+            if not claimed:
+                return None
+            return json.loads(conn.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()["request"])
+
+    def _work(self, job_id):
+        request = self._claim(job_id)
+        if request is None:
+            return
+
+        parts = []
+        last_write = 0.0
+
+        def on_token(token):
+            nonlocal last_write
+            parts.append(token)
+            now = time.monotonic()
+            if now - last_write >= PARTIAL_WRITE_INTERVAL:
+                last_write = now
+                self._update(job_id, partial="".join(parts))
+
+        try:
+            result = self._runner(request, on_token)
+        except Exception as e:
+            logging.exception(f"Job {job_id} failed")
+            self._update(job_id, status="failed", error=str(e)[:1000], finished=time.time())
+            return
+        future = result.pop("review_future", None)
+        self._update(job_id, status="done", partial="".join(parts), result=json.dumps(result, default=str),
+                     finished=time.time(), review_pending=int(future is not None))
+        if future is not None:
+            # Deferred mode: the quiz is available now, the review is filled in when ready
+            future.add_done_callback(lambda done: self._set_review(job_id, result, done))
+
+    def _set_review(self, job_id, result, future):
+        try:
+            review = future.result()
+        except Exception as e:
+            review = f"Review failed: {e}"
+        self._update(job_id, result=json.dumps({**result, "review": review}, default=str), review_pending=0)
+
+    def get(self, job_id):
+        """The job as a dict (status, partial text, result/error, request metadata), or None
+
+        "review_pending" is true while a deferred review is still being computed.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and (row["status"] == "running" or row["review_pending"]) and \
+                    _abandoned(row["owner"], row["lease"], time.time()):
+                # e.g. the app restarted: nothing would ever finish this job or its review otherwise
+                self._start()
+                self._recover()
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        request = json.loads(row["request"])
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "metadata": request.get("metadata", {}),
+            "mode": request["mode"],
+            "partial": row["partial"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "review_pending": bool(row["review_pending"]),
+            "error": row["error"],
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"],
+        }
+
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def run_generation(request, on_token=None):
+    """Run one job's generation; everything but "review_future" is JSON-serializable"""
+    from .mcqgenerator import generate_incremental, generate_quiz, get_question_bank
+
+    bank = get_question_bank() if request["use_bank"] else None
+    with request_priority(request.get("priority", INTERACTIVE)):
+        if request.get("document"):
+            result = generate_incremental(
+                request["inputs"],
+                request["document"],
+                mode=request["mode"],
+                bypass_cache=request["bypass_cache"],
+                on_token=on_token,
+                output=request.get("output", "text"),
+                bank=bank,
+                source_hash=request.get("source_hash"),
+            )
+        else:
+            result = generate_quiz(
+                request["inputs"],
+                mode=request["mode"],
+                bypass_cache=request["bypass_cache"],
+                on_token=on_token,
+                bank=bank,
+                source_hash=request.get("source_hash"),
+                output=request.get("output", "text"),
+            )
+    keys = ("quiz", "review", "review_future", "metrics", "validation", "bank", "structured", "hedge",
+            "provenance", "incremental")
+    return {key: result[key] for key in keys if key in result}
@@ -0,0 +1,258 @@
+"""Request journal and offline replay harness.
+
+With $MCQGEN_JOURNAL_PATH set, every generate_quiz call and every
+generate_evaluate_chain invocation appends one JSON line: the inputs and their
+hash, the generation parameters, the raw output of each LLM stage (keyed by
+the hash of its prompt) and per-stage timings from metrics.get_metrics().
+
+The replay tool feeds a journal back through the pipeline with the "replay"
+backend, which answers each prompt with its recorded response, so parser,
+export and orchestration throughput can be measured offline:
+
+    python -m mcqgenerator.journal replay logs/journal.jsonl --qps 20 --repeat 5
+"""
+import argparse
+import contextvars
+import hashlib
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+from .metrics import current_run_id, get_metrics, track_run
+
+_active_entry = contextvars.ContextVar("mcqgen_journal_entry", default=None)
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def response_key(prompt_digest, output_mode="text"):
+    """Key of a recorded response; structured-output calls share the quiz prompt, so the mode is part of it"""
+    return prompt_digest if output_mode == "text" else f"{output_mode}:{prompt_digest}"
+
+
+def inputs_hash(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RequestJournal:
+    """Append-only JSONL journal of generation requests and their raw LLM outputs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def add_call(self, run_id, call):
+        with self._lock:
+            self._calls.setdefault(run_id, []).append(call)
+
+    def pop_calls(self, run_id):
+        with self._lock:
+            return self._calls.pop(run_id, [])
+
+    def record(self, entry):
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def read_journal(path):
+    """Yield the journal entries in order, skipping a half-written last line"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def recorded_responses(path):
+    """{response_key: raw LLM output} for every stage call in the journal"""
+    return {
+        response_key(call["prompt_hash"], call.get("output_mode", "text")): call["output"]
+        for entry in read_journal(path) for call in entry.get("llm_calls", [])
+    }
+
+
+@lru_cache(maxsize=None)
+def get_journal():
+    """The process-wide journal, or None unless $MCQGEN_JOURNAL_PATH is set"""
+    path = os.getenv("MCQGEN_JOURNAL_PATH")
+    return RequestJournal(path) if path else None
+
+
+@contextmanager
+def journaled(kind, inputs, params=None):
+    """Write one journal entry for the block; nested journaled calls fold into the outer entry"""
+    journal = get_journal()
+    if journal is None or _active_entry.get() is not None:
+        yield None
+        return
+    with track_run(current_run_id()) as run_id:
+        entry = {
+            "id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "kind": kind,
+            "run_id": run_id,
+            "inputs_hash": inputs_hash(inputs),
+            "inputs": inputs,
+            "params": params or {},
+            "error": None,
+        }
+        token = _active_entry.set(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = str(e)[:500]
+            raise
+        finally:
+            _active_entry.reset(token)
+            entry["latency_s"] = round(time.perf_counter() - start, 6)
+            entry["llm_calls"] = journal.pop_calls(run_id)
+            entry["stages"] = get_metrics().summary(run_id)
+            journal.record(entry)
+
+
+def journaled_chain(chain, kind):
+    """Wrap a chain so each top-level invocation is journaled"""
+    from langchain_core.runnables import RunnableLambda
+
+    def invoke(inputs, config):
+        with journaled(kind, inputs):
+            return chain.invoke(inputs, config)
+
+    async def ainvoke(inputs, config):
+        with journaled(kind, inputs):
+            return await chain.ainvoke(inputs, config)
+
+    return RunnableLambda(invoke, afunc=ainvoke).with_config(run_name=kind)
+
+
+def journal_callbacks(prompts):
+    """Callback handlers that record the raw output of each stage in `prompts` ({stage: PromptTemplate})"""
+    journal = get_journal()
+    if journal is None:
+        return []
+    from .callbacks import JournalCallbackHandler
+
+    return [JournalCallbackHandler(journal, prompts)]
+
+
+def _replay_one(entry, export):
+    from .hedging import Hedge
+    from .mcqgenerator import generate_quiz, get_chains
+    from .pdf_export import render_quiz_pdf
+    from .quiz_table import quiz_table
+
+    params = entry.get("params", {})
+    if entry["kind"] == "generate_quiz":
+        result = generate_quiz(entry["inputs"], mode=params.get("mode", "standard"),
+                               validate=params.get("validate", True), bypass_cache=True,
+                               output=params.get("output", "text"),
+                               hedge=Hedge(*params["hedge"]) if params.get("hedge") else Hedge(1))
+    else:
+        result = get_chains().generate_evaluate_chain.invoke(
+            entry["inputs"], {"configurable": {"bypass_cache": True}})
+    if export:
+        table = quiz_table(result["quiz"])
+        render_quiz_pdf(table.table_rows(), result.get("review") or "", entry["inputs"].get("subject", ""),
+                        len(table), entry["inputs"].get("tone", ""), datetime.now())
+    return result
+
+
+def replay(path, qps=10.0, repeat=1, concurrency=8, export=True):
+    """Replay a journal at a target rate with recorded LLM responses; returns a stats dict"""
+    entries = [entry for entry in read_journal(path) if entry.get("kind") and not entry.get("error")]
+    if not entries:
+        raise Exception(f"No replayable entries in {path}")
+    # Recorded responses only: no network, no journaling of the replay itself, a throwaway cache
+    os.environ["MCQGEN_BACKEND"] = "replay"
+    os.environ["MCQGEN_REPLAY_JOURNAL"] = path
+    os.environ.pop("MCQGEN_JOURNAL_PATH", None)
+    get_journal.cache_clear()
+    from . import mcqgenerator
+
+    mcqgenerator.CACHE_PATH = os.path.join(tempfile.mkdtemp(prefix="mcqgen-replay-"), "responses.sqlite")
+    mcqgenerator.get_response_cache.cache_clear()
+
+    schedule = entries * repeat
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def run(index, entry):
+        # Open-loop load: latency counts from the scheduled start, so queueing shows up
+        scheduled = start + index / qps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            _replay_one(entry, export)
+        except Exception as e:
+            with lock:
+                errors.append(str(e)[:200])
+            return
+        with lock:
+            latencies.append(time.perf_counter() - scheduled)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, entry in enumerate(schedule):
+            pool.submit(run, index, entry)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    llm = mcqgenerator.get_chains().llm
+    return {
+        "requests": len(schedule),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "achieved_qps": round(len(schedule) / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 4) if latencies else None,
+        "p99_s": round(latencies[max(0, int(len(latencies) * 0.99) - 1)], 4) if latencies else None,
+        "replay_misses": getattr(llm, "misses", 0),
+        "stages": get_metrics().summary(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mcqgenerator.journal", description="Replay a request journal")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay_cmd = commands.add_parser("replay", help="replay recorded requests with their recorded LLM responses")
+    replay_cmd.add_argument("journal")
+    replay_cmd.add_argument("--qps", type=float, default=10.0, help="target request rate")
+    replay_cmd.add_argument("--repeat", type=int, default=1, help="replay the journal this many times")
+    replay_cmd.add_argument("--concurrency", type=int, default=8)
+    replay_cmd.add_argument("--no-export", action="store_true", help="skip the quiz table and PDF rendering")
+    replay_cmd.add_argument("--json", action="store_true", help="print the stats as JSON")
+    args = parser.parse_args(argv)
+
+    stats = replay(args.journal, args.qps, args.repeat, args.concurrency, not args.no_export)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"{stats['requests']} requests in {stats['elapsed_s']}s ({stats['achieved_qps']} req/s), "
+          f"{stats['errors']} errors, {stats['replay_misses']} prompts without a recorded response")
+    print(f"latency p50 {stats['p50_s']}s  p99 {stats['p99_s']}s")
+    print(f"{'stage':<18}{'calls':>8}{'total s':>10}{'mean ms':>10}")
+    for stage, summary in stats["stages"].items():
+        mean_ms = summary["wall_s"] / summary["calls"] * 1000
+        print(f"{stage:<18}{summary['calls']:>8}{summary['wall_s']:>10.3f}{mean_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,28 @@ import os
 from datetime import datetime
 
 
-LOG_FILE = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
-
 LOG_PATH = os.path.join(os.getcwd(), "logs")
 
-os.makedirs(LOG_PATH, exist_ok=True)
+LOG_FILE_PATH = None
+
+
+def configure_logging(log_dir=None, level=logging.INFO):
+    """Create the timestamped log file and attach it to the root logger.
+
+    Nothing is written to disk until this is called. Calling it again in the
+    same process (e.g. on a Streamlit rerun) reuses the existing log file.
+    """
+    global LOG_FILE_PATH
+    if LOG_FILE_PATH is not None:
+        return LOG_FILE_PATH
+
+    log_dir = log_dir or LOG_PATH
+    os.makedirs(log_dir, exist_ok=True)
 
-LOG_FILE_PATH = os.path.join(LOG_PATH, LOG_FILE)
+    LOG_FILE = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
+    LOG_FILE_PATH = os.path.join(log_dir, LOG_FILE)
 
-logging.basicConfig(level=logging.INFO,
-                 filename=LOG_FILE_PATH,
-                 format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s")
\ No newline at end of file
+    logging.basicConfig(level=level,
+                     filename=LOG_FILE_PATH,
+                     format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s")
+    return LOG_FILE_PATH
@@ -1,41 +1,50 @@
-# from langchain.llms import OpenAI  <-- (Old OpenAI Import)
-# from langchain.chat_models import ChatOpenAI <-- (Old OpenAI Import)
-from langchain_groq import ChatGroq # <--- (New Groq Import)
+# Nothing heavy happens at import time: the LLM client, Response.json and the
+# LCEL chains are all built on first use and then shared across the process.
+# The module-level names `llm`, `quiz_chain`, `review_chain`,
+# `generate_evaluate_chain` and `RESPONSE_JSON` still work; they are resolved
+# lazily through __getattr__ below.
 
-# Updated imports for langchain v0.2+
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableSequence
-
-# from langchain.callbacks import get_openai_callback <-- (This specific callback is for OpenAI only. You can remove it or comment it out.)
+# Token usage and latency come from callbacks.StageCallbackHandler (it reads
+# Groq's usage metadata), reported per stage through metrics.get_metrics().
 
 import os
 import json
-import pandas as pd
-import traceback
-from dotenv import load_dotenv
-import PyPDF2
-
-load_dotenv()
+import contextvars
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-key = os.getenv("GROQ_API_KEY")
+from .backends import DEFAULT_GROQ_MODEL, create_backend, model_id
+from .cache import ResponseCache, cache_hits, cache_key, record_hit, with_cache
+from .hedging import Hedge, hedged_generate
+from .journal import journal_callbacks, journaled, journaled_chain
+from .metrics import current_run_id, get_metrics, track_run
+from .structured import MAX_SCHEMA_RETRIES, OUTPUT_MODES, bind_structured, chunk_texts, generate_structured
+from .utils import split_text, allocate_questions, merge_quizzes, estimate_tokens, parse_quiz_json, scan_json_object
 
-llm = ChatGroq(
-    groq_api_key = key, # Ensure this is in your .env file
-    model_name="llama-3.3-70b-versatile"  # Updated to currently supported Groq model
-)
+MODEL_NAME = DEFAULT_GROQ_MODEL  # Updated to currently supported Groq model
 
 # Get the directory where this script is located and find Response.json relative to project root
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 RESPONSE_JSON_PATH = os.path.join(PROJECT_ROOT, "Response.json")
 
-with open(RESPONSE_JSON_PATH, "r") as f:
-    RESPONSE_JSON = json.load(f)
+# Cached responses are keyed on the prompt version, so bump it whenever
+# TEMPLATE or TEMPLATE2 change in a way that should invalidate old quizzes.
+PROMPT_VERSION = "1"
+CACHE_PATH = os.getenv("MCQGEN_CACHE_PATH", os.path.join(PROJECT_ROOT, ".cache", "responses.sqlite"))
+BANK_PATH = os.getenv("MCQGEN_BANK_PATH", os.path.join(PROJECT_ROOT, ".cache", "question_bank.sqlite"))
+JOBS_PATH = os.getenv("MCQGEN_JOBS_PATH", os.path.join(PROJECT_ROOT, ".cache", "jobs.sqlite"))
+EXTRACTION_CACHE_PATH = os.getenv("MCQGEN_EXTRACTION_CACHE_PATH",
+                                  os.path.join(PROJECT_ROOT, ".cache", "extractions.sqlite"))
+VERSIONS_PATH = os.getenv("MCQGEN_VERSIONS_PATH", os.path.join(PROJECT_ROOT, ".cache", "quiz_versions.sqlite"))
 
 TEMPLATE = """
 Text:{text}
-You are an expert an MCQ maker. Given the above text, it is your job to create 
+You are an expert an MCQ maker. Given the above text, it is your job to create
 a quiz of {number} multiple choice questions for {subject} students in {tone}.
 Make sure the questions are not repeated and check all the questions to be confirming.
 Make sure to format your response like RESPONSE_JSON below and use it as a guide
@@ -44,14 +53,6 @@ Ensure to make {number} MCQs.
 {RESPONSE_JSON}
 """
 
-quiz_generation_prompt = PromptTemplate(
-    input_variables=["text", "number", "subject", "tone", "RESPONSE_JSON"],
-    template=TEMPLATE
-    )
-
-# Using modern LCEL (LangChain Expression Language) instead of deprecated LLMChain
-quiz_chain = quiz_generation_prompt | llm | StrOutputParser()
-
 TEMPLATE2 = """
 You are an expert english grammarian and writer. Given a Multiple Choice Quiz
 for {subject} students.\
@@ -64,28 +65,737 @@ Quiz_MCQs:
 Check from an expert English Writer of the above quiz:
 """
 
-quiz_evaluation_prompt = PromptTemplate(
-    input_variables=["subject", "quiz"],
-    template=TEMPLATE2
-    )
+# Fused mode: one call returns both the quiz and its review
+TEMPLATE_FUSED = """
+Text:{text}
+You are an expert an MCQ maker. Given the above text, it is your job to create
+a quiz of {number} multiple choice questions for {subject} students in {tone}.
+Make sure the questions are not repeated and check all the questions to be confirming.
+Format each question like RESPONSE_JSON below and ensure to make {number} MCQs.
+Then, as an expert english grammarian and writer, evaluate the complexity of the quiz
+for {subject} students in at most 50 words.
+Respond with a single JSON object of the form {{"quiz": <RESPONSE_JSON>, "review": "<analysis>"}}.
+### RESPONSE_JSON
+{RESPONSE_JSON}
+"""
+
+# How the review is produced: two calls (standard), one combined call (fused),
+# no review at all (skip) or a review computed in the background (deferred)
+GENERATION_MODES = ("standard", "fused", "skip", "deferred")
+
+Chains = namedtuple("Chains", [
+    "llm", "quiz_chain", "review_chain", "generate_evaluate_chain", "quiz_stream_chain", "fused_chain"
+])
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_response_json():
+    with open(RESPONSE_JSON_PATH, "r") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_response_cache():
+    return ResponseCache(CACHE_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_question_bank():
+    from .question_bank import QuestionBank
+
+    return QuestionBank(BANK_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_extraction_cache():
+    """The document text cache shared by the app and the CLI ($MCQGEN_EXTRACTION_CACHE_BYTES on disk,
+    misses extracted in $MCQGEN_EXTRACT_WORKERS processes)"""
+    from .extraction_cache import DEFAULT_MAX_BYTES, ExtractionCache
+
+    return ExtractionCache(EXTRACTION_CACHE_PATH,
+                           max_bytes=int(os.getenv("MCQGEN_EXTRACTION_CACHE_BYTES", DEFAULT_MAX_BYTES)),
+                           workers=int(os.getenv("MCQGEN_EXTRACT_WORKERS", os.cpu_count() or 1)))
+
+
+@lru_cache(maxsize=None)
+def get_job_queue():
+    """The process-wide background job queue ($MCQGEN_JOB_WORKERS worker threads)"""
+    from .jobs import DEFAULT_WORKERS, JobQueue
+
+    return JobQueue(JOBS_PATH, workers=int(os.getenv("MCQGEN_JOB_WORKERS", DEFAULT_WORKERS)))
+
+
+@lru_cache(maxsize=None)
+def get_quiz_versions():
+    """Stored document versions for incremental regeneration (see incremental.py)"""
+    from .incremental import QuizVersions
+
+    return QuizVersions(VERSIONS_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_hedge():
+    """Default hedging policy ($MCQGEN_HEDGE_N, $MCQGEN_HEDGE_DEADLINE, $MCQGEN_HEDGE_MAX_TOKENS), None if N <= 1"""
+    n = int(os.getenv("MCQGEN_HEDGE_N", "1"))
+    if n <= 1:
+        return None
+    deadline = os.getenv("MCQGEN_HEDGE_DEADLINE")
+    max_tokens = os.getenv("MCQGEN_HEDGE_MAX_TOKENS")
+    return Hedge(n, float(deadline) if deadline else None, int(max_tokens) if max_tokens else None)
+
 
-review_chain = quiz_evaluation_prompt | llm | StrOutputParser()
+@lru_cache(maxsize=None)
+def get_prompts():
+    """Return the (quiz_generation_prompt, quiz_evaluation_prompt) pair"""
+    # Updated imports for langchain v0.2+
+    from langchain_core.prompts import PromptTemplate
 
-# Using LCEL to create a combined chain that passes outputs between chains
-# RunnablePassthrough allows passing the original inputs along with new outputs
-from langchain_core.runnables import RunnableLambda
+    quiz_generation_prompt = PromptTemplate(
+        input_variables=["text", "number", "subject", "tone", "RESPONSE_JSON"],
+        template=TEMPLATE
+        )
+    quiz_evaluation_prompt = PromptTemplate(
+        input_variables=["subject", "quiz"],
+        template=TEMPLATE2
+        )
+    return quiz_generation_prompt, quiz_evaluation_prompt
 
-def create_review_input(inputs):
-    """Prepare inputs for review chain by adding quiz output"""
+
+@lru_cache(maxsize=None)
+def get_fused_prompt():
+    from langchain_core.prompts import PromptTemplate
+
+    return PromptTemplate(
+        input_variables=["text", "number", "subject", "tone", "RESPONSE_JSON"],
+        template=TEMPLATE_FUSED
+        )
+
+
+def create_llm(backend=None, **params):
+    # The backend (groq, langchain or fake) comes from $MCQGEN_BACKEND unless given
+    return create_backend(backend, **params)
+
+
+def quiz_cache_fields(inputs, model_name=MODEL_NAME, stage="quiz"):
+    return {
+        "stage": stage,
+        "text": inputs["text"],
+        "number": inputs["number"],
+        "subject": inputs["subject"],
+        "tone": inputs["tone"],
+        "schema": inputs.get("RESPONSE_JSON", ""),
+        "model_name": model_name,
+        "prompt_version": PROMPT_VERSION,
+    }
+
+
+def complete_response(response):
+    """Whether a response holds a JSON object that parsed without repairs (only those are cached)"""
+    scan = scan_json_object(response)
+    return scan.json is not None and not scan.repairs
+
+
+def build_quiz_chain(llm, cache=None):
+    from langchain_core.output_parsers import StrOutputParser
+
+    # Using modern LCEL (LangChain Expression Language) instead of deprecated LLMChain
+    chain = get_prompts()[0] | llm | StrOutputParser()
+    if cache is not None:
+        chain = with_cache(chain, cache, lambda inputs: quiz_cache_fields(inputs, model_id(llm)),
+                           cacheable=complete_response)
+    return chain.with_config(run_name="quiz_chain")
+
+
+def build_fused_chain(llm, cache=None):
+    from langchain_core.output_parsers import StrOutputParser
+
+    chain = get_fused_prompt() | llm | StrOutputParser()
+    if cache is not None:
+        chain = with_cache(chain, cache, lambda inputs: quiz_cache_fields(inputs, model_id(llm), "fused"),
+                           cacheable=complete_response)
+    return chain.with_config(run_name="fused_chain")
+
+
+def build_structured_chain(llm, method):
+    """Quiz chain answering in JSON mode or with a tool call (see structured.py); streams the JSON text"""
+    from langchain_core.runnables import RunnableGenerator
+
+    chain = get_prompts()[0] | bind_structured(llm, method, load_response_json()) | RunnableGenerator(chunk_texts)
+    return chain.with_config(run_name="structured_quiz_chain", metadata={"output": method})
+
+
+def review_cache_fields(inputs, model_name=MODEL_NAME):
     return {
-        **inputs,
-        "quiz": inputs.get("quiz", "")
+        "stage": "review",
+        "quiz": inputs["quiz"],
+        "subject": inputs["subject"],
+        "model_name": model_name,
+        "prompt_version": PROMPT_VERSION,
     }
 
-# Combined chain: first generates quiz, then reviews it
-generate_evaluate_chain = (
-    RunnablePassthrough.assign(quiz=quiz_chain)
-    | RunnableLambda(lambda x: {**x, "quiz": x["quiz"]})
-    | RunnablePassthrough.assign(review=review_chain)
-)
 
+def build_review_chain(llm, cache=None):
+    from langchain_core.output_parsers import StrOutputParser
+
+    chain = get_prompts()[1] | llm | StrOutputParser()
+    if cache is not None:
+        chain = with_cache(chain, cache, lambda inputs: review_cache_fields(inputs, model_id(llm)))
+    return chain.with_config(run_name="review_chain")
+
+
+def build_generate_evaluate_chain(llm, cache=None):
+    """Build the combined quiz + review chain on top of any chat model"""
+    # Using LCEL to create a combined chain that passes outputs between chains
+    # RunnablePassthrough allows passing the original inputs along with new outputs
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+    return (
+        RunnablePassthrough.assign(quiz=build_quiz_chain(llm, cache))
+        | RunnableLambda(lambda x: {**x, "quiz": x["quiz"]})
+        | RunnablePassthrough.assign(review=build_review_chain(llm, cache))
+    )
+
+
+@lru_cache(maxsize=None)
+def get_callbacks():
+    """Callback handlers attached to every chain"""
+    from .callbacks import StageCallbackHandler
+
+    # Every chain reports its stages (wall time, first token, tokens) to the metrics recorder,
+    # and their raw outputs to the request journal when $MCQGEN_JOURNAL_PATH is set
+    quiz_prompt, review_prompt = get_prompts()
+    return [StageCallbackHandler(get_metrics())] + journal_callbacks({
+        "quiz_chain": quiz_prompt, "review_chain": review_prompt, "fused_chain": get_fused_prompt(),
+        "structured_quiz_chain": quiz_prompt,
+    })
+
+
+@lru_cache(maxsize=None)
+def _get_chains(backend, params):
+    llm = create_llm(backend, **dict(params))
+    cache = get_response_cache()
+    callbacks = get_callbacks()
+    return Chains(
+        llm=llm,
+        quiz_chain=build_quiz_chain(llm, cache).with_config(callbacks=callbacks),
+        review_chain=build_review_chain(llm, cache).with_config(callbacks=callbacks),
+        # Combined chain: first generates quiz, then reviews it
+        # Pass config={"configurable": {"bypass_cache": True}} to force fresh LLM calls
+        generate_evaluate_chain=journaled_chain(
+            build_generate_evaluate_chain(llm, cache), "generate_evaluate_chain"
+        ).with_config(callbacks=callbacks),
+        quiz_stream_chain=build_quiz_chain(llm).with_config(callbacks=callbacks),
+        fused_chain=build_fused_chain(llm, cache).with_config(callbacks=callbacks),
+    )
+
+
+def get_chains(backend=None, **params):
+    """Return the process-wide chains for (backend, params), building them on first use
+
+    e.g. get_chains(model_name="llama3-8b-8192") or get_chains("fake", latency=0.5)
+    """
+    backend = backend or os.getenv("MCQGEN_BACKEND", "groq")
+    with _lock:
+        return _get_chains(backend, tuple(sorted(params.items())))
+
+
+@lru_cache(maxsize=None)
+def _get_structured_chain(backend, params, method):
+    # Built separately on first use, since not every backend supports tools or JSON mode
+    llm = _get_chains(backend, params).llm
+    return build_structured_chain(llm, method).with_config(callbacks=get_callbacks())
+
+
+def get_structured_chain(method, backend=None, **params):
+    """The structured_quiz_chain for `method` ("json_mode" or "function_calling") on get_chains()' model"""
+    backend = backend or os.getenv("MCQGEN_BACKEND", "groq")
+    with _lock:
+        return _get_structured_chain(backend, tuple(sorted(params.items())), method)
+
+
+_LAZY_CHAINS = set(Chains._fields)
+
+
+def __getattr__(name):
+    # Keeps `from mcqgenerator.mcqgenerator import generate_evaluate_chain` working
+    if name in _LAZY_CHAINS:
+        return getattr(get_chains(), name)
+    if name == "RESPONSE_JSON":
+        return load_response_json()
+    if name == "response_cache":
+        return get_response_cache()
+    if name == "question_bank":
+        return get_question_bank()
+    if name == "quiz_generation_prompt":
+        return get_prompts()[0]
+    if name == "quiz_evaluation_prompt":
+        return get_prompts()[1]
+    if name == "generate_evaluate_chunked_chain":
+        from langchain_core.runnables import RunnableLambda
+        return RunnableLambda(generate_evaluate_chunked)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Chunked (map-reduce) generation for documents that don't fit in one prompt.
+# Each chunk gets a share of the MCQs, the per-chunk quiz_chain calls run
+# concurrently, and the merged quiz goes through a single review pass.
+CHUNK_TOKENS = 3000
+MAX_CHUNK_CONCURRENCY = 8
+
+def chunk_inputs_for(inputs, max_tokens=CHUNK_TOKENS):
+    """Per-chunk quiz inputs, each asking for its share of the MCQs"""
+    chunks = split_text(inputs["text"], max_tokens)
+    if len(chunks) <= 1:
+        return [inputs]
+    counts = allocate_questions(chunks, int(inputs["number"]))
+    return [
+        {**inputs, "text": chunk, "number": count}
+        for chunk, count in zip(chunks, counts) if count > 0
+    ]
+
+
+def generate_quiz_text(inputs, max_tokens=CHUNK_TOKENS, max_concurrency=MAX_CHUNK_CONCURRENCY, bypass_cache=False):
+    """Generate the quiz (without review), chunk by chunk for large documents"""
+    config = {"configurable": {"bypass_cache": bypass_cache}}
+    chunk_inputs = chunk_inputs_for(inputs, max_tokens)
+    quizzes = get_chains().quiz_chain.batch(chunk_inputs, config={**config, "max_concurrency": max_concurrency})
+    return quizzes[0] if len(quizzes) == 1 else merge_quizzes(quizzes)
+
+
+def generate_evaluate_chunked(inputs, max_tokens=CHUNK_TOKENS, max_concurrency=MAX_CHUNK_CONCURRENCY,
+                              bypass_cache=False):
+    """Generate a quiz chunk by chunk, then review the merged result once"""
+    chains = get_chains()
+    config = {"configurable": {"bypass_cache": bypass_cache}}
+    if len(split_text(inputs["text"], max_tokens)) <= 1:
+        return chains.generate_evaluate_chain.invoke(inputs, config)
+
+    quiz = generate_quiz_text(inputs, max_tokens, max_concurrency, bypass_cache)
+    review = chains.review_chain.invoke({**inputs, "quiz": quiz}, config)
+    return {**inputs, "quiz": quiz, "review": review}
+
+
+def hedged_quiz(inputs, hedge, bypass_cache=False):
+    """Generate one chunk's quiz text with hedged requests (see hedging.py); returns (quiz, stats)"""
+    chains = get_chains()
+    response_cache = get_response_cache()
+    key = cache_key(**quiz_cache_fields(inputs, model_id(chains.llm)))
+    cached = None if bypass_cache else response_cache.get(key)
+    if cached is not None:
+        record_hit(inputs, cached)
+        return cached, {"candidates": 0, "winner": None, "cancelled": 0, "first_token_s": None,
+                        "prompt_tokens": 0, "completion_tokens": 0, "wasted_tokens": 0}
+
+    quiz, stats = hedged_generate(chains.quiz_stream_chain, get_prompts()[0], inputs, hedge, load_response_json())
+    # A quiz no candidate got fully right is left for validation and not cached
+    if stats["winner"] is not None:
+        response_cache.set(key, quiz)
+    return quiz, stats
+
+
+def structured_quiz(inputs, output, bypass_cache=False, on_token=None, max_retries=MAX_SCHEMA_RETRIES):
+    """Generate one chunk's quiz with structured output; returns (quiz JSON string, stats)"""
+    response_cache = get_response_cache()
+    key = cache_key(**quiz_cache_fields(inputs, model_id(get_chains().llm), f"quiz_{output}"))
+    cached = None if bypass_cache else response_cache.get(key)
+    if cached is not None:
+        record_hit(inputs, cached)
+        if on_token is not None:
+            on_token(cached)
+        # Only full quizzes are cached, but count them anyway so the stats match a fresh run's
+        return cached, {"method": output, "attempts": 0, "schema_failures": 0, "invalid_mcqs": 0,
+                        "prompt_tokens": 0, "completion_tokens": 0, "wasted_tokens": 0,
+                        "accepted": len(parse_quiz_json(cached))}
+
+    quiz, stats = generate_structured(get_structured_chain(output), get_prompts()[0], inputs, load_response_json(),
+                                      output, on_token=on_token, max_retries=max_retries)
+    # Short quizzes are not cached, so the next request tries again
+    if stats["accepted"] >= int(inputs["number"]):
+        response_cache.set(key, quiz)
+    return quiz, stats
+
+
+def generate_structured_quiz(inputs, output, max_tokens=CHUNK_TOKENS, max_concurrency=MAX_CHUNK_CONCURRENCY,
+                             bypass_cache=False, on_token=None):
+    """Structured-output counterpart of generate_quiz_text; returns (quiz JSON string, summed stats)"""
+    from langchain_core.runnables import RunnableLambda
+
+    chunk_inputs = chunk_inputs_for(inputs, max_tokens)
+    if len(chunk_inputs) == 1:
+        return structured_quiz(chunk_inputs[0], output, bypass_cache, on_token)
+    results = RunnableLambda(lambda chunk: structured_quiz(chunk, output, bypass_cache)).batch(
+        chunk_inputs, config={"max_concurrency": max_concurrency})
+    stats = dict(results[0][1])
+    for _, chunk_stats in results[1:]:
+        for name, value in chunk_stats.items():
+            if name != "method":
+                stats[name] += value
+    return merge_quizzes([quiz for quiz, _ in results]), stats
+
+
+def split_fused_response(response):
+    """Split a fused-mode response into (quiz JSON string, review)"""
+    # The MCQs are one level down, in {"quiz": {"1": {...}}, "review": ...}
+    data = parse_quiz_json(response, item_depth=3)
+    if isinstance(data.get("quiz"), dict):
+        return json.dumps(data["quiz"]), str(data.get("review", ""))
+    # The model ignored the wrapper object and only returned the quiz
+    return json.dumps(data), ""
+
+
+# Deferred reviews run here so the caller gets the quiz back immediately
+_review_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mcqgen-review")
+
+
+def banked_mcqs(bank, inputs, source_hash=None):
+    """MCQs already in the bank for this subject, tone and source text (at most inputs["number"])"""
+    from .question_bank import document_hash
+
+    source_hash = source_hash or document_hash(inputs["text"])
+    found = bank.query(subject=inputs["subject"], tone=inputs["tone"], source_hash=source_hash,
+                       limit=int(inputs["number"]))
+    return [{"mcq": mcq["mcq"], "options": mcq["options"], "correct": mcq["correct"]} for mcq in found], source_hash
+
+
+def generate_quiz(inputs, mode="standard", bypass_cache=False, on_token=None, validate=True, bank=None,
+                  source_hash=None, output="text", hedge=None):
+    """Generate a quiz with the given review mode (see GENERATION_MODES).
+
+    Returns the inputs plus "quiz", "review" and "metrics" (latency, LLM calls,
+    estimated prompt/completion tokens and the run id of the per-stage
+    metrics). In deferred mode "review" is None and "review_future" resolves
+    to the review text. If `on_token` is given, single-chunk quizzes are
+    streamed to it token by token (not in fused mode).
+    With `validate`, malformed and near-duplicate MCQs are dropped and only
+    those are regenerated before the review (see validation.validate_quiz).
+
+    With a QuestionBank as `bank`, MCQs stored for the same subject, tone and
+    source (`source_hash`, by default the hash of inputs["text"]) are served
+    first and quiz_chain only generates the shortfall; new MCQs are added to
+    the bank afterwards.
+
+    `output` is how the quiz is produced (see OUTPUT_MODES): "text" parses
+    free text, "json_mode" and "function_calling" use the model's structured
+    output and validate MCQs as they stream in (result["structured"] has the
+    retry and wasted-token stats). Fused mode only applies to "text".
+
+    `hedge` (a hedging.Hedge, by default get_hedge() from the environment)
+    races up to hedge.n quiz_chain streams for single-chunk "text" quizzes
+    and keeps the first one that passes parsing and the schema checks
+    (result["hedge"] has the stats). The winner reaches `on_token` in one go.
+    """
+    if mode not in GENERATION_MODES:
+        raise Exception(f"Unknown generation mode '{mode}'. Use one of: {', '.join(GENERATION_MODES)}")
+    if output not in OUTPUT_MODES:
+        raise Exception(f"Unknown output mode '{output}'. Use one of: {', '.join(OUTPUT_MODES)}")
+    hedge = hedge if hedge is not None else get_hedge()
+    params = {"mode": mode, "validate": validate, "bypass_cache": bypass_cache, "bank": bank is not None,
+              "output": output, "hedge": list(hedge) if hedge else None}
+    # Group this generation's stage metrics under a run unless the caller already started one
+    with track_run(current_run_id()), journaled("generate_quiz", inputs, params), cache_hits() as hits:
+        result = _generate_quiz(inputs, mode, bypass_cache, on_token, validate, bank, source_hash, output, hedge)
+        result["metrics"]["cache_hits"] = len(hits)
+        return result
+
+
+def _generate_quiz(inputs, mode, bypass_cache, on_token, validate, bank, source_hash, output, hedge):
+    chains = get_chains()
+    config = {"configurable": {"bypass_cache": bypass_cache}}
+    start = time.perf_counter()
+    prompt_tokens = 0
+    completion_tokens = 0
+    llm_calls = 0
+    result = dict(inputs)
+
+    from .validation import regeneration_inputs, renumber
+
+    banked = []
+    if bank is not None:
+        banked, source_hash = banked_mcqs(bank, inputs, source_hash)
+    shortfall = int(inputs["number"]) - len(banked)
+    # Ask only for the missing MCQs, and not for the ones the bank already has
+    generation_inputs = regeneration_inputs(inputs, banked, shortfall) if banked and shortfall > 0 else inputs
+    chunk_inputs = chunk_inputs_for(generation_inputs)
+
+    def checked(quiz):
+        nonlocal llm_calls
+        if not validate:
+            return quiz
+        from langchain_core.runnables import RunnableLambda
+
+        from .validation import validate_quiz
+
+        # Regenerate against the largest chunk so the prompt stays chunk-sized
+        base = max(chunk_inputs, key=lambda chunk: len(chunk["text"]))
+        # Structured output already retried schema failures, so one call per round here
+        regenerate = chains.quiz_chain if output == "text" else RunnableLambda(
+            lambda regeneration: structured_quiz(regeneration, output, bypass_cache, max_retries=0)[0])
+        with cache_hits() as hits:
+            quiz, stats = validate_quiz({**base, "number": inputs["number"]}, quiz, load_response_json(),
+                                        regenerate, config)
+        llm_calls += stats["rounds"] - len(hits)
+        result["validation"] = stats
+        return quiz
+
+    fused = mode == "fused" and len(chunk_inputs) == 1 and not banked and output == "text"
+    if shortfall <= 0:
+        # Everything came from the bank, no quiz_chain call needed
+        quiz = json.dumps(renumber(banked))
+    elif fused:
+        with cache_hits() as hits:
+            raw = chains.fused_chain.invoke(inputs, config)
+        quiz, review = split_fused_response(raw)
+        if not hits:
+            prompt_tokens += estimate_tokens(get_fused_prompt().format(**inputs))
+            completion_tokens += estimate_tokens(raw)
+            llm_calls += 1
+        quiz = checked(quiz)
+        # The fused review describes the quiz before validation, so review again if MCQs were dropped or replaced
+        fused = not result.get("validation", {}).get("rejected")
+    elif output != "text":
+        quiz, structured = generate_structured_quiz(generation_inputs, output, bypass_cache=bypass_cache,
+                                                    on_token=on_token)
+        prompt_tokens += structured["prompt_tokens"]
+        completion_tokens += structured["completion_tokens"]
+        llm_calls += structured["attempts"]
+        result["structured"] = structured
+        if not structured["accepted"] and not banked:
+            raise Exception(f"No MCQ passed the schema after {structured['attempts']} structured-output attempts")
+        if banked:
+            quiz = merge_quizzes([json.dumps(renumber(banked)), quiz])
+        quiz = checked(quiz)
+    else:
+        # Fused mode falls back to separate calls when the text has to be chunked
+        if hedge and hedge.n > 1 and len(chunk_inputs) == 1:
+            quiz, hedged = hedged_quiz(generation_inputs, hedge, bypass_cache)
+            if on_token is not None:
+                on_token(quiz)
+            prompt_tokens += hedged["prompt_tokens"]
+            completion_tokens += hedged["completion_tokens"]
+            llm_calls += hedged["candidates"]
+            result["hedge"] = hedged
+        else:
+            with cache_hits() as hits:
+                if on_token is not None and len(chunk_inputs) == 1:
+                    parts = []
+                    for token in stream_quiz(generation_inputs, bypass_cache=bypass_cache):
+                        parts.append(token)
+                        on_token(token)
+                    quiz = "".join(parts)
+                else:
+                    quiz = generate_quiz_text(generation_inputs, bypass_cache=bypass_cache)
+            # Chunks answered from the cache cost no model call
+            cached_chunks = [chunk for chunk, _ in hits]
+            fresh = [chunk for chunk in chunk_inputs if chunk not in cached_chunks]
+            prompt_tokens += sum(estimate_tokens(get_prompts()[0].format(**chunk)) for chunk in fresh)
+            completion_tokens += max(0, estimate_tokens(quiz) - sum(estimate_tokens(text) for _, text in hits))
+            llm_calls += len(fresh)
+        if banked:
+            quiz = merge_quizzes([json.dumps(renumber(banked)), quiz])
+        quiz = checked(quiz)
+
+    if not fused:
+        review_inputs = {**inputs, "quiz": quiz}
+        review = None
+        review_cached = False
+        if mode in ("standard", "fused"):
+            with cache_hits() as hits:
+                review = chains.review_chain.invoke(review_inputs, config)
+            review_cached = bool(hits)
+        elif mode == "skip":
+            review = ""
+        else:
+            # copy_context keeps the review in the caller's metrics run
+            result["review_future"] = _review_executor.submit(
+                contextvars.copy_context().run, chains.review_chain.invoke, review_inputs, config
+            )
+        if mode != "skip" and not review_cached:
+            prompt_tokens += estimate_tokens(get_prompts()[1].format(**review_inputs))
+            completion_tokens += estimate_tokens(review or "")
+            llm_calls += 1
+
+    if bank is not None:
+        served = {mcq["mcq"] for mcq in banked}
+        generated = [mcq for mcq in parse_quiz_json(quiz).values()
+                     if isinstance(mcq, dict) and mcq.get("mcq") not in served]
+        added = _bank_mcqs(bank, result, generated, inputs, source_hash, review) if shortfall > 0 else 0
+        result["bank"] = {"served": len(banked), "added": added}
+
+    result.update({
+        "quiz": quiz,
+        "review": review,
+        "metrics": {
+            "mode": mode,
+            "output": output,
+            "run_id": current_run_id(),
+            "latency_s": round(time.perf_counter() - start, 3),
+            "llm_calls": llm_calls,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        },
+    })
+    logging.info(f"Generated quiz: {result['metrics']}")
+    return result
+
+
+def _bank_mcqs(bank, result, mcqs, inputs, source_hash, review):
+    """Add generated MCQs to the bank; a deferred review is filled in once it finishes"""
+    added = bank.add_mcqs(mcqs, inputs["subject"], inputs["tone"], source_hash, review or "")
+    if added and result.get("review_future") is not None:
+        # Registered after add_mcqs, so a review that is already done still finds the rows
+        def store_review(future):
+            if future.exception() is None:
+                bank.set_review(mcqs, inputs["subject"], source_hash, future.result())
+
+        result["review_future"].add_done_callback(store_review)
+    return added
+
+
+def generate_incremental(inputs, document, mode="standard", bypass_cache=False, on_token=None, validate=True,
+                         output="text", hedge=None, versions=None, bank=None, source_hash=None):
+    """generate_quiz for a document that may be a revision of one generated before.
+
+    `document` names the document across versions (e.g. its file name). The
+    MCQs of the stored version whose source section is unchanged are kept,
+    and generate_quiz only runs on the new or edited sections (see
+    incremental.plan_update). The first version of a document is generated
+    in full. The review always covers the whole quiz; it is reused as is when
+    nothing changed. result["provenance"] has the source span of each MCQ
+    and result["incremental"] what was kept and regenerated.
+
+    With a QuestionBank as `bank`, the first version is served from and added
+    to the bank like in generate_quiz; later versions add their new MCQs.
+    """
+    from .incremental import attribute_mcqs, split_sections
+    from .validation import renumber
+
+    if mode not in GENERATION_MODES:
+        raise Exception(f"Unknown generation mode '{mode}'. Use one of: {', '.join(GENERATION_MODES)}")
+    versions = versions if versions is not None else get_quiz_versions()
+    text = inputs["text"]
+    with track_run(current_run_id()):
+        start = time.perf_counter()
+        sections = split_sections(text)
+        if not sections:
+            raise Exception("The document has no text to generate a quiz from")
+        previous = None if bypass_cache else versions.get(document, inputs["subject"], inputs["tone"])
+        stats = {"previous": previous is not None, "sections": len(sections), "chars": len(text)}
+        if previous is None:
+            # First version: a normal generation, then each MCQ is attributed to a section
+            result = generate_quiz(inputs, mode=mode, bypass_cache=bypass_cache, on_token=on_token,
+                                   validate=validate, bank=bank, source_hash=source_hash, output=output, hedge=hedge)
+            new = [mcq for mcq in parse_quiz_json(result["quiz"]).values() if isinstance(mcq, dict)]
+            placed = list(zip(attribute_mcqs(new, text, sections), new))
+            review = result["review"]
+            stats.update(changed_sections=len(sections), changed_chars=len(text), kept=0, generated=len(new),
+                         review_reused=False)
+        else:
+            result, placed, review = _update_incremental(inputs, mode, bypass_cache, on_token, validate, output,
+                                                         hedge, previous, sections, stats)
+            if bank is not None:
+                from .question_bank import document_hash
+
+                # Kept MCQs carry the fingerprint of their source section and are in the bank already
+                generated = [mcq for _, mcq in placed if "source" not in mcq]
+                added = _bank_mcqs(bank, result, generated, inputs, source_hash or document_hash(text), review)
+                result["bank"] = {"served": 0, "added": added}
+            result["metrics"]["latency_s"] = round(time.perf_counter() - start, 3)
+
+        mcqs = [{key: value for key, value in mcq.items() if key not in ("no", "source")} for _, mcq in placed]
+        result["quiz"] = json.dumps(renumber(mcqs))
+        result["provenance"] = [{"no": str(number), "section": index, "start": sections[index].start,
+                                 "end": sections[index].end} for number, (index, _) in enumerate(placed, 1)]
+        result["incremental"] = stats
+        key = (document, inputs["subject"], inputs["tone"])
+        versions.put(*key, sections, [{**mcq, "source": sections[index].fingerprint}
+                                      for (index, _), mcq in zip(placed, mcqs)], review or "")
+        if result.get("review_future") is not None:
+            def store_review(future):
+                if future.exception() is None:
+                    versions.set_review(*key, future.result())
+
+            result["review_future"].add_done_callback(store_review)
+    logging.info(f"Incremental generation of {document}: {stats}")
+    return result
+
+
+def _update_incremental(inputs, mode, bypass_cache, on_token, validate, output, hedge, previous, sections, stats):
+    """Regenerate only what plan_update says changed; returns (result, [(section, mcq)], review)"""
+    from .incremental import attribute_mcqs, plan_update
+    from .validation import regeneration_inputs, renumber
+
+    chains = get_chains()
+    text = inputs["text"]
+    kept, generate_from, count, changed = plan_update(previous, text, sections, int(inputs["number"]))
+    result = dict(inputs)
+    metrics = {"mode": mode, "output": output, "run_id": current_run_id(), "latency_s": 0.0,
+               "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cache_hits": 0}
+    new = []
+    if count > 0:
+        generation_inputs = {**inputs, "number": count,
+                             "text": "\n\n".join(text[sections[index].start:sections[index].end]
+                                                  for index in generate_from)}
+        if kept:
+            generation_inputs = regeneration_inputs(generation_inputs, [mcq for _, mcq in kept], count)
+        # The review below covers the whole quiz, so the changed part is generated without one
+        generated = generate_quiz(generation_inputs, mode="skip", bypass_cache=bypass_cache, on_token=on_token,
+                                  validate=validate, output=output, hedge=hedge)
+        for name in ("llm_calls", "prompt_tokens", "completion_tokens", "cache_hits"):
+            metrics[name] += generated["metrics"][name]
+        result.update((name, generated[name]) for name in ("validation", "structured", "hedge") if name in generated)
+        new = [mcq for mcq in parse_quiz_json(generated["quiz"]).values() if isinstance(mcq, dict)]
+    # Kept MCQs first within a section, then everything in document order
+    placed = sorted(kept + list(zip(attribute_mcqs(new, text, sections, generate_from), new)),
+                    key=lambda pair: pair[0])
+
+    reused = not new and len(kept) == len(previous["mcqs"]) and bool(previous["review"]) and mode != "skip"
+    review = None
+    if reused:
+        review = previous["review"]
+    elif mode == "skip":
+        review = ""
+    else:
+        review_inputs = {**inputs, "quiz": json.dumps(renumber([mcq for _, mcq in placed]))}
+        review_cached = False
+        if mode == "deferred":
+            result["review_future"] = _review_executor.submit(
+                contextvars.copy_context().run, chains.review_chain.invoke, review_inputs,
+                {"configurable": {"bypass_cache": bypass_cache}})
+        else:
+            with cache_hits() as hits:
+                review = chains.review_chain.invoke(review_inputs, {"configurable": {"bypass_cache": bypass_cache}})
+            review_cached = bool(hits)
+            metrics["cache_hits"] += len(hits)
+        if not review_cached:
+            metrics["prompt_tokens"] += estimate_tokens(get_prompts()[1].format(**review_inputs))
+            metrics["completion_tokens"] += estimate_tokens(review or "")
+            metrics["llm_calls"] += 1
+
+    stats.update(changed_sections=len(changed),
+                 changed_chars=sum(sections[index].end - sections[index].start for index in changed),
+                 kept=len(kept), generated=len(new), review_reused=reused)
+    result.update(review=review, metrics=metrics)
+    return result, placed, review
+
+# Streaming generation: quiz tokens are yielded as they arrive so the UI can
+# show each MCQ as soon as it is complete. The cached text is used when present.
+def stream_quiz(inputs, bypass_cache=False):
+    """Yield the quiz response text piece by piece, then store it in the cache if it is complete"""
+    chains = get_chains()
+    response_cache = get_response_cache()
+    key = cache_key(**quiz_cache_fields(inputs, model_id(chains.llm)))
+    cached = None if bypass_cache else response_cache.get(key)
+    if cached is not None:
+        record_hit(inputs, cached)
+        yield cached
+        return
+
+    parts = []
+    for token in chains.quiz_stream_chain.stream(inputs):
+        parts.append(token)
+        yield token
+    quiz = "".join(parts)
+    if complete_response(quiz):
+        response_cache.set(key, quiz)
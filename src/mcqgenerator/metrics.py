@@ -0,0 +1,217 @@
+"""Per-stage latency, token and throughput metrics.
+
+Every pipeline stage (read_file, quiz_chain, review_chain, quiz_table,
+create_pdf, ...) reports one event with its wall time, time to first token and
+prompt/completion tokens. LCEL stages are measured by the LangChain callback
+handler in callbacks.py; plain functions use the @timed decorator. Events are
+grouped into runs (one quiz generation), appended to a JSONL file when
+configured, and aggregated into Prometheus-style counters and histograms that
+can be scraped from a local HTTP endpoint.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets for stage wall time and time to first token, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Events kept in memory for per-run summaries
+MAX_EVENTS = 10000
+
+_current_run = contextvars.ContextVar("mcqgen_run", default=None)
+
+
+def current_run_id():
+    return _current_run.get()
+
+
+@contextmanager
+def track_run(run_id=None):
+    """Group every stage recorded inside the block under one run id"""
+    run_id = run_id or uuid.uuid4().hex[:12]
+    token = _current_run.set(run_id)
+    try:
+        yield run_id
+    finally:
+        _current_run.reset(token)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRecorder:
+    """Collects stage events and keeps running counters and histograms per stage."""
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._events = []
+        self._calls = {}
+        self._errors = {}
+        self._tokens = {}
+        self._latency = {}
+        self._ttft = {}
+        self._gauges = {}
+
+    def record(self, stage, wall_s, ttft_s=None, prompt_tokens=0, completion_tokens=0, error=None,
+               run_id=None, **extra):
+        """Record one stage execution and return the event dict"""
+        event = {
+            "ts": time.time(),
+            "run_id": run_id or current_run_id(),
+            "stage": stage,
+            "wall_s": round(wall_s, 6),
+            "ttft_s": None if ttft_s is None else round(ttft_s, 6),
+            "prompt_tokens": int(prompt_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "error": error,
+            **extra,
+        }
+        with self._lock:
+            self._events.append(event)
+            del self._events[:-MAX_EVENTS]
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+            for kind in ("prompt", "completion"):
+                key = (stage, kind)
+                self._tokens[key] = self._tokens.get(key, 0) + event[f"{kind}_tokens"]
+            self._latency.setdefault(stage, _Histogram()).observe(wall_s)
+            if ttft_s is not None:
+                self._ttft.setdefault(stage, _Histogram()).observe(ttft_s)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event) + "\n")
+        return event
+
+    def set_gauge(self, name, value, help_text="", **labels):
+        """Set a gauge (e.g. a queue depth) exported as mcqgen_<name>"""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = (value, help_text)
+
+    def gauges(self, name):
+        """{labels tuple: value} of one gauge"""
+        with self._lock:
+            return {labels: value for (gauge, labels), (value, _) in self._gauges.items() if gauge == name}
+
+    def events(self, run_id=None):
+        with self._lock:
+            return [event for event in self._events if run_id is None or event["run_id"] == run_id]
+
+    def summary(self, run_id=None):
+        """Per-stage totals ({stage: {calls, wall_s, ttft_s, prompt_tokens, completion_tokens}}) for a run"""
+        stages = {}
+        for event in self.events(run_id):
+            stage = stages.setdefault(event["stage"], {
+                "calls": 0, "wall_s": 0.0, "ttft_s": None, "prompt_tokens": 0, "completion_tokens": 0,
+            })
+            stage["calls"] += 1
+            stage["wall_s"] = round(stage["wall_s"] + event["wall_s"], 6)
+            stage["prompt_tokens"] += event["prompt_tokens"]
+            stage["completion_tokens"] += event["completion_tokens"]
+            if event["ttft_s"] is not None and stage["ttft_s"] is None:
+                stage["ttft_s"] = event["ttft_s"]
+        for stage in stages.values():
+            tokens = stage["completion_tokens"]
+            stage["tokens_per_s"] = round(tokens / stage["wall_s"], 1) if tokens and stage["wall_s"] else None
+        return stages
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ["# HELP mcqgen_stage_calls_total Stage executions.", "# TYPE mcqgen_stage_calls_total counter"]
+            lines += [f'mcqgen_stage_calls_total{{stage="{s}"}} {n}' for s, n in sorted(self._calls.items())]
+            lines += ["# HELP mcqgen_stage_errors_total Failed stage executions.",
+                      "# TYPE mcqgen_stage_errors_total counter"]
+            lines += [f'mcqgen_stage_errors_total{{stage="{s}"}} {n}' for s, n in sorted(self._errors.items())]
+            lines += ["# HELP mcqgen_tokens_total LLM tokens by stage.", "# TYPE mcqgen_tokens_total counter"]
+            lines += [f'mcqgen_tokens_total{{stage="{s}",kind="{k}"}} {n}' for (s, k), n in sorted(self._tokens.items())]
+            for name, help_text, histograms in (
+                ("mcqgen_stage_seconds", "Stage wall time.", self._latency),
+                ("mcqgen_time_to_first_token_seconds", "Time to the first streamed token.", self._ttft),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for stage, histogram in sorted(histograms.items()):
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                        lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            described = set()
+            for (name, labels), (value, help_text) in sorted(self._gauges.items()):
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP mcqgen_{name} {help_text}", f"# TYPE mcqgen_{name} gauge"]
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"mcqgen_{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=None)
+def get_metrics():
+    """The process-wide recorder; set $MCQGEN_METRICS_PATH to also write events as JSONL"""
+    path = os.getenv("MCQGEN_METRICS_PATH")
+    if path and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return MetricsRecorder(path)
+
+
+def timed(stage):
+    """Decorator that records each call of a plain function as `stage`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                get_metrics().record(stage, time.perf_counter() - start, error=str(e)[:200])
+                raise
+            get_metrics().record(stage, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def serve_metrics(port=None, host="127.0.0.1"):
+    """Serve get_metrics().prometheus() at http://host:port/metrics from a daemon thread (once per port)"""
+    port = int(port or os.getenv("MCQGEN_METRICS_PORT", "9464"))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = get_metrics().prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="mcqgen-metrics", daemon=True).start()
+    return server
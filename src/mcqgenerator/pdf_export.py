@@ -0,0 +1,197 @@
+"""PDF export of generated quizzes with reportlab.
+
+Styles are built once per process, rows are rendered from plain tuples, and
+the rendered bytes are memoized so Streamlit reruns don't rebuild the document.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from .metrics import timed
+
+MEMO_SIZE = 32
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Return the (title, heading, normal) paragraph styles, built once"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#667eea'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#764ba2'),
+        spaceAfter=12,
+        spaceBefore=12,
+        fontName='Helvetica-Bold'
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        alignment=TA_LEFT
+    )
+    return title_style, heading_style, normal_style
+
+
+def quiz_rows(df):
+    """(number, mcq, choices, correct) tuples from a get_table_data or QuizTable.to_dataframe DataFrame"""
+    if "Choices" in df.columns:
+        return list(df[["MCQ", "Choices", "Correct"]].itertuples(index=True, name=None))
+    from .quiz_table import option_columns
+
+    columns = option_columns(df)
+    rows = []
+    for number, mcq, correct, *options in df[["MCQ", "Correct", *columns.values()]].itertuples(index=True, name=None):
+        choices = tuple((key, value) for key, value in zip(columns, options) if isinstance(value, str) and value)
+        rows.append((number, mcq, choices, correct))
+    return rows
+
+
+def choices_markup(choices):
+    """Options of a row, one per line: a "a -> x || b -> y" string or (key, value) pairs"""
+    if isinstance(choices, str):
+        return choices.replace('||', '<br/>')
+    return "<br/>".join(f"{key} -> {value}" for key, value in choices)
+
+
+def table_rows(table_data, start=1):
+    """(number, mcq, choices, correct) tuples straight from get_table_data output"""
+    return [(i, row["MCQ"], row["Choices"], row["Correct"]) for i, row in enumerate(table_data, start)]
+
+
+def render_quiz_pdf(rows, review, subject, mcq_count, tone, generated_on):
+    """Render the quiz PDF and return its bytes"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+    title_style, heading_style, normal_style = get_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
+                           topMargin=72, bottomMargin=18)
+
+    # Container for the 'Flowable' objects
+    elements = [
+        Paragraph(f"<b>{subject} - Multiple Choice Questions</b>", title_style),
+        Spacer(1, 12),
+    ]
+
+    # Add metadata
+    meta_data = f"""
+    <b>Generated on:</b> {generated_on.strftime('%B %d, %Y at %I:%M %p')}<br/>
+    <b>Number of Questions:</b> {mcq_count}<br/>
+    <b>Difficulty Level:</b> {tone}<br/>
+    """
+    elements.append(Paragraph(meta_data, normal_style))
+    elements.append(Spacer(1, 20))
+
+    # Add questions
+    for number, mcq, choices, correct in rows:
+        elements.append(Paragraph(f"<b>Question {number}:</b> {mcq}", heading_style))
+        elements.append(Spacer(1, 6))
+        elements.append(Paragraph(choices_markup(choices), normal_style))
+        elements.append(Spacer(1, 6))
+        elements.append(Paragraph(f"<b>Correct Answer:</b> <font color='green'>{correct}</font>", normal_style))
+        elements.append(Spacer(1, 20))
+
+    # Add review section on its own page
+    elements.append(PageBreak())
+    elements.append(Paragraph("<b>AI Review & Analysis</b>", title_style))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(review or "", normal_style))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _memo_key(quiz, review, subject, mcq_count, tone, generated_on):
+    payload = json.dumps([quiz, review, subject, mcq_count, tone, generated_on.isoformat()], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _render_memoized(key, rows, review, subject, mcq_count, tone, generated_on):
+    # rows may be a callable, so a memo hit never builds them
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    pdf_bytes = render_quiz_pdf(rows() if callable(rows) else rows, review, subject, mcq_count, tone, generated_on)
+    with _memo_lock:
+        _memo[key] = pdf_bytes
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return pdf_bytes
+
+
+def render_quiz_pdf_cached(rows, review, subject, mcq_count, tone, generated_on):
+    """render_quiz_pdf, memoized per (quiz, review, params)"""
+    key = _memo_key(rows, review, subject, mcq_count, tone, generated_on)
+    return _render_memoized(key, rows, review, subject, mcq_count, tone, generated_on)
+
+
+# Function to create PDF
+@timed("create_pdf")
+def create_pdf(df, review, subject, mcq_count, tone, generated_on=None, quiz_key=None):
+    """Create the quiz PDF for a quiz DataFrame and return it as a BytesIO.
+
+    quiz_key (a job id or quiz hash) identifies the quiz in the memo, so reruns
+    don't hash every row of df; without it the rows themselves are the key.
+    """
+    generated_on = generated_on or datetime.now()
+    if quiz_key is None:
+        return BytesIO(render_quiz_pdf_cached(quiz_rows(df), review, subject, mcq_count, tone, generated_on))
+    key = _memo_key(["quiz_key", quiz_key], review, subject, mcq_count, tone, generated_on)
+    return BytesIO(_render_memoized(key, lambda: quiz_rows(df), review, subject, mcq_count, tone, generated_on))
+
+
+def _export_one(job):
+    pdf_bytes = render_quiz_pdf(
+        job["rows"], job.get("review", ""), job["subject"], job.get("mcq_count", len(job["rows"])),
+        job.get("tone", ""), job.get("generated_on") or datetime.now()
+    )
+    with open(job["path"], "wb") as f:
+        f.write(pdf_bytes)
+    return job["path"]
+
+
+def export_pdfs(jobs, workers=None):
+    """Render many quizzes to PDF files in a process pool.
+
+    Each job is a dict with "rows", "subject", "path" and optionally "review",
+    "mcq_count", "tone" and "generated_on". Returns the written paths in order.
+    """
+    jobs = list(jobs)
+    for job in jobs:
+        if os.path.dirname(job["path"]):
+            os.makedirs(os.path.dirname(job["path"]), exist_ok=True)
+    if workers == 1 or len(jobs) <= 1:
+        return [_export_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_export_one, jobs))
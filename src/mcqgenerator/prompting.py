@@ -0,0 +1,144 @@
+"""Token-budget-aware construction of quiz prompt inputs."""
+import json
+import logging
+import re
+from collections import Counter
+
+# Llama 3.3 70B on Groq has a 128k window; stay well below it by default
+DEFAULT_CONTEXT_TOKENS = 32000
+# Room left for the model's answer, per requested MCQ
+OUTPUT_TOKENS_PER_MCQ = 90
+# Non-empty lines at the top and at the bottom of a page where headers, footers and page numbers sit
+EDGE_LINES = 2
+
+_WORD_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_REFERENCE_MARKERS = re.compile(r"\[(?:\d+(?:\s*[,–-]\s*\d+)*|citation needed|note \d+)\]")
+_PAGE_NUMBER_LINE = re.compile(r"^\s*(?:page\s*)?\d+(?:\s*(?:of|/)\s*\d+)?\s*$", re.IGNORECASE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with "
+    "also such these those can may been their they them than then there into more most other".split()
+)
+
+
+def count_tokens(text):
+    """Approximate BPE token count: long words and numbers count as several pieces, punctuation as one."""
+    if not text:
+        return 0
+    total = 0
+    for piece in _WORD_PIECES.findall(text):
+        total += 1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1 + (len(piece) - 1) // 3
+    return total
+
+
+def compact_schema(response_json):
+    """Smallest example of the response format: one MCQ, no whitespace"""
+    first_key = next(iter(response_json))
+    return json.dumps({first_key: response_json[first_key]}, separators=(",", ":"))
+
+
+def split_pages(text, page_offsets):
+    """The text of each page, given the offset where each page starts"""
+    bounds = list(page_offsets) + [len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _edge_key(line):
+    words = line.lower().split()
+    # "Chapter 3 - page 12" and "Chapter 3 - page 13" are the same running footer; sentences keep their numbers
+    return re.sub(r"\d+", "#", " ".join(words)) if len(words) <= 6 else " ".join(words)
+
+
+def strip_page_edges(pages):
+    """Drop page numbers and running headers/footers from the top and bottom lines of each page.
+
+    A line counts as a running header or footer when it sits on the edge of at
+    least a third of the pages (and at least 3); lines in the body of a page
+    are never removed, however often they repeat.
+    """
+    page_lines = [page.splitlines() for page in pages]
+    edges = []
+    for lines in page_lines:
+        filled = [index for index, line in enumerate(lines) if line.strip()]
+        edges.append(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+    counts = Counter()
+    for lines, indices in zip(page_lines, edges):
+        counts.update({_edge_key(lines[index]) for index in indices if len(lines[index].strip()) <= 80})
+    running = {key for key, count in counts.items() if count >= max(3, len(pages) // 3)}
+    return "\n".join(
+        "\n".join(line for index, line in enumerate(lines)
+                  if index not in indices or not (_PAGE_NUMBER_LINE.match(line) or _edge_key(line) in running))
+        for lines, indices in zip(page_lines, edges)
+    )
+
+
+def strip_boilerplate(text, page_offsets=None):
+    """Remove reference markers like [1] and, given the page offsets of a PDF, page numbers and running
+    headers/footers at the page edges"""
+    if page_offsets and len(page_offsets) > 1:
+        text = strip_page_edges(split_pages(text, page_offsets))
+    text = _REFERENCE_MARKERS.sub("", text)
+    text = "\n".join(line.rstrip() for line in text.splitlines())
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" +([.,;:])", r"\1", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def information_density(paragraph):
+    """Share of distinct content words, so repetitive or filler paragraphs score low"""
+    words = [word.lower() for word in re.findall(r"[A-Za-z]{3,}", paragraph)]
+    if not words:
+        return 0.0
+    content = [word for word in words if word not in _STOPWORDS]
+    return len(set(content)) / len(words)
+
+
+def select_paragraphs(text, max_tokens):
+    """Keep the densest paragraphs that fit in max_tokens, in their original order"""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    ranked = sorted(range(len(paragraphs)), key=lambda i: information_density(paragraphs[i]), reverse=True)
+    chosen = set()
+    used = 0
+    for i in ranked:
+        size = count_tokens(paragraphs[i])
+        if used + size <= max_tokens:
+            chosen.add(i)
+            used += size
+    return "\n\n".join(paragraphs[i] for i in sorted(chosen))
+
+
+def compress_text(text, max_tokens=None, page_offsets=None):
+    """Strip boilerplate, then drop the least informative paragraphs if over max_tokens"""
+    text = strip_boilerplate(text, page_offsets)
+    if max_tokens is not None and count_tokens(text) > max_tokens:
+        text = select_paragraphs(text, max_tokens)
+    return text
+
+
+def build_quiz_inputs(text, number, subject, tone, response_json, template=None,
+                      context_tokens=DEFAULT_CONTEXT_TOKENS, fit_context=False, page_offsets=None):
+    """Build quiz_chain inputs with a compact schema example and compressed text.
+
+    Boilerplate is always stripped (page edges only with the `page_offsets` of
+    an Extraction). With fit_context=True the least informative paragraphs are
+    also dropped so one call fits in `context_tokens`. It is off by default
+    because generate_quiz splits long texts into CHUNK_TOKENS-sized calls that
+    each fit, which keeps the whole document. Raises before any LLM call if
+    the prompt overhead and expected output alone don't fit.
+    """
+    schema = compact_schema(response_json)
+    overhead = count_tokens(template or "") + count_tokens(schema) + count_tokens(f"{number}{subject}{tone}") * 2
+    output_reserve = int(number) * OUTPUT_TOKENS_PER_MCQ
+    text_budget = context_tokens - overhead - output_reserve
+    if text_budget <= 0:
+        raise Exception(
+            f"{number} MCQs need about {output_reserve + overhead} tokens, "
+            f"more than the {context_tokens}-token context budget"
+        )
+
+    original_tokens = count_tokens(text) + count_tokens(json.dumps(response_json))
+    text = compress_text(text, text_budget if fit_context else None, page_offsets)
+
+    inputs = {"text": text, "number": number, "subject": subject, "tone": tone, "RESPONSE_JSON": schema}
+    saved = original_tokens - count_tokens(text) - count_tokens(schema)
+    logging.info(f"Prompt inputs: ~{count_tokens(text) + overhead} tokens, ~{saved} input tokens saved")
+    return inputs
@@ -0,0 +1,284 @@
+"""Persistent question bank of generated MCQs (SQLite with an FTS5 index).
+
+Every generated MCQ is stored with its subject, tone, source document hash and
+review, so later requests for the same material can be served from the bank
+and only the shortfall is generated.
+
+CLI:
+    python -m mcqgenerator.question_bank import quiz.json --subject Biology --tone Easy
+    python -m mcqgenerator.question_bank export bank.jsonl --subject Biology
+    python -m mcqgenerator.question_bank export bank.arrow   # or .parquet, see quiz_table.py
+    python -m mcqgenerator.question_bank export bank.xlsx    # or .csv, .gift.txt, .qti.xml, see exporters.py
+    python -m mcqgenerator.question_bank query --subject Biology --search "photosynthesis" --limit 10
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from .cache import normalize_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    mcq TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct TEXT NOT NULL,
+    subject TEXT NOT NULL COLLATE NOCASE,
+    tone TEXT NOT NULL COLLATE NOCASE,
+    source_hash TEXT NOT NULL,
+    review TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    UNIQUE (source_hash, subject, mcq)
+);
+CREATE INDEX IF NOT EXISTS questions_lookup ON questions (subject, tone, source_hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(mcq, content='questions', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, mcq) VALUES (new.id, new.mcq);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, mcq) VALUES ('delete', old.id, old.mcq);
+END;
+"""
+# Columns exported next to each MCQ
+BANK_COLUMNS = ("subject", "tone", "source_hash")
+
+
+def document_hash(text):
+    """Hash of the normalized source text, shared by every MCQ generated from it"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _row_dict(row):
+    return {"mcq": row["mcq"], "options": json.loads(row["options"]), "correct": row["correct"],
+            "subject": row["subject"], "tone": row["tone"], "source_hash": row["source_hash"],
+            "review": row["review"]}
+
+
+class QuestionBank:
+    """Indexed store of MCQs filtered by subject, tone (difficulty) and source document."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # The app, the job workers and the CLI write to the same bank, so wait for locks and use WAL
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _insert(self, rows):
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO questions "
+                "(mcq, options, correct, subject, tone, source_hash, review, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def add_mcqs(self, mcqs, subject, tone, source_hash="", review=""):
+        """Store MCQ dicts (Response.json items); returns how many were new"""
+        now = time.time()
+        return self._insert([
+            (str(mcq.get("mcq", "")), json.dumps(mcq.get("options", {})), str(mcq.get("correct", "")),
+             subject, tone, source_hash, review or "", now)
+            for mcq in mcqs if isinstance(mcq, dict)
+        ])
+
+    def add_quiz(self, quiz, subject, tone, source_hash="", review=""):
+        """Store every MCQ of a quiz (dict or model response string)"""
+        from .utils import parse_quiz_json
+
+        return self.add_mcqs(parse_quiz_json(quiz).values(), subject, tone, source_hash, review)
+
+    def set_review(self, mcqs, subject, source_hash, review):
+        """Fill in the review of stored MCQs that were added without one (deferred reviews)"""
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.executemany(
+                "UPDATE questions SET review = ? WHERE source_hash = ? AND subject = ? AND mcq = ? AND review = ''",
+                [(review or "", source_hash, subject, str(mcq.get("mcq", ""))) for mcq in mcqs],
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def _where(self, subject=None, tone=None, source_hash=None, search=None):
+        clauses = []
+        params = []
+        for column, value in (("subject", subject), ("tone", tone), ("source_hash", source_hash)):
+            if value:
+                clauses.append(f"q.{column} = ?")
+                params.append(value)
+        if search:
+            clauses.append("q.id IN (SELECT rowid FROM questions_fts WHERE questions_fts MATCH ?)")
+            params.append(search)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, subject=None, tone=None, source_hash=None, search=None, limit=None):
+        """Matching MCQs as Response.json-style dicts, oldest first"""
+        where, params = self._where(subject, tone, source_hash, search)
+        sql = f"SELECT q.* FROM questions q{where} ORDER BY q.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [_row_dict(row) for row in rows]
+
+    def iter_query(self, subject=None, tone=None, source_hash=None, search=None, batch_size=10000):
+        """Like query, but fetches `batch_size` rows at a time so any number of MCQs can be streamed"""
+        where, params = self._where(subject, tone, source_hash, search)
+        where = f"{where} AND q.id > ?" if where else " WHERE q.id > ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connect().execute(
+                    f"SELECT q.* FROM questions q{where} ORDER BY q.id LIMIT ?", [*params, last_id, batch_size]
+                ).fetchall()
+            for row in rows:
+                yield _row_dict(row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def count(self, subject=None, tone=None, source_hash=None, search=None):
+        where, params = self._where(subject, tone, source_hash, search)
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM questions q{where}", params).fetchone()[0]
+
+    def export_jsonl(self, out, **filters):
+        """Write matching MCQs to a text file handle, one JSON object per line"""
+        written = 0
+        for mcq in self.iter_query(**filters):
+            out.write(json.dumps(mcq) + "\n")
+            written += 1
+        return written
+
+    def export_table(self, **filters):
+        """Matching MCQs as a columnar QuizTable (with subject, tone and source_hash columns)"""
+        from .quiz_table import QuizTable
+
+        return QuizTable.from_mcqs(self.iter_query(**filters), extra=BANK_COLUMNS)
+
+    def export(self, path, fmt=None, **filters):
+        """Stream matching MCQs to a CSV, XLSX, JSONL, GIFT or QTI file (see exporters.export)"""
+        from .exporters import export, export_format
+
+        fmt = fmt or export_format(path)
+        options = {"extra": BANK_COLUMNS} if fmt in ("csv", "xlsx", "jsonl") else {}
+        if fmt in ("csv", "xlsx"):
+            options["option_keys"] = self.option_keys(**filters)
+        return export(self.iter_query(**filters), path, fmt, **options)
+
+    def option_keys(self, subject=None, tone=None, source_hash=None, search=None):
+        """Option keys used by matching MCQs, in order of first use"""
+        where, params = self._where(subject, tone, source_hash, search)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT o.key FROM questions q, json_each(q.options) o{where} GROUP BY o.key ORDER BY MIN(q.id)",
+                params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_jsonl(self, lines, batch_size=10000):
+        """Import lines written by export_jsonl; returns how many were new"""
+        now = time.time()
+        added = 0
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            mcq = json.loads(line)
+            rows.append((
+                str(mcq.get("mcq", "")), json.dumps(mcq.get("options", {})), str(mcq.get("correct", "")),
+                mcq.get("subject", ""), mcq.get("tone", ""), mcq.get("source_hash", ""), mcq.get("review", ""), now
+            ))
+            if len(rows) >= batch_size:
+                added += self._insert(rows)
+                rows = []
+        return added + (self._insert(rows) if rows else 0)
+
+
+def main(argv=None):
+    from .mcqgenerator import get_question_bank
+
+    parser = argparse.ArgumentParser(prog="python -m mcqgenerator.question_bank", description="Manage the MCQ question bank")
+    parser.add_argument("--bank", help="path to the bank database (default: $MCQGEN_BANK_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="import a quiz .json or an exported .jsonl file")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--subject", default="")
+    import_cmd.add_argument("--tone", default="")
+    import_cmd.add_argument("--source", default="", help="source document the quiz was generated from")
+
+    for name, help_text in (("export", "export questions as JSONL"), ("query", "print matching questions")):
+        cmd = commands.add_parser(name, help=help_text)
+        if name == "export":
+            cmd.add_argument("path", help="output .jsonl, .csv, .xlsx, .gift.txt, .qti.xml, .parquet or .arrow file "
+                                          "('-' for JSONL on stdout)")
+        cmd.add_argument("--subject")
+        cmd.add_argument("--tone")
+        cmd.add_argument("--source-hash")
+        cmd.add_argument("--search", help="full-text search over question text (FTS5 syntax)")
+        if name == "query":
+            cmd.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    bank = QuestionBank(args.bank) if args.bank else get_question_bank()
+
+    if args.command == "import":
+        with open(args.path, encoding="utf-8") as f:
+            if args.path.endswith(".jsonl"):
+                added = bank.import_jsonl(f)
+            else:
+                source_hash = ""
+                if args.source:
+                    with open(args.source, encoding="utf-8", errors="ignore") as source:
+                        source_hash = document_hash(source.read())
+                added = bank.add_quiz(f.read(), args.subject, args.tone, source_hash)
+        print(f"Imported {added} new question(s)")
+        return
+
+    from .quiz_table import IPC_SUFFIXES, PYARROW_MISSING, has_pyarrow
+
+    if args.command == "export" and args.path.endswith((".parquet", *IPC_SUFFIXES)) and not has_pyarrow():
+        parser.error(PYARROW_MISSING)
+    filters = {"subject": args.subject, "tone": args.tone, "source_hash": args.source_hash, "search": args.search}
+    if args.command == "export":
+        if args.path == "-":
+            written = bank.export_jsonl(sys.stdout, **filters)
+        elif args.path.endswith((".parquet", *IPC_SUFFIXES)):
+            table = bank.export_table(**filters)
+            table.write(args.path)
+            written = len(table)
+        elif args.path.endswith(".jsonl"):
+            with open(args.path, "w", encoding="utf-8") as out:
+                written = bank.export_jsonl(out, **filters)
+        else:
+            written = bank.export(args.path, **filters)
+        print(f"Exported {written} question(s)", file=sys.stderr)
+        return
+
+    for i, mcq in enumerate(bank.query(limit=args.limit, **filters), start=1):
+        options = " | ".join(f"{key}) {value}" for key, value in mcq["options"].items())
+        print(f"{i}. [{mcq['subject']}/{mcq['tone']}] {mcq['mcq']}\n   {options}\n   Correct: {mcq['correct']}")
+
+
+if __name__ == "__main__":
+    main()
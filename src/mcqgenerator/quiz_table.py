@@ -0,0 +1,320 @@
+"""Compact columnar representation of quizzes and question banks.
+
+A QuizTable keeps every text column in the Arrow large_string layout: one
+NumPy buffer of UTF-8 bytes plus an int64 offsets array, so a million
+questions cost a few flat arrays instead of millions of Python objects.
+Options stay structured (one column per option key, an Arrow struct on disk)
+and the correct answer is dictionary-encoded as small integer codes.
+
+With pyarrow installed the columns convert to Arrow and pandas without
+copying the text, and tables can be saved as Parquet or Arrow IPC; IPC files
+are memory-mapped when read back:
+
+    table = quiz_table(result["quiz"])
+    table.write("bank.arrow")
+    table = QuizTable.read("bank.arrow")  # memory-mapped
+"""
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from .metrics import timed
+
+# DataFrame column of option `key` (see QuizTable.to_dataframe)
+OPTION_COLUMN = "Option {}"
+IPC_SUFFIXES = (".arrow", ".ipc", ".feather")
+
+QuizRow = namedtuple("QuizRow", ["mcq", "options", "correct"])
+
+
+# pyarrow is the optional "arrow" extra of the package (setup.py)
+PYARROW_MISSING = "Arrow and Parquet support needs pyarrow: pip install -e '.[arrow]' (or pip install pyarrow)"
+
+
+def has_pyarrow():
+    """Whether Arrow/Parquet I/O is available, without importing pyarrow"""
+    import importlib.util
+
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception(PYARROW_MISSING)
+    return pyarrow
+
+
+class TextColumn:
+    """Strings stored as UTF-8 bytes and int64 offsets (Arrow large_string layout)."""
+
+    __slots__ = ("data", "offsets")
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array("q", [0])
+        for value in strings:
+            data += value.encode("utf-8")
+            offsets.append(len(data))
+        return cls._from_buffers(data, offsets)
+
+    @classmethod
+    def _from_buffers(cls, data, offsets):
+        return cls(np.frombuffer(data, dtype=np.uint8), np.frombuffer(offsets, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(memoryview(self.data)[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        data = memoryview(self.data)
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets, offsets[1:]):
+            yield str(data[start:stop], "utf-8")
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+    def to_arrow(self):
+        pa = _pyarrow()
+        return pa.LargeStringArray.from_buffers(len(self), pa.py_buffer(self.offsets), pa.py_buffer(self.data))
+
+    @classmethod
+    def from_arrow(cls, values):
+        """Wrap a string array's buffers without copying (nulls and narrow offsets need one copy)"""
+        pa = _pyarrow()
+        if values.null_count:
+            values = values.fill_null("")
+        if values.type != pa.large_string():
+            values = values.cast(pa.large_string())
+        _, offsets, data = values.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[values.offset:values.offset + len(values) + 1]
+        data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+        return cls(data, offsets)
+
+
+class _TextBuilder:
+    """Appends strings to a growing TextColumn; `pad` fills rows added before the column existed."""
+
+    __slots__ = ("data", "offsets")
+
+    def __init__(self, pad=0):
+        self.data = bytearray()
+        self.offsets = array("q", [0] * (pad + 1))
+
+    def append(self, value):
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def build(self):
+        return TextColumn._from_buffers(self.data, self.offsets)
+
+
+class QuizTable:
+    """Column-oriented MCQs: question text, one column per option and dictionary-encoded answers.
+
+    `extra` holds any further text columns (e.g. subject and tone of bank questions).
+    """
+
+    __slots__ = ("mcq", "options", "correct_codes", "correct_values", "extra")
+
+    def __init__(self, mcq, options, correct_codes, correct_values, extra=None):
+        self.mcq = mcq
+        self.options = options
+        self.correct_codes = correct_codes
+        self.correct_values = tuple(correct_values)
+        self.extra = extra or {}
+
+    @classmethod
+    def from_mcqs(cls, mcqs, extra=()):
+        """Build a table from Response.json-style MCQ dicts in one pass (any iterable, e.g. a DB cursor)"""
+        mcq_column = _TextBuilder()
+        option_columns = {}
+        extra_columns = {name: _TextBuilder() for name in extra}
+        codes = array("i")
+        values = {}
+        rows = 0
+        for item in mcqs:
+            mcq_column.append(str(item.get("mcq", item.get("question", ""))))
+            options = item.get("options", {})
+            if not isinstance(options, dict):
+                options = {"a": str(options)}
+            for key in options:
+                if key not in option_columns:
+                    option_columns[key] = _TextBuilder(pad=rows)
+            for key, column in option_columns.items():
+                column.append(str(options.get(key, "")))
+            correct = str(item.get("correct", item.get("answer", "")))
+            codes.append(values.setdefault(correct, len(values)))
+            for name, column in extra_columns.items():
+                column.append(str(item.get(name, "")))
+            rows += 1
+
+        dtype = np.int8 if len(values) <= np.iinfo(np.int8).max else np.int32
+        return cls(
+            mcq_column.build(),
+            {key: column.build() for key, column in option_columns.items()},
+            np.asarray(codes, dtype=dtype),
+            values,
+            {name: column.build() for name, column in extra_columns.items()},
+        )
+
+    @classmethod
+    def from_quiz(cls, quiz):
+        """Build a table from a quiz dict or a (possibly messy) quiz response string"""
+        from .utils import parse_quiz_json
+
+        if isinstance(quiz, str):
+            quiz = parse_quiz_json(quiz)
+        return cls.from_mcqs(quiz.values())
+
+    def __len__(self):
+        return len(self.mcq)
+
+    @property
+    def option_keys(self):
+        return tuple(self.options)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the table's arrays"""
+        columns = [self.mcq, *self.options.values(), *self.extra.values()]
+        return sum(column.nbytes for column in columns) + self.correct_codes.nbytes
+
+    def correct(self, index):
+        return self.correct_values[self.correct_codes[index]]
+
+    def row(self, index):
+        options = tuple((key, column[index]) for key, column in self.options.items())
+        return QuizRow(self.mcq[index], tuple(option for option in options if option[1]), self.correct(index))
+
+    def __iter__(self):
+        option_keys = self.option_keys
+        correct_values = self.correct_values
+        for mcq, code, *options in zip(self.mcq, self.correct_codes.tolist(), *self.options.values()):
+            yield QuizRow(mcq, tuple((key, value) for key, value in zip(option_keys, options) if value),
+                          correct_values[code])
+
+    def table_rows(self, start=1):
+        """(number, mcq, options, correct) tuples for pdf_export.render_quiz_pdf"""
+        return [(number, *row) for number, row in enumerate(self, start)]
+
+    def to_quiz(self):
+        """The table as a Response.json-style quiz dict"""
+        return {
+            str(number): {"no": str(number), "mcq": row.mcq, "options": dict(row.options), "correct": row.correct}
+            for number, row in enumerate(self, 1)
+        }
+
+    def to_arrow(self):
+        """pyarrow Table with an `options` struct column and a dictionary-encoded `correct` column"""
+        pa = _pyarrow()
+        option_keys = self.option_keys
+        if option_keys:
+            options = pa.StructArray.from_arrays([column.to_arrow() for column in self.options.values()],
+                                                 names=list(option_keys))
+        else:
+            options = pa.nulls(len(self), pa.struct([]))
+        correct = pa.DictionaryArray.from_arrays(pa.array(self.correct_codes),
+                                                 pa.array(self.correct_values, pa.large_string()))
+        columns = {"mcq": self.mcq.to_arrow(), "options": options, "correct": correct}
+        columns.update((name, column.to_arrow()) for name, column in self.extra.items())
+        return pa.table(columns)
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Wrap a table written by to_arrow without copying its text buffers"""
+        def single(name):
+            column = table.column(name)
+            return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+
+        options = single("options")
+        option_fields = [options.type.field(i).name for i in range(options.type.num_fields)]
+        correct = single("correct")
+        if not hasattr(correct, "indices"):
+            correct = correct.dictionary_encode()
+        extra = {name: TextColumn.from_arrow(single(name)) for name in table.column_names
+                 if name not in ("mcq", "options", "correct")}
+        return cls(
+            TextColumn.from_arrow(single("mcq")),
+            {key: TextColumn.from_arrow(options.field(key)) for key in option_fields},
+            correct.indices.fill_null(0).to_numpy(zero_copy_only=False),
+            [str(value) for value in correct.dictionary.to_pylist()],
+            extra,
+        )
+
+    def write(self, path):
+        """Save as Arrow IPC (.arrow/.ipc/.feather) or Parquet (.parquet)"""
+        pa = _pyarrow()
+        table = self.to_arrow()
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        elif path.endswith(IPC_SUFFIXES):
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            raise Exception(f"Unknown quiz table format for '{path}'. Use .parquet or one of {', '.join(IPC_SUFFIXES)}")
+        return path
+
+    @classmethod
+    def read(cls, path, memory_map=True):
+        """Load a saved table; Arrow IPC files are memory-mapped unless memory_map=False"""
+        pa = _pyarrow()
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            return cls.from_arrow(pq.read_table(path, memory_map=memory_map))
+        source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+        return cls.from_arrow(pa.ipc.open_file(source).read_all())
+
+    def to_dataframe(self):
+        """DataFrame with "MCQ", one "Option <key>" column per option, "Correct" and the extra columns.
+
+        Text columns share the table's buffers when pyarrow is installed.
+        """
+        import pandas as pd
+
+        columns = {"MCQ": self.mcq, **{OPTION_COLUMN.format(key): column for key, column in self.options.items()}}
+        correct = pd.Categorical.from_codes(self.correct_codes, categories=list(self.correct_values))
+        try:
+            _pyarrow()
+        except Exception:
+            data = {name: list(column) for name, column in columns.items()}
+            data["Correct"] = correct
+            data.update((name, list(column)) for name, column in self.extra.items())
+            return pd.DataFrame(data)
+
+        def series(column):
+            return pd.Series(pd.arrays.ArrowExtensionArray(column.to_arrow()), copy=False)
+
+        data = {name: series(column) for name, column in columns.items()}
+        data["Correct"] = pd.Series(correct, copy=False)
+        data.update((name, series(column)) for name, column in self.extra.items())
+        return pd.DataFrame(data, copy=False)
+
+
+@timed("quiz_table")
+def quiz_table(quiz):
+    """QuizTable of a generated quiz (dict or response string)"""
+    try:
+        return QuizTable.from_quiz(quiz)
+    except Exception as e:
+        raise Exception(f"Error parsing quiz data: {e}\nQuiz string preview: {str(quiz)[:500] if quiz else 'None'}")
+
+
+def option_columns(df):
+    """{option key: column name} of a QuizTable.to_dataframe DataFrame"""
+    prefix = OPTION_COLUMN.format("")
+    return {column[len(prefix):]: column for column in df.columns if str(column).startswith(prefix)}
@@ -0,0 +1,380 @@
+"""Client-side rate limiting for the Groq HTTP client.
+
+Every request to the API first takes one unit from a requests bucket and its
+estimated tokens from a tokens bucket. Both buckets start from
+$MCQGEN_RATE_LIMIT_RPM / $MCQGEN_RATE_LIMIT_TPM and are re-synced from the
+x-ratelimit-* headers of every response. Waiting requests are served in
+priority order, so interactive (Streamlit) requests go ahead of batch jobs
+(CLI, batch.py):
+
+    with request_priority(BATCH):
+        generate_quiz(inputs)
+
+429 responses pause all requests for the server's retry-after (or a jittered
+exponential backoff) and are retried. Queue depth per priority is exported as
+a gauge and each wait is recorded as an "llm_queue_wait" stage event through
+metrics.get_metrics().
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+
+from .metrics import get_metrics
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 12000
+# Completion tokens assumed for a request that doesn't set max_tokens
+COMPLETION_TOKENS_ESTIMATE = 1000
+MAX_ATTEMPTS = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+RETRY_STATUSES = (429, 503)
+
+_priority = contextvars.ContextVar("mcqgen_llm_priority", default=INTERACTIVE)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(priority):
+    """Send the LLM requests made inside the block with `priority` ("interactive" or "batch")"""
+    if priority not in PRIORITIES:
+        raise Exception(f"Unknown request priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+    token = _priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _priority.reset(token)
+
+
+def parse_duration(value):
+    """Seconds in a rate-limit reset header ("7.66s", "2m59.56s", "120ms" or plain seconds), or None"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def request_tokens(body):
+    """Estimated tokens (prompt + completion) of a chat completion request body"""
+    from .utils import estimate_tokens
+
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError):
+        return COMPLETION_TOKENS_ESTIMATE
+    prompt = sum(estimate_tokens(str(message.get("content") or "")) for message in payload.get("messages", []))
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or COMPLETION_TOKENS_ESTIMATE
+    return prompt + completion
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `capacity` units."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.rate = self.capacity / 60
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (requests larger than the bucket wait for a full one)"""
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining, reset_s, now):
+        """Adopt the server's view: `remaining` of `limit` units, fully refilled in `reset_s` seconds"""
+        self._refill(now)
+        self.capacity = float(limit)
+        # Responses to earlier requests arrive late and don't count the ones
+        # sent since, so the server's count may only lower the local one
+        self.level = min(float(remaining), self.level, self.capacity)
+        if reset_s and limit > remaining:
+            self.rate = (limit - remaining) / reset_s
+        self.updated = now
+
+
+class RateLimiter:
+    """Requests/min and tokens/min token buckets with a priority queue of waiting requests."""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limited = 0
+        self._cond = threading.Condition()
+        self._queue = []
+        # ticket -> (event loop, asyncio.Event) of each acquire_async waiter
+        self._async_waiters = {}
+        self._order = itertools.count()
+        self._paused_until = 0.0
+
+    def _publish_depth(self):
+        recorder = get_metrics()
+        for priority, rank in PRIORITIES.items():
+            depth = sum(1 for entry in self._queue if entry[0] == rank)
+            recorder.set_gauge("llm_queue_depth", depth, "LLM requests waiting for the rate limiter.",
+                               priority=priority)
+
+    def _notify(self):
+        # Wake every waiter to re-check the head of the queue; call with the lock held
+        self._cond.notify_all()
+        for loop, event in self._async_waiters.values():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # the waiter's loop is closed
+                pass
+
+    def _enqueue(self, priority):
+        ticket = (PRIORITIES[priority], next(self._order))
+        heapq.heappush(self._queue, ticket)
+        self._publish_depth()
+        # A new request may outrank the one at the head, so let it re-check
+        self._notify()
+        return ticket
+
+    def _dequeue(self, ticket):
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._publish_depth()
+        self._notify()
+
+    def _try_take(self, ticket, tokens):
+        """(taken, seconds to wait or None until woken); call with the lock held"""
+        if self._queue[0] != ticket:
+            return False, None
+        now = time.monotonic()
+        timeout = max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if timeout > 0:
+            return False, timeout
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        return True, None
+
+    def acquire(self, tokens, priority=None):
+        """Block until a request of `tokens` may be sent; returns the seconds waited"""
+        priority = priority or current_priority()
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    taken, timeout = self._try_take(ticket, tokens)
+                    if taken:
+                        break
+                    self._cond.wait(timeout)
+            finally:
+                self._dequeue(ticket)
+        waited = time.monotonic() - start
+        get_metrics().record("llm_queue_wait", waited, priority=priority, estimated_tokens=tokens)
+        return waited
+
+    async def acquire_async(self, tokens, priority=None):
+        """acquire() for coroutines: waits on the event loop, not in a thread.
+
+        A cancelled wait leaves the queue without taking anything from the buckets.
+        """
+        priority = priority or current_priority()
+        start = time.monotonic()
+        woken = asyncio.Event()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            self._async_waiters[ticket] = (asyncio.get_running_loop(), woken)
+        try:
+            while True:
+                with self._cond:
+                    # Cleared under the lock, so a wake-up sent after this check isn't lost
+                    woken.clear()
+                    taken, timeout = self._try_take(ticket, tokens)
+                if taken:
+                    break
+                try:
+                    await asyncio.wait_for(woken.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                del self._async_waiters[ticket]
+                self._dequeue(ticket)
+        waited = time.monotonic() - start
+        get_metrics().record("llm_queue_wait", waited, priority=priority, estimated_tokens=tokens)
+        return waited
+
+    def observe(self, status, headers, attempt=0):
+        """Sync the buckets from a response; returns the seconds to wait before retrying, or None"""
+        now = time.monotonic()
+        with self._cond:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                try:
+                    limit = float(headers[f"x-ratelimit-limit-{kind}"])
+                    remaining = float(headers[f"x-ratelimit-remaining-{kind}"])
+                except (KeyError, ValueError):
+                    continue
+                bucket.sync(limit, remaining, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")), now)
+            if status not in RETRY_STATUSES or attempt + 1 >= self.max_attempts:
+                return None
+            self.rate_limited += 1
+            delay = parse_duration(headers.get("retry-after"))
+            if delay is None:
+                # Full jitter keeps concurrent clients from retrying in lockstep
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            # Nobody else should hit the limit while this request waits
+            self._paused_until = max(self._paused_until, now + delay)
+            self._notify()
+        logging.warning(f"LLM request got HTTP {status}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+        get_metrics().record("llm_retry", delay, error=f"HTTP {status}")
+        return delay
+
+    def http_client(self, **kwargs):
+        import httpx
+
+        return httpx.Client(transport=RateLimitedTransport(self), **kwargs)
+
+    def async_http_client(self, **kwargs):
+        import httpx
+
+        return httpx.AsyncClient(transport=AsyncRateLimitedTransport(self), **kwargs)
+
+
+def _request_body(request):
+    try:
+        return request.content
+    except Exception:
+        return None
+
+
+# The transports implement httpx's transport interface without subclassing it,
+# so importing this module doesn't import httpx
+class RateLimitedTransport:
+    """httpx transport that sends each request through a RateLimiter and retries 429s."""
+
+    def __init__(self, limiter, transport=None):
+        import httpx
+
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        tokens = request_tokens(_request_body(request))
+        priority = current_priority()
+        for attempt in range(self.limiter.max_attempts):
+            self.limiter.acquire(tokens, priority)
+            response = self.transport.handle_request(request)
+            delay = self.limiter.observe(response.status_code, response.headers, attempt)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncRateLimitedTransport:
+    """Async counterpart of RateLimitedTransport (queue waits happen on the event loop).
+
+    Pooled connections belong to the event loop that opened them, and the
+    blocking helpers (batch.generate_quizzes, hedging.hedged_generate) run a
+    new loop per call, so each loop gets its own inner transport.
+    """
+
+    def __init__(self, limiter, transport_factory=None):
+        import httpx
+
+        self.limiter = limiter
+        self.transport_factory = transport_factory or httpx.AsyncHTTPTransport
+        self._transports = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def transport(self):
+        """The inner transport of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                # Connections of closed loops can't be used or closed any more, just drop them
+                for closed in [other for other in self._transports if other.is_closed()]:
+                    del self._transports[closed]
+                transport = self._transports[loop] = self.transport_factory()
+            return transport
+
+    async def handle_async_request(self, request):
+        tokens = request_tokens(_request_body(request))
+        priority = current_priority()
+        transport = self.transport
+        for attempt in range(self.limiter.max_attempts):
+            await self.limiter.acquire_async(tokens, priority)
+            response = await transport.handle_async_request(request)
+            delay = self.limiter.observe(response.status_code, response.headers, attempt)
+            if delay is None:
+                return response
+            await response.aclose()
+            await asyncio.sleep(delay)
+        return response
+
+    async def aclose(self):
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter():
+    """The process-wide limiter shared by every Groq client, or None if $MCQGEN_RATE_LIMIT is "0" """
+    if os.getenv("MCQGEN_RATE_LIMIT", "1").lower() in ("0", "false", "off"):
+        return None
+    return RateLimiter(
+        requests_per_minute=float(os.getenv("MCQGEN_RATE_LIMIT_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+        tokens_per_minute=float(os.getenv("MCQGEN_RATE_LIMIT_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+    )
@@ -0,0 +1,156 @@
+"""Structured-output quiz generation.
+
+Instead of asking for prose that looks like RESPONSE_JSON and recovering the
+JSON afterwards, the chat model is put in JSON mode (``json_mode``) or made to
+call a tool whose arguments follow a pydantic schema (``function_calling``).
+Both schemas are derived from the item in Response.json. MCQs are validated
+against the schema one by one as they stream in; when some fail (or the
+response is cut short), only the missing MCQs are requested again.
+"""
+import json
+import logging
+from functools import lru_cache
+
+from .utils import MCQStreamParser, estimate_tokens
+
+# How quiz responses are produced: free text parsed with utils.parse_quiz_json,
+# or one of the structured-output methods handled here
+OUTPUT_MODES = ("text", "json_mode", "function_calling")
+STRUCTURED_OUTPUTS = OUTPUT_MODES[1:]
+MAX_SCHEMA_RETRIES = 2
+TOOL_NAME = "Quiz"
+
+# JSON mode answers in the RESPONSE_JSON shape ({"1": {...}}); the tool's
+# arguments are {"mcqs": [{...}]}
+_ITEM_DEPTH = {"json_mode": 2, "function_calling": 3}
+
+
+def response_models(response_json):
+    """(MCQ, Quiz) pydantic models for one item of Response.json and the tool arguments"""
+    return _response_models(json.dumps(response_json, sort_keys=True))
+
+
+@lru_cache(maxsize=None)
+def _response_models(schema):
+    from typing import Annotated, Literal, Optional, Union
+
+    from pydantic import ConfigDict, Field, StringConstraints, create_model
+
+    from .validation import item_schema
+
+    required, option_keys = item_schema(json.loads(schema))
+    text = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+    options = create_model("Options", __config__=ConfigDict(extra="forbid"),
+                           **{key: (text, ...) for key in option_keys})
+    fields = {}
+    for key in required:
+        if key == "no":
+            fields[key] = (Optional[Union[str, int]], None)
+        elif key == "options":
+            fields[key] = (options, ...)
+        elif key == "correct" and option_keys:
+            fields[key] = (Literal[option_keys], Field(description="key of the correct option"))
+        else:
+            fields[key] = (text, ...)
+    mcq = create_model("MCQ", **fields)
+    quiz = create_model(TOOL_NAME, __doc__="A multiple choice quiz on the given text.",
+                        mcqs=(list[mcq], Field(description="the multiple choice questions")))
+    return mcq, quiz
+
+
+def check_mcq(item, mcq_model):
+    """(MCQ dict, None) if `item` matches the schema, else (None, reason)"""
+    from pydantic import ValidationError
+
+    try:
+        mcq = mcq_model.model_validate(item)
+    except ValidationError as e:
+        error = e.errors()[0]
+        return None, f"{'.'.join(map(str, error['loc'])) or 'mcq'}: {error['msg']}"
+    return mcq.model_dump(exclude_none=True), None
+
+
+def bind_structured(llm, method, response_json):
+    """`llm` bound to answer in JSON mode or with a call to the Quiz tool"""
+    if method == "json_mode":
+        return llm.bind(response_format={"type": "json_object"})
+    if method == "function_calling":
+        return llm.bind_tools([response_models(response_json)[1]], tool_choice=TOOL_NAME)
+    raise Exception(f"Unknown structured output '{method}'. Use one of: {', '.join(STRUCTURED_OUTPUTS)}")
+
+
+def chunk_texts(chunks):
+    """Text of streamed message chunks: the content, or the tool call arguments"""
+    for chunk in chunks:
+        if chunk.content:
+            yield chunk.content
+        for call in getattr(chunk, "tool_call_chunks", None) or ():
+            if call.get("args"):
+                yield call["args"]
+
+
+def generate_structured(chain, prompt, inputs, response_json, method, config=None, on_token=None,
+                        max_retries=MAX_SCHEMA_RETRIES):
+    """Generate inputs["number"] schema-valid MCQs with a structured quiz chain.
+
+    Each MCQ is checked as soon as it is complete in the stream. If the
+    response has invalid MCQs, is not valid JSON or comes up short, the
+    missing MCQs are asked for again (at most `max_retries` more calls).
+    `on_token` receives only the accepted MCQs, as RESPONSE_JSON-shaped text.
+
+    Returns (quiz JSON string, stats); the quiz may come up short, or be empty.
+    "wasted_tokens" counts completion tokens that were thrown away plus the
+    prompt tokens of retries.
+    """
+    from .validation import regeneration_inputs, renumber
+
+    mcq_model = response_models(response_json)[0]
+    wanted = int(inputs["number"])
+    accepted = []
+    stats = {"method": method, "attempts": 0, "schema_failures": 0, "invalid_mcqs": 0,
+             "prompt_tokens": 0, "completion_tokens": 0, "wasted_tokens": 0}
+    request = inputs
+    while len(accepted) < wanted and stats["attempts"] <= max_retries:
+        stats["attempts"] += 1
+        request_tokens = estimate_tokens(prompt.format(**request))
+        stats["prompt_tokens"] += request_tokens
+        if stats["attempts"] > 1:
+            stats["wasted_tokens"] += request_tokens
+
+        parser = MCQStreamParser(item_depth=_ITEM_DEPTH[method])
+        kept_tokens = 0
+        invalid = 0
+        for text in chain.stream(request, config):
+            for _, item in parser.feed(text):
+                mcq, reason = check_mcq(item, mcq_model)
+                if mcq is None:
+                    invalid += 1
+                    logging.info(f"MCQ failed the schema ({reason}): {str(item)[:80]}")
+                    continue
+                if len(accepted) >= wanted:
+                    continue
+                accepted.append(mcq)
+                kept_tokens += estimate_tokens(json.dumps(item))
+                if on_token is not None:
+                    no = str(len(accepted))
+                    on_token(("{" if no == "1" else ", ") + f'"{no}": ' + json.dumps({**mcq, "no": no}))
+
+        raw = parser.text
+        stats["completion_tokens"] += estimate_tokens(raw)
+        stats["invalid_mcqs"] += invalid
+        try:
+            json.loads(raw)
+            well_formed = True
+        except json.JSONDecodeError:
+            well_formed = False
+        if invalid or not well_formed or len(accepted) < wanted:
+            stats["schema_failures"] += 1
+            stats["wasted_tokens"] += max(0, estimate_tokens(raw) - kept_tokens)
+            logging.warning(f"Structured response failed validation ({invalid} invalid MCQs, "
+                            f"{'well-formed' if well_formed else 'malformed'} JSON, {len(accepted)}/{wanted} MCQs)")
+        request = regeneration_inputs(inputs, accepted, wanted - len(accepted))
+
+    if on_token is not None:
+        on_token("}" if accepted else "{}")
+    stats["accepted"] = len(accepted)
+    return json.dumps(renumber(accepted)), stats
@@ -1,69 +1,224 @@
 import os
-from PyPDF2 import PdfReader
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 import json
+import logging
 import traceback
 import re
+from collections import namedtuple
 
-def read_file(file):
+from .metrics import timed
+
+# Page ranges handed to each worker process when extracting in parallel
+PAGES_PER_TASK = 16
+# Shorter PDFs are read serially: starting the worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 4 * PAGES_PER_TASK
+
+def iter_pdf_pages(file, max_pages=None):
+    """Lazily yield the text of each PDF page (empty string for pages without text)."""
+    from PyPDF2 import PdfReader
+
+    pdf_reader = PdfReader(file)
+    for index, page in enumerate(pdf_reader.pages):
+        if max_pages is not None and index >= max_pages:
+            break
+        yield page.extract_text() or ""
+
+def _extract_page_range(data, start, stop):
+    # Runs in a worker process, so it gets the raw bytes and opens its own reader
+    from PyPDF2 import PdfReader
+
+    pdf_reader = PdfReader(BytesIO(data))
+    return [(pdf_reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def _iter_pdf_pages_parallel(data, workers, max_pages=None):
+    from PyPDF2 import PdfReader
+
+    pdf_reader = PdfReader(BytesIO(data))
+    page_count = len(pdf_reader.pages)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    if page_count < PARALLEL_MIN_PAGES:
+        for i in range(page_count):
+            yield pdf_reader.pages[i].extract_text() or ""
+        return
+    ranges = deque((start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK))
+    pending = deque()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Ranges are submitted a few per worker ahead of the consumer and yielded in page order
+        while ranges or pending:
+            while ranges and len(pending) < 2 * workers:
+                pending.append(pool.submit(_extract_page_range, data, *ranges.popleft()))
+            yield from pending.popleft().result()
+    finally:
+        # Also runs when the consumer stops early (max_chars): drop queued ranges instead of waiting for them
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _take_chars(pages, max_chars=None):
+    """Collect page texts, stopping as soon as max_chars have been read, and join once."""
+    parts = []
+    total = 0
+    for page_text in pages:
+        if max_chars is not None and total + len(page_text) >= max_chars:
+            parts.append(page_text[:max_chars - total])
+            break
+        parts.append(page_text)
+        total += len(page_text)
+    return "".join(parts)
+
+@timed("read_file")
+def read_file(file, max_pages=None, max_chars=None, workers=None):
+    """Extract text from an uploaded PDF or TXT file.
+
+    max_pages / max_chars cap how much of the document is read. With
+    workers > 1, PDF pages are extracted in parallel in a process pool.
+    """
     if file.name.endswith(".pdf"):
         try:
-            pdf_reader = PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            if workers and workers > 1:
+                pages = _iter_pdf_pages_parallel(file.read(), workers, max_pages)
+            else:
+                pages = iter_pdf_pages(file, max_pages)
+            try:
+                return _take_chars(pages, max_chars)
+            finally:
+                pages.close()
         except Exception as e:
             raise Exception(f"Error reading PDF file: {e}")
     elif file.name.endswith('.txt'):
-        return file.read().decode("utf-8")
+        text = file.read().decode("utf-8")
+        return text if max_chars is None else text[:max_chars]
     else:
         raise Exception("Unsupported file format. Please upload a PDF or TXT file.")    
 
+# One token per string literal or structural character; everything else
+# (numbers, literals, whitespace) is skipped by finditer. The string pattern is
+# unrolled so it never backtracks, and a missing closing quote means truncation.
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(?P<closed>")?|[{}\[\],:]')
+
+JSONScan = namedtuple("JSONScan", ["json", "repairs"])
+
+_json_decoder = json.JSONDecoder()
+
+class _Frame:
+    __slots__ = ("kind", "start", "safe", "expect_key")
+
+    def __init__(self, kind, start):
+        self.kind = kind
+        self.start = start
+        # Cut point after the last complete value, so truncated text can be closed here
+        self.safe = start + 1
+        self.expect_key = kind == "{"
+
+def _json_start(text):
+    # The first brace, unless it opens no complete object and a ```json / ```
+    # fence follows: then the fenced object, so "{n} questions" prose is skipped
+    start = text.find("{")
+    fence = text.find("```", max(start, 0))
+    if start < 0 or fence < 0:
+        return start
+    try:
+        _json_decoder.raw_decode(text, start)
+        return start
+    except json.JSONDecodeError:
+        fenced = text.find("{", fence)
+        return fenced if fenced >= 0 else start
+
+
+def scan_json_object(text, item_depth=2):
+    """Find the first balanced JSON object in text in a single linear pass.
+
+    Returns JSONScan(json, repairs). If the object is truncated, it is closed in
+    the right nesting order; when the cut falls inside an item (an MCQ, at
+    nesting level `item_depth` as in MCQStreamParser), that incomplete item is
+    dropped, even if it is the only one. `repairs` lists what was changed.
+    """
+    start = _json_start(text)
+    if start < 0:
+        return JSONScan(None, [])
+
+    # Fast path: a complete object is found by the C decoder without a Python loop
+    try:
+        _, end = _json_decoder.raw_decode(text, start)
+        return JSONScan(text[start:end], [])
+    except json.JSONDecodeError:
+        pass
+
+    stack = []
+    unterminated_string = False
+    for match in _JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        ch = token[0]
+        if ch == '"':
+            if match.group("closed") is None:
+                unterminated_string = True
+                break
+            frame = stack[-1]
+            if not (frame.kind == "{" and frame.expect_key):
+                frame.safe = match.end()
+        elif ch in "{[":
+            stack.append(_Frame(ch, match.start()))
+        elif ch in "}]":
+            stack.pop()
+            if not stack:
+                return JSONScan(text[start:match.end()], [])
+            stack[-1].safe = match.end()
+        elif ch == ",":
+            frame = stack[-1]
+            frame.safe = match.start()
+            frame.expect_key = frame.kind == "{"
+        else:  # ":"
+            stack[-1].expect_key = False
+
+    repairs = []
+    if unterminated_string:
+        repairs.append("dropped an unterminated string")
+    if len(stack) >= item_depth:
+        # Truncated inside an item: keep the complete items only
+        container = stack[item_depth - 2]
+        repairs.append("dropped an incomplete trailing item")
+        cut, open_frames = container.safe, stack[:item_depth - 1]
+    else:
+        cut, open_frames = stack[-1].safe, stack
+    closers = "".join("}" if frame.kind == "{" else "]" for frame in reversed(open_frames))
+    repairs.append(f"closed {len(closers)} unclosed bracket(s) with '{closers}'")
+    return JSONScan(text[start:cut] + closers, repairs)
+
 def extract_json_from_text(text):
     """Extract JSON from text that might contain markdown or other content."""
-    # Try to find JSON between ```json and ``` markers
-    json_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if json_match:
-        return json_match.group(1)
-    
-    # Try to find JSON between ``` markers
-    json_match = re.search(r'```\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if json_match:
-        return json_match.group(1)
-    
-    # Try to find JSON object in the text
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        return json_match.group(0)
-    
-    return text
+    scan = scan_json_object(text)
+    return scan.json if scan.json is not None else text
+
+def parse_quiz_json(quiz_str, item_depth=2):
+    """Parse a quiz response (dict or model output string) into a dict.
+
+    A truncated response loses its incomplete MCQ (at nesting level `item_depth`).
+    """
+    # Handle if quiz_str is already a dict
+    if isinstance(quiz_str, dict):
+        return quiz_str
+    if not isinstance(quiz_str, str):
+        raise Exception(f"Unexpected quiz data type: {type(quiz_str)}")
+
+    # Extract JSON from text, repairing truncated output in one pass
+    scan = scan_json_object(quiz_str, item_depth)
+    if scan.json is None:
+        raise Exception("No JSON object found in the quiz response")
+    if scan.repairs:
+        logging.warning(f"Repaired quiz JSON: {'; '.join(scan.repairs)}")
+
+    try:
+        return json.loads(scan.json)
+    except json.JSONDecodeError as e:
+        raise Exception(f"Could not parse JSON even after repair. Original error: {e}")
 
+@timed("get_table_data")
 def get_table_data(quiz_str):
     try:
-        # Handle if quiz_str is already a dict
-        if isinstance(quiz_str, dict):
-            quiz_dict = quiz_str
-        elif isinstance(quiz_str, str):
-            # Extract JSON from text
-            quiz_str = extract_json_from_text(quiz_str.strip())
-            
-            # Try to parse JSON
-            try:
-                quiz_dict = json.loads(quiz_str)
-            except json.JSONDecodeError as e:
-                # If JSON is incomplete, try to repair it
-                # This is a simple repair - close any open braces
-                open_braces = quiz_str.count('{') - quiz_str.count('}')
-                open_brackets = quiz_str.count('[') - quiz_str.count(']')
-                repaired = quiz_str + ('}' * open_braces) + (']' * open_brackets)
-                
-                try:
-                    quiz_dict = json.loads(repaired)
-                except:
-                    raise Exception(f"Could not parse JSON even after repair. Original error: {e}")
-        else:
-            raise Exception(f"Unexpected quiz data type: {type(quiz_str)}")
-            
+        quiz_dict = parse_quiz_json(quiz_str)
+
         quiz_table_data=[]
         for key,value in quiz_dict.items():
             mcq = value.get("mcq", value.get("question", ""))
@@ -88,4 +243,160 @@ def get_table_data(quiz_str):
             )
         return quiz_table_data
     except Exception as e:
-        raise Exception(f"Error parsing quiz data: {e}\nQuiz string preview: {str(quiz_str)[:500] if quiz_str else 'None'}\n{traceback.format_exc()}")
\ No newline at end of file
+        raise Exception(f"Error parsing quiz data: {e}\nQuiz string preview: {str(quiz_str)[:500] if quiz_str else 'None'}\n{traceback.format_exc()}")
+
+def estimate_tokens(text):
+    """Rough token count for English text (about 4 characters per token)."""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+def _split_oversized(piece, max_chars):
+    """Split a paragraph that is larger than max_chars on sentences, then hard-wrap."""
+    parts = []
+    current = ""
+    for sentence in re.split(r'(?<=[.!?])\s+', piece):
+        while len(sentence) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+def split_text(text, max_tokens=3000):
+    """Split text into chunks of at most max_tokens, keeping paragraphs together where possible."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    chunks = []
+    current = []
+    current_len = 0
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_oversized(paragraph, max_chars)
+        for piece in pieces:
+            if current and current_len + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_len = 0
+            current.append(piece)
+            current_len += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def allocate_questions(chunks, number):
+    """Share `number` MCQs across chunks in proportion to chunk size (largest remainder)."""
+    sizes = [estimate_tokens(chunk) for chunk in chunks]
+    total = sum(sizes)
+    if not total:
+        return [0] * len(chunks)
+    shares = [number * size / total for size in sizes]
+    counts = [int(share) for share in shares]
+    leftover = number - sum(counts)
+    by_remainder = sorted(range(len(chunks)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in by_remainder[:leftover]:
+        counts[i] += 1
+    return counts
+
+def merge_quizzes(quizzes):
+    """Merge per-chunk quiz responses into one quiz JSON string numbered from 1."""
+    merged = {}
+    for quiz in quizzes:
+        for value in parse_quiz_json(quiz).values():
+            if not isinstance(value, dict):
+                continue
+            no = str(len(merged) + 1)
+            merged[no] = {**value, "no": no}
+    return json.dumps(merged)
+
+
+class MCQStreamParser:
+    """Incrementally parse a streamed quiz response.
+
+    Feed text as it arrives; each call to feed() returns the (key, mcq) pairs
+    whose closing brace arrived in that piece. Each character is scanned once.
+    The full text seen so far is available as `.text`. `item_depth` is the
+    nesting level of the MCQ objects: 2 for RESPONSE_JSON's {"1": {...}},
+    3 for a list inside an object such as {"mcqs": [{...}]}.
+    """
+
+    def __init__(self, item_depth=2):
+        self.item_depth = item_depth
+        self._parts = []
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._item_start = None
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def feed(self, chunk):
+        self._parts.append(chunk)
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        # Strings at the top level are the MCQ keys ("1", "2", ...)
+                        self._last_key = buffer[self._string_start + 1:i]
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+                    self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == self.item_depth and ch == "{":
+                    self._item_start = i
+            elif ch in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == self.item_depth - 1 and ch == "}" and self._item_start is not None:
+                    try:
+                        mcq = json.loads(buffer[self._item_start:i + 1])
+                    except json.JSONDecodeError:
+                        mcq = None
+                    if isinstance(mcq, dict):
+                        completed.append((self._last_key, mcq))
+                    self._item_start = None
+        # Keep only the part of the buffer the open item still needs
+        keep_from = self._item_start if self._item_start is not None else len(buffer)
+        if self._in_string and self._string_start is not None:
+            keep_from = min(keep_from, self._string_start)
+        self._buffer = buffer[keep_from:]
+        if self._item_start is not None:
+            self._item_start -= keep_from
+        if self._string_start is not None:
+            self._string_start -= keep_from
+        self._pos = len(self._buffer)
+        return completed
+
+def iter_mcqs(chunks):
+    """Yield (key, mcq) pairs from an iterable of streamed text chunks as soon as each MCQ is complete."""
+    parser = MCQStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
@@ -0,0 +1,183 @@
+"""Post-generation quality filter for MCQs.
+
+Each MCQ is checked against the item schema in Response.json, near-duplicate
+questions are found with MinHash signatures over word shingles (vectorized
+with NumPy and bucketed with LSH banding), and only the rejected items are
+sent back to the model for regeneration.
+"""
+import json
+import logging
+import re
+import zlib
+from collections import namedtuple
+from itertools import combinations
+
+import numpy as np
+
+NUM_PERMUTATIONS = 64
+BANDS = 16  # 16 bands of 4 rows: pairs above ~0.6 Jaccard become candidates
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.7
+MAX_REGENERATION_ROUNDS = 2
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+ValidationReport = namedtuple("ValidationReport", ["accepted", "rejected"])
+
+
+def item_schema(response_json):
+    """(required keys, option keys) of one MCQ in the Response.json template"""
+    template = next(iter(response_json.values()))
+    return tuple(template), tuple(template.get("options", {}))
+
+
+def validate_mcq(mcq, response_json):
+    """Return (normalized mcq, None) if valid, or (None, reason) if not."""
+    if not isinstance(mcq, dict):
+        return None, "not an object"
+    required, option_keys = item_schema(response_json)
+    missing = [key for key in required if key not in mcq and key != "no"]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    if not str(mcq["mcq"]).strip():
+        return None, "empty question"
+
+    options = mcq["options"]
+    if not isinstance(options, dict):
+        return None, "options is not an object"
+    if option_keys and sorted(options) != sorted(option_keys):
+        return None, f"options should be {', '.join(option_keys)}"
+    if any(not str(value).strip() for value in options.values()):
+        return None, "empty option"
+    if len({str(value).strip().lower() for value in options.values()}) < len(options):
+        return None, "repeated option"
+
+    correct = str(mcq["correct"]).strip()
+    if correct not in options:
+        # Accept the answer text or "b) ..." style answers and store the option key
+        by_text = {str(value).strip().lower(): key for key, value in options.items()}
+        key = by_text.get(correct.lower()) or (correct[:1].lower() if correct[1:2] in (")", ".", ":") else None)
+        if key not in options:
+            return None, "correct answer is not one of the options"
+        correct = key
+    return {**mcq, "correct": correct}, None
+
+
+def _shingle_hashes(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+
+
+def minhash_signatures(texts):
+    """(len(texts), NUM_PERMUTATIONS) array of MinHash signatures"""
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(text)
+        # All permutations at once: (permutations, shingles) then min per permutation
+        permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+        signatures[row] = permuted.min(axis=1)
+    return signatures
+
+
+def near_duplicates(texts, threshold=DUPLICATE_THRESHOLD):
+    """Indices of texts that nearly duplicate an earlier text in the list"""
+    if len(texts) < 2:
+        return set()
+    signatures = minhash_signatures(texts)
+    rows = NUM_PERMUTATIONS // BANDS
+    candidates = set()
+    for band in range(BANDS):
+        buckets = {}
+        for index, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets.setdefault(key, []).append(index)
+        for members in buckets.values():
+            # Every pair: members[0] may share a band with the others only by chance
+            candidates.update(combinations(members, 2))
+
+    duplicates = set()
+    for first, other in sorted(candidates):
+        # A text already rejected as a duplicate doesn't reject later ones
+        if first in duplicates:
+            continue
+        if np.mean(signatures[first] == signatures[other]) >= threshold:
+            duplicates.add(other)
+    return duplicates
+
+
+def filter_quiz(quiz, response_json, previous=(), threshold=DUPLICATE_THRESHOLD):
+    """Split quiz items into accepted (schema-valid, not near-duplicates) and rejected.
+
+    `previous` are question texts already in the quiz; new items that duplicate
+    them are rejected too. Returns ValidationReport(accepted list, rejected list
+    of (mcq, reason)).
+    """
+    accepted = []
+    rejected = []
+    for mcq in quiz.values():
+        normalized, reason = validate_mcq(mcq, response_json)
+        if reason:
+            rejected.append((mcq, reason))
+        else:
+            accepted.append(normalized)
+
+    previous = list(previous)
+    texts = previous + [str(mcq["mcq"]) for mcq in accepted]
+    duplicates = near_duplicates(texts, threshold)
+    kept = []
+    for index, mcq in enumerate(accepted, start=len(previous)):
+        if index in duplicates:
+            rejected.append((mcq, "near-duplicate question"))
+        else:
+            kept.append(mcq)
+    return ValidationReport(kept, rejected)
+
+
+def renumber(mcqs):
+    return {str(i): {**mcq, "no": str(i)} for i, mcq in enumerate(mcqs, start=1)}
+
+
+def regeneration_inputs(inputs, accepted, count):
+    """Quiz inputs asking for `count` new MCQs that don't repeat the accepted ones"""
+    asked = "\n".join(f"- {mcq['mcq']}" for mcq in accepted)
+    text = f"{inputs['text']}\n\nThese questions were already asked, do not repeat them:\n{asked}"
+    return {**inputs, "text": text, "number": count}
+
+
+def validate_quiz(inputs, quiz, response_json, quiz_chain=None, config=None,
+                  max_rounds=MAX_REGENERATION_ROUNDS, threshold=DUPLICATE_THRESHOLD):
+    """Validate a generated quiz and regenerate only the rejected MCQs.
+
+    Returns (quiz JSON string, stats). With no quiz_chain, rejected items are
+    just dropped.
+    """
+    from .utils import parse_quiz_json
+
+    report = filter_quiz(parse_quiz_json(quiz), response_json, threshold=threshold)
+    accepted = report.accepted
+    stats = {"rejected": len(report.rejected), "regenerated": 0, "rounds": 0}
+    for mcq, reason in report.rejected:
+        logging.info(f"Rejected MCQ ({reason}): {str(mcq.get('mcq', mcq) if isinstance(mcq, dict) else mcq)[:80]}")
+
+    wanted = int(inputs["number"])
+    while quiz_chain is not None and len(accepted) < wanted and stats["rounds"] < max_rounds:
+        stats["rounds"] += 1
+        missing = wanted - len(accepted)
+        response = quiz_chain.invoke(regeneration_inputs(inputs, accepted, missing), config)
+        try:
+            new_items = parse_quiz_json(response)
+        except Exception as e:
+            logging.warning(f"Could not parse regenerated MCQs: {e}")
+            continue
+        extra = filter_quiz(new_items, response_json, [mcq["mcq"] for mcq in accepted], threshold)
+        accepted = accepted + extra.accepted[:missing]
+        stats["regenerated"] += len(extra.accepted[:missing])
+
+    stats["accepted"] = len(accepted)
+    return json.dumps(renumber(accepted)), stats
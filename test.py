@@ -1,3 +1,5 @@
-from src.mcqgenerator.logger import logging
+from src.mcqgenerator.logger import logging, configure_logging
 
-logging.info("This is my error.")
\ No newline at end of file
+configure_logging()
+
+logging.info("This is my error.")
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+# Every store defaults to .cache/ in the repo and the chains to Groq; point them
+# at a scratch directory and the offline fake model before mcqgenerator is imported
+_SCRATCH = tempfile.mkdtemp(prefix="mcqgen-tests-")
+os.environ["MCQGEN_BACKEND"] = "fake"
+os.environ["MCQGEN_RATE_LIMIT"] = "0"
+os.environ.pop("MCQGEN_JOURNAL_PATH", None)
+os.environ.pop("MCQGEN_HEDGE_N", None)
+for name, file_name in (("CACHE", "responses"), ("BANK", "question_bank"), ("JOBS", "jobs"),
+                        ("EXTRACTION_CACHE", "extractions"), ("VERSIONS", "quiz_versions")):
+    os.environ[f"MCQGEN_{name}_PATH"] = os.path.join(_SCRATCH, f"{file_name}.sqlite")
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+TEXT = ("Photosynthesis converts light energy into chemical energy inside the chloroplasts of plant cells. "
+        "Chlorophyll absorbs mostly blue and red light, while the Calvin cycle fixes carbon dioxide into sugars.")
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    """An empty response cache, with the chains rebuilt on top of it"""
+    from mcqgenerator import mcqgenerator
+
+    monkeypatch.setattr(mcqgenerator, "CACHE_PATH", str(tmp_path / "responses.sqlite"))
+    for getter in (mcqgenerator.get_response_cache, mcqgenerator._get_chains, mcqgenerator._get_structured_chain):
+        getter.cache_clear()
+    yield mcqgenerator.get_response_cache()
+    for getter in (mcqgenerator.get_response_cache, mcqgenerator._get_chains, mcqgenerator._get_structured_chain):
+        getter.cache_clear()
+
+
+@pytest.fixture
+def quiz_inputs():
+    from mcqgenerator.mcqgenerator import load_response_json
+
+    return {"text": TEXT, "number": 3, "subject": "Biology", "tone": "Simple",
+            "RESPONSE_JSON": json.dumps(load_response_json())}
+
+
+@pytest.fixture
+def groq_chain(monkeypatch):
+    """The quiz prompt piped into ChatGroq, talking to a local FakeGroqServer through a RateLimiter"""
+    from langchain_core.output_parsers import StrOutputParser
+
+    from mcqgenerator.backends import create_backend
+    from mcqgenerator.fake_server import FakeGroqServer
+    from mcqgenerator.mcqgenerator import get_prompts
+    from mcqgenerator.rate_limit import RateLimiter
+
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    server = FakeGroqServer(requests_per_minute=6000, tokens_per_minute=10 ** 7).start()
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=10 ** 7)
+    llm = create_backend("groq", groq_api_base=server.base_url, max_retries=0,
+                         http_client=limiter.http_client(), http_async_client=limiter.async_http_client())
+    yield get_prompts()[0] | llm | StrOutputParser()
+    server.stop()
+
+
+@pytest.fixture
+def import_time_ms():
+    """Cumulative -X importtime of a module in a fresh interpreter, in ms"""
+    def measure(module):
+        env = {**os.environ, "PYTHONPATH": SRC, "GROQ_API_KEY": ""}
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                env=env, capture_output=True, text=True, check=True)
+        # Lines look like "import time:  self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            parts = [part.strip() for part in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                return int(parts[1]) / 1000
+        raise RuntimeError(f"{module} not found in -X importtime output")
+    return measure
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from mcqgenerator.batch import generate_quizzes, job_inputs
+from mcqgenerator.rate_limit import BATCH, current_priority
+
+
+class Flaky(Exception):
+    pass
+
+
+def tracking_chain(fail_first=()):
+    state = {"running": 0, "peak": 0, "calls": [], "priorities": set()}
+    failures = set(fail_first)
+
+    async def run(inputs):
+        state["calls"].append(inputs["subject"])
+        state["priorities"].add(current_priority())
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        # Later jobs finish first, so results must be put back in input order
+        await asyncio.sleep(0.01 * (10 - int(inputs["number"])))
+        state["running"] -= 1
+        if inputs["subject"] in failures:
+            failures.discard(inputs["subject"])
+            raise Flaky(inputs["subject"])
+        return {**inputs, "quiz": f"quiz {inputs['subject']}"}
+
+    return RunnableLambda(run), state
+
+
+def test_job_inputs_accept_tuples_and_dicts():
+    inputs = job_inputs(("Cells divide.", 3, "Biology", "Easy"))
+    assert {key: inputs[key] for key in ("text", "number", "subject", "tone")} == {
+        "text": "Cells divide.", "number": 3, "subject": "Biology", "tone": "Easy"}
+    assert "RESPONSE_JSON" in inputs
+    assert job_inputs({"text": "x", "RESPONSE_JSON": "{}"})["RESPONSE_JSON"] == "{}"
+
+
+def test_results_keep_input_order_within_the_concurrency_limit():
+    chain, state = tracking_chain()
+    jobs = [(f"Text {i}", i, f"S{i}", "Easy") for i in range(8)]
+    results = generate_quizzes(jobs, max_concurrency=3, chain=chain, retry_on=())
+    assert [result["quiz"] for result in results] == [f"quiz S{i}" for i in range(8)]
+    assert state["peak"] == 3
+    assert state["priorities"] == {BATCH}
+
+
+def test_retry_on_retries_only_those_errors():
+    chain, state = tracking_chain(fail_first=["S1"])
+    results = generate_quizzes([("a", 1, "S0", "Easy"), ("b", 2, "S1", "Easy")], chain=chain, retry_on=[Flaky])
+    assert [result["quiz"] for result in results] == ["quiz S0", "quiz S1"]
+    assert state["calls"].count("S1") == 2
+
+    chain, _ = tracking_chain(fail_first=["S1"])
+    results = generate_quizzes([("a", 1, "S0", "Easy"), ("b", 2, "S1", "Easy")], chain=chain, retry_on=(),
+                               return_exceptions=True)
+    assert results[0]["quiz"] == "quiz S0" and isinstance(results[1], Flaky)
+    with pytest.raises(Flaky):
+        generate_quizzes([("b", 2, "S1", "Easy")], chain=tracking_chain(fail_first=["S1"])[0], retry_on=())
+
+
+def test_default_chain_runs_offline(fresh_cache):
+    results = generate_quizzes([("Plants make sugar from light.", 2, "Biology", "Easy")] * 2)
+    assert len(results) == 2 and all(result["quiz"] for result in results)
@@ -0,0 +1,80 @@
+import json
+import time
+
+from mcqgenerator.cache import ResponseCache, cache_hits, cache_key, with_cache
+from mcqgenerator.mcqgenerator import complete_response, generate_quiz
+
+
+class CountingChain:
+    """Stand-in for a string-output chain that returns canned responses in turn"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def invoke(self, inputs, config=None):
+        self.calls += 1
+        return self.responses[min(self.calls, len(self.responses)) - 1]
+
+
+def cached_chain(chain, cache, cacheable=None):
+    from langchain_core.runnables import RunnableLambda
+
+    return with_cache(RunnableLambda(chain.invoke), cache, lambda inputs: {"text": inputs["text"]}, cacheable)
+
+
+def test_keys_ignore_whitespace_differences():
+    assert cache_key(text="Cells  divide\n by mitosis ") == cache_key(text="Cells divide by mitosis")
+    assert cache_key(text="a", stage="quiz") != cache_key(text="a", stage="review")
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # now more recently used than b
+    cache.set("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+    cache._connect().execute("UPDATE responses SET created = ? WHERE key = 'a'", (time.time() - 61,))
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_bypass_refreshes_the_cached_response(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    chain = CountingChain("first", "second")
+    runnable = cached_chain(chain, cache)
+    assert runnable.invoke({"text": "x"}) == "first"
+    with cache_hits() as hits:
+        assert runnable.invoke({"text": "x"}) == "first"
+    assert chain.calls == 1 and hits == [({"text": "x"}, "first")]
+
+    assert runnable.invoke({"text": "x"}, {"configurable": {"bypass_cache": True}}) == "second"
+    assert runnable.invoke({"text": "x"}) == "second"
+    assert chain.calls == 2
+
+
+def test_incomplete_responses_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    complete = json.dumps({"1": {"mcq": "Q1", "options": {"a": "x"}, "correct": "a"}})
+    chain = CountingChain(complete[:-20], complete)
+    runnable = cached_chain(chain, cache, cacheable=complete_response)
+    assert runnable.invoke({"text": "x"}) == complete[:-20]
+    # The truncated reply was not stored, so the model is asked again
+    assert runnable.invoke({"text": "x"}) == complete
+    assert runnable.invoke({"text": "x"}) == complete
+    assert chain.calls == 2
+    assert not complete_response("no json") and complete_response(f"```json\n{complete}\n```")
+
+
+def test_cache_hits_are_not_counted_as_model_calls(fresh_cache, quiz_inputs):
+    for mode in ("skip", "standard", "fused"):
+        fresh_cache.clear()
+        first = generate_quiz(quiz_inputs, mode=mode)
+        again = generate_quiz(quiz_inputs, mode=mode)
+        assert first["metrics"]["llm_calls"] >= 1 and first["metrics"]["cache_hits"] == 0
+        assert again["quiz"] == first["quiz"]
+        assert (again["metrics"]["llm_calls"], again["metrics"]["prompt_tokens"],
+                again["metrics"]["completion_tokens"]) == (0, 0, 0)
+        assert again["metrics"]["cache_hits"] >= 1
@@ -0,0 +1,59 @@
+import json
+
+from mcqgenerator.mcqgenerator import chunk_inputs_for, generate_quiz_text
+from mcqgenerator.utils import allocate_questions, merge_quizzes, split_text
+
+
+def paragraphs(count, words=60):
+    return "\n\n".join(f"Paragraph {i}: " + " ".join(["cell"] * words) for i in range(count))
+
+
+def test_short_text_is_one_chunk(quiz_inputs):
+    assert split_text(quiz_inputs["text"]) == [quiz_inputs["text"]]
+    assert split_text("   ") == []
+
+
+def test_chunks_keep_paragraphs_whole_and_under_the_limit():
+    text = paragraphs(40)
+    chunks = split_text(text, max_tokens=200)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 800 for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_oversized_paragraph_is_split_on_sentences_then_wrapped():
+    sentence = "Mitochondria make ATP. "
+    chunks = split_text(sentence * 100 + "x" * 500, max_tokens=50)
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].startswith("Mitochondria make ATP. Mitochondria")
+    assert "".join(chunks).replace(" ", "") == (sentence * 100 + "x" * 500).replace(" ", "")
+
+
+def test_allocation_is_proportional_and_exact():
+    assert allocate_questions(["a" * 400, "b" * 400], 5) in ([3, 2], [2, 3])
+    assert allocate_questions(["a" * 800, "b" * 200], 10) == [8, 2]
+    assert sum(allocate_questions(["a" * 13, "b" * 29, "c" * 71], 7)) == 7
+    assert allocate_questions(["", ""], 4) == [0, 0]
+
+
+def test_merge_renumbers_from_one_and_skips_non_mcqs():
+    first = json.dumps({"1": {"no": "1", "mcq": "A?"}, "2": {"no": "2", "mcq": "B?"}})
+    second = '```json\n{"1": {"no": "1", "mcq": "C?"}, "note": "extra"}\n```'
+    merged = json.loads(merge_quizzes([first, second]))
+    assert list(merged) == ["1", "2", "3"]
+    assert [(mcq["no"], mcq["mcq"]) for mcq in merged.values()] == [("1", "A?"), ("2", "B?"), ("3", "C?")]
+
+
+def test_chunk_inputs_share_the_questions(quiz_inputs):
+    assert chunk_inputs_for(quiz_inputs) == [quiz_inputs]
+    inputs = {**quiz_inputs, "text": paragraphs(20), "number": 6}
+    chunked = chunk_inputs_for(inputs, max_tokens=200)
+    assert len(chunked) > 1 and sum(chunk["number"] for chunk in chunked) == 6
+    assert all(chunk["subject"] == "Biology" and chunk["number"] > 0 for chunk in chunked)
+
+
+def test_chunked_quiz_is_merged(fresh_cache, quiz_inputs):
+    inputs = {**quiz_inputs, "text": paragraphs(20), "number": 6}
+    quiz = json.loads(generate_quiz_text(inputs, max_tokens=200))
+    assert list(quiz) == [str(no) for no in range(1, len(quiz) + 1)]
+    assert len(quiz) == 6
@@ -0,0 +1,47 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from mcqgenerator.cli import build_parser, run
+
+TEXT = "Mitochondria release energy from glucose through cellular respiration in eukaryotic cells."
+
+
+def write_pdf(path, text):
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(str(path))
+    pdf.drawString(40, 800, text)
+    pdf.save()
+
+
+def test_same_name_documents_get_separate_outputs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "cells.txt").write_text(TEXT)
+    write_pdf(docs / "cells.pdf", "Ribosomes translate messenger RNA into proteins in the cytoplasm of cells.")
+    out = tmp_path / "out"
+    args = build_parser().parse_args(["run", str(docs), "--subject", "Biology", "--number", "2", "--mode", "skip",
+                                      "--formats", "csv,json", "--workers", "1", "--out", str(out)])
+
+    assert run(args) == 0
+    assert sorted(os.listdir(out)) == ["cells.pdf.quiz.csv", "cells.pdf.quiz.json", "cells.txt.quiz.csv",
+                                       "cells.txt.quiz.json", "manifest.jsonl"]
+    questions = [json.loads((out / name).read_text())["quiz"] for name in ("cells.pdf.quiz.json", "cells.txt.quiz.json")]
+    assert questions[0] != questions[1]
+
+    # A rerun finds both documents done and writes nothing new
+    assert run(args) == 0
+    with open(out / "manifest.jsonl") as f:
+        assert len(f.readlines()) == 2
+
+
+def test_arrow_formats_without_pyarrow_fail_before_running(monkeypatch, capsys):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *args: None if name == "pyarrow" else real_find_spec(name, *args))
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["run", "docs", "--subject", "Biology", "--formats", "csv,parquet"])
+    assert "pip install -e '.[arrow]'" in capsys.readouterr().err
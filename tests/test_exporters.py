@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from mcqgenerator import exporters
+from mcqgenerator.exporters import export, export_file, export_format, iter_export, write_export
+from mcqgenerator.quiz_table import quiz_table
+from mcqgenerator.utils import get_table_data
+
+QUIZ = {
+    "1": {"no": "1", "mcq": "What do chloroplasts capture?", "options": {"a": "Light", "b": "Sound", "c": "Heat"},
+          "correct": "a"},
+    "2": {"no": "2", "mcq": "Which {cycle} fixes CO2: into sugars?",
+          "options": {"a": "Krebs", "b": "Calvin", "c": "Urea"}, "correct": "Calvin"},
+}
+QTI_NS = {"qti": "http://www.imsglobal.org/xsd/ims_qtiasiv1p2"}
+
+
+@pytest.mark.parametrize("source", [QUIZ, json.dumps(QUIZ), list(QUIZ.values())], ids=["dict", "json", "list"])
+def test_csv_round_trip(source):
+    out = io.StringIO()
+    assert write_export(source, out, "csv") == 2
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows == [["MCQ", "Option a", "Option b", "Option c", "Correct"],
+                    ["What do chloroplasts capture?", "Light", "Sound", "Heat", "a"],
+                    ["Which {cycle} fixes CO2: into sugars?", "Krebs", "Calvin", "Urea", "Calvin"]]
+
+
+def test_table_sources_export_the_same_csv():
+    expected = "".join(iter_export(QUIZ, "csv"))
+    assert "".join(iter_export(quiz_table(json.dumps(QUIZ)), "csv")) == expected
+    assert "".join(iter_export(get_table_data(json.dumps(QUIZ)), "csv")) == expected
+
+
+def test_jsonl_round_trip():
+    lines = "".join(iter_export(QUIZ, "jsonl")).splitlines()
+    assert [json.loads(line) for line in lines] == list(QUIZ.values())
+
+
+def test_gift_escapes_and_marks_the_answer():
+    gift = "".join(iter_export(QUIZ, "gift", category="Biology"))
+    assert gift.startswith("$CATEGORY: Biology\n\n")
+    assert "::Q2:: Which \\{cycle\\} fixes CO2\\: into sugars? {\n\t~Krebs\n\t=Calvin\n\t~Urea\n}" in gift
+    assert gift.count("=") == 2
+
+
+def test_qti_is_valid_xml_with_one_scored_answer_per_item():
+    root = ET.fromstring("".join(iter_export(QUIZ, "qti", title="Cells & light")).encode("utf-8"))
+    assert root.find("qti:assessment", QTI_NS).get("title") == "Cells & light"
+    items = root.findall(".//qti:item", QTI_NS)
+    assert [item.find(".//qti:varequal", QTI_NS).text for item in items] == ["q1_0", "q2_1"]
+
+
+def test_xlsx_round_trip(tmp_path, monkeypatch):
+    from openpyxl import load_workbook
+
+    monkeypatch.setattr(exporters, "XLSX_MAX_ROWS", 2)
+    assert export(QUIZ, str(tmp_path / "quiz.xlsx"), title="Bio") == 2
+    workbook = load_workbook(tmp_path / "quiz.xlsx")
+    # One question per sheet, each sheet with its own header
+    assert workbook.sheetnames == ["Bio", "Bio 2"]
+    assert [cell.value for cell in workbook["Bio 2"][2]] == ["Which {cycle} fixes CO2: into sugars?", "Krebs",
+                                                             "Calvin", "Urea", "Calvin"]
+    with export_file(QUIZ, "xlsx") as f:
+        assert f.read(2) == b"PK"
+
+
+def test_option_without_a_column_is_an_error():
+    quiz = {**QUIZ, "3": {"mcq": "Odd one?", "options": {"a": "x", "b": "y", "c": "z", "d": "w"}, "correct": "d"}}
+    with pytest.raises(Exception, match="Question 3 has option\\(s\\) d without a column"):
+        "".join(iter_export(quiz, "csv"))
+    text = "".join(iter_export(quiz, "csv", option_keys="abcd"))
+    assert text.splitlines()[1].endswith("Heat,,a")
+
+
+def test_formats_from_file_names():
+    assert [export_format(name) for name in ("q.csv", "q.gift.txt", "q.qti.xml", "q.qti", "q.xlsx")] == \
+        ["csv", "gift", "qti", "qti", "xlsx"]
+    with pytest.raises(Exception, match="Can't tell the export format"):
+        export_format("quiz.docx")
+    with pytest.raises(Exception, match="Unknown export format 'docx'"):
+        write_export(QUIZ, io.StringIO(), "docx")
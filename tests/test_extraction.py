@@ -0,0 +1,70 @@
+import time
+from io import BytesIO
+
+import pytest
+
+from mcqgenerator.extraction_cache import Extraction, ExtractionCache, extract
+from mcqgenerator.utils import PARALLEL_MIN_PAGES, _iter_pdf_pages_parallel, read_file
+
+
+@pytest.fixture(scope="module")
+def long_pdf(tmp_path_factory):
+    from reportlab.pdfgen import canvas
+
+    path = tmp_path_factory.mktemp("pdf") / "long.pdf"
+    pdf = canvas.Canvas(str(path))
+    for page in range(PARALLEL_MIN_PAGES * 3):
+        text = pdf.beginText(40, 800)
+        for row in range(40):
+            text.textLine(f"Page {page} line {row}: chloroplasts capture light energy in plant cells.")
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    return path.read_bytes()
+
+
+def upload(data):
+    file = BytesIO(data)
+    file.name = "long.pdf"
+    return file
+
+
+def test_parallel_extract_matches_serial(long_pdf):
+    serial = extract("long.pdf", long_pdf)
+    parallel = extract("long.pdf", long_pdf, workers=2)
+    assert parallel.text == serial.text
+    assert parallel.page_offsets == serial.page_offsets
+    assert extract("long.pdf", long_pdf, max_pages=20, workers=2).text == extract("long.pdf", long_pdf, 20).text
+
+
+def test_max_chars_stops_the_parallel_reader_early(long_pdf):
+    full = read_file(upload(long_pdf))
+    assert read_file(upload(long_pdf), max_chars=5000, workers=2) == full[:5000]
+
+    pages = _iter_pdf_pages_parallel(long_pdf, 2)
+    next(pages)
+    start = time.perf_counter()
+    pages.close()
+    # Queued page ranges are cancelled rather than extracted
+    assert time.perf_counter() - start < 0.5
+
+
+def test_memory_tier_is_bounded_in_bytes(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite"), memory_bytes=100)
+    cache.set("ascii", Extraction("a" * 60, [0], {}))
+    cache.set("greek", Extraction("α" * 60, [0], {}))  # 60 characters, 120 bytes
+    assert cache.stats()["memory_entries"] == 1 and cache.stats()["memory_bytes"] == 60
+    cache.set("more", Extraction("é" * 25, [0], {}))  # 50 bytes: evicts "ascii"
+    assert list(cache._memory) == ["more"] and cache.stats()["memory_bytes"] == 50
+    # Everything is still on disk, and disk hits come back into memory with the same size
+    assert cache.get("greek").text == "α" * 60 and cache.get("ascii").text == "a" * 60
+    assert cache.stats()["memory_bytes"] == 60 and cache.stats()["bytes"] == 230
+
+
+def test_get_or_extract_reads_each_document_once(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite"))
+    data = "Plant cells have walls.\nAnimal cells don't.".encode("utf-8")
+    first = cache.get_or_extract("cells.txt", data)
+    assert cache.get_or_extract("cells.txt", data) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ExtractionCache(cache.path).get_or_extract("other-name.txt", data).text == first.text
@@ -0,0 +1,32 @@
+import json
+
+from mcqgenerator import validation
+from mcqgenerator.mcqgenerator import generate_quiz, get_chains
+
+
+def test_fused_review_is_kept_when_validation_changes_nothing(fresh_cache, quiz_inputs):
+    result = generate_quiz(quiz_inputs, mode="fused")
+    assert result["validation"]["rejected"] == 0
+    assert result["metrics"]["llm_calls"] == 1
+    assert result["review"]
+
+
+def test_quiz_changed_by_validation_is_reviewed_again(fresh_cache, quiz_inputs, monkeypatch, tmp_path):
+    from mcqgenerator.question_bank import QuestionBank
+
+    real_validate = validation.validate_quiz
+
+    def drop_last(inputs, quiz, *args, **kwargs):
+        quiz, stats = real_validate(inputs, quiz, *args, **kwargs)
+        kept = dict(list(json.loads(quiz).items())[:-1])
+        return json.dumps(kept), {**stats, "rejected": 1, "accepted": len(kept)}
+
+    monkeypatch.setattr(validation, "validate_quiz", drop_last)
+    bank = QuestionBank(str(tmp_path / "bank.sqlite"))
+    result = generate_quiz(quiz_inputs, mode="fused", bank=bank)
+
+    assert len(json.loads(result["quiz"])) == 2
+    assert result["metrics"]["llm_calls"] == 2
+    review = get_chains().review_chain.invoke({**quiz_inputs, "quiz": result["quiz"]})
+    assert result["review"] == review
+    assert {mcq["review"] for mcq in bank.query(subject="Biology")} == {review}
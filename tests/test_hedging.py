@@ -0,0 +1,62 @@
+import asyncio
+import json
+import time
+
+from mcqgenerator.fake_llm import fake_quiz
+from mcqgenerator.hedging import Hedge, hedged_generate
+from mcqgenerator.mcqgenerator import get_prompts, load_response_json
+
+
+class StallingChain:
+    """Streams a valid quiz, except that the first call stalls `stall` seconds before its first token"""
+
+    def __init__(self, stall):
+        self.stall = stall
+        self.calls = 0
+        self.finished = []
+
+    async def astream(self, inputs, config=None):
+        index = self.calls
+        self.calls += 1
+        text = json.dumps(fake_quiz(get_prompts()[0].format(**inputs), f"{index:08x}"))
+        try:
+            if index == 0:
+                await asyncio.sleep(self.stall)
+            for start in range(0, len(text), 16):
+                await asyncio.sleep(0.001)
+                yield text[start:start + 16]
+        finally:
+            self.finished.append((index, time.perf_counter()))
+
+
+def test_stalled_candidate_is_cancelled_before_its_first_token(quiz_inputs):
+    chain = StallingChain(stall=5)
+    start = time.perf_counter()
+    quiz, stats = hedged_generate(chain, get_prompts()[0], quiz_inputs, Hedge(n=2, deadline=0.1), load_response_json())
+    returned = time.perf_counter()
+
+    assert returned - start < 2
+    assert len(json.loads(quiz)) == 3
+    assert (stats["candidates"], stats["winner"], stats["cancelled"]) == (2, 1, 1)
+    # The stalled call ended before hedged_generate returned, so its tokens are in the totals
+    assert sorted(index for index, _ in chain.finished) == [0, 1]
+    assert all(finished <= returned for _, finished in chain.finished)
+    assert stats["wasted_tokens"] == stats["prompt_tokens"] // 2
+
+
+def test_runs_inside_an_event_loop(quiz_inputs):
+    async def main():
+        return hedged_generate(StallingChain(stall=0), get_prompts()[0], quiz_inputs, Hedge(n=2),
+                               load_response_json())
+
+    quiz, stats = asyncio.run(main())
+    assert stats["winner"] is not None
+    assert len(json.loads(quiz)) == 3
+
+
+def test_consecutive_races_against_the_rate_limited_client(groq_chain, quiz_inputs):
+    # Both races share the model's async client, and with it its pooled connections
+    for _ in range(2):
+        quiz, stats = hedged_generate(groq_chain, get_prompts()[0], quiz_inputs, Hedge(n=2), load_response_json())
+        assert stats["winner"] is not None
+        assert len(json.loads(quiz)) == 3
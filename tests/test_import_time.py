@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Same modules and budget as benchmarks/bench_import_time.py
+MODULES = ["mcqgenerator.mcqgenerator", "mcqgenerator.utils", "mcqgenerator.logger"]
+BUDGET_MS = 150
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_cold_import_is_within_budget(module, import_time_ms):
+    # Best of three fresh interpreters, like the benchmark, to ride out a noisy machine
+    best = min(import_time_ms(module) for _ in range(3))
+    assert best <= BUDGET_MS, f"importing {module} took {best:.1f} ms (budget {BUDGET_MS} ms)"
+
+
+def test_import_builds_no_client_and_writes_nothing(tmp_path):
+    heavy = ["langchain_groq", "langchain_core", "PyPDF2", "pandas", "reportlab"]
+    code = f"import sys, mcqgenerator.mcqgenerator; print([m for m in {heavy!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": SRC, "GROQ_API_KEY": ""})
+    assert result.stdout.strip() == "[]"
+    assert os.listdir(tmp_path) == []
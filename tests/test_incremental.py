@@ -0,0 +1,90 @@
+import random
+
+from mcqgenerator.incremental import MAX_SECTION_CHARS, MIN_SECTION_CHARS, QuizVersions, Section, fingerprint, plan_update, split_sections
+from mcqgenerator.mcqgenerator import generate_incremental
+
+WORDS = ("cell membrane protein enzyme nucleus ribosome energy glucose oxygen carbon chlorophyll light water "
+         "mitochondria photosynthesis respiration transport diffusion osmosis gradient").split()
+
+
+def prose(seed, words):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def test_sections_are_stripped_paragraphs_with_stable_fingerprints():
+    text = "  First paragraph.\n\n\n  Second   paragraph.  \n \n"
+    sections = split_sections(text)
+    assert [text[s.start:s.end] for s in sections] == ["First paragraph.", "Second   paragraph."]
+    assert sections[1].fingerprint == fingerprint("Second paragraph.")
+    assert split_sections(" \n\n ") == []
+
+
+def test_long_paragraphs_are_cut_where_the_content_says():
+    text = prose(1, 2000)
+    sections = split_sections(text)
+    assert len(sections) > 2
+    # A cut falls after the word that reaches the maximum
+    longest = max(map(len, WORDS)) + 1
+    assert all(MIN_SECTION_CHARS <= section.end - section.start <= MAX_SECTION_CHARS + longest
+               for section in sections)
+    # An edit near the end only moves the cuts next to it
+    edited = text[:-200] + "ENZYME " + text[-200:]
+    before = [section.fingerprint for section in sections]
+    after = [section.fingerprint for section in split_sections(edited)]
+    assert after[:-2] == before[:-2] and after != before
+
+
+def test_plan_keeps_unchanged_sections_and_generates_from_edited_ones():
+    old_text = "\n\n".join(prose(seed, 80) for seed in range(4))
+    old_sections = split_sections(old_text)
+    previous = {"sections": [s.fingerprint for s in old_sections], "review": "ok",
+                "mcqs": [{"mcq": f"Q{i}", "source": old_sections[i % 4].fingerprint} for i in range(8)]}
+    text = "\n\n".join(prose(seed, 80) for seed in (0, 1, 2, 99))
+    sections = split_sections(text)
+    kept, generate_from, count, changed = plan_update(previous, text, sections, 8)
+    assert changed == [3] and 3 in generate_from
+    assert count == 2 and len(kept) == 6
+    assert all(index != 3 for index, _ in kept)
+
+    # Nothing changed: everything is kept and nothing generated
+    kept, generate_from, count, changed = plan_update(previous, old_text, old_sections, 8)
+    assert (len(kept), generate_from, count, changed) == (8, [], 0, [])
+
+
+def test_short_edit_borrows_the_least_covered_unchanged_section():
+    text = "\n\n".join([prose(0, 120), prose(1, 120), "Tiny new note."])
+    sections = split_sections(text)
+    previous = {"sections": [s.fingerprint for s in sections[:2]], "review": "",
+                "mcqs": [{"mcq": "Q", "source": sections[0].fingerprint}] * 4}
+    kept, generate_from, count, changed = plan_update(previous, text, sections, 6)
+    assert changed == [2] and count == 2 and generate_from == [1, 2]
+
+
+def test_versions_round_trip(tmp_path):
+    versions = QuizVersions(str(tmp_path / "versions.sqlite"))
+    assert versions.get("notes.pdf", "Biology", "Easy") is None
+    sections = [Section(0, 5, "aa"), Section(7, 9, "bb")]
+    versions.put("notes.pdf", "Biology", "Easy", sections, [{"mcq": "Q", "source": "aa"}], "fine")
+    versions.set_review("notes.pdf", "BIOLOGY", "easy", "better")
+    assert versions.get("notes.pdf", "biology", "EASY") == {
+        "sections": ["aa", "bb"], "mcqs": [{"mcq": "Q", "source": "aa"}], "review": "better"}
+
+
+def test_revision_regenerates_only_the_edited_section(fresh_cache, quiz_inputs, tmp_path):
+    versions = QuizVersions(str(tmp_path / "versions.sqlite"))
+    paragraphs = [prose(seed, 80) for seed in range(3)]
+    inputs = {**quiz_inputs, "text": "\n\n".join(paragraphs), "number": 6}
+    first = generate_incremental(inputs, "notes.txt", versions=versions)
+    assert first["incremental"]["previous"] is False and len(first["provenance"]) == 6
+
+    same = generate_incremental(inputs, "notes.txt", versions=versions)
+    assert same["quiz"] == first["quiz"] and same["metrics"]["llm_calls"] == 0
+    assert same["incremental"]["review_reused"] and same["review"] == first["review"]
+
+    revised = {**inputs, "text": "\n\n".join(paragraphs[:2] + [prose(42, 80)])}
+    result = generate_incremental(revised, "notes.txt", versions=versions)
+    stats = result["incremental"]
+    assert stats["changed_sections"] == 1 and stats["kept"] + stats["generated"] == 6
+    assert 0 < stats["generated"] < 6 and result["metrics"]["llm_calls"] == 2
+    assert len(result["provenance"]) == 6
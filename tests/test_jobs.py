@@ -0,0 +1,141 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from mcqgenerator.jobs import REVIEW_UNAVAILABLE, JobQueue
+
+INPUTS = {"text": "Cells divide by mitosis.", "number": 2, "subject": "Biology", "tone": "Simple"}
+
+
+class Runner:
+    """Job runner that counts calls and blocks until released"""
+
+    def __init__(self, block=False):
+        self.calls = 0
+        self.release = threading.Event()
+        self.started = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, request, on_token=None):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(10)
+        return {"quiz": "{}", "review": "fine", "metrics": {}}
+
+
+def wait_for(queue, job_id, status, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {status}: {queue.get(job_id)}")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+def test_job_runs_once_and_finishes(path):
+    runner = Runner()
+    queue = JobQueue(path, workers=2, runner=runner)
+    job_id = queue.submit(INPUTS)
+    job = wait_for(queue, job_id, "done")
+    assert job["result"]["review"] == "fine"
+    assert not job["review_pending"]
+    queue._work(job_id)  # a stale resubmission finds the job claimed
+    assert runner.calls == 1
+    queue.close()
+
+
+def test_second_queue_leaves_live_jobs_alone(path):
+    first_runner, second_runner = Runner(block=True), Runner()
+    first = JobQueue(path, runner=first_runner)
+    job_id = first.submit(INPUTS)
+    assert first_runner.started.wait(5)
+
+    # e.g. a second Streamlit session or the CLI starting on the same jobs.sqlite
+    second = JobQueue(path, runner=second_runner)
+    second._start()
+    second._work(job_id)
+    assert second.get(job_id)["status"] == "running"
+
+    first_runner.release.set()
+    wait_for(first, job_id, "done")
+    assert (first_runner.calls, second_runner.calls) == (1, 0)
+    first.close()
+    second.close()
+
+
+def test_abandoned_job_is_requeued_on_restart(path):
+    dead_runner, runner = Runner(block=True), Runner()
+    dead = JobQueue(path, runner=dead_runner)
+    job_id = dead.submit(INPUTS)
+    assert dead_runner.started.wait(5)
+    dead._stop.set()  # stops renewing its lease, like a killed process
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE jobs SET lease = ? WHERE id = ?", (time.time() - 1, job_id))
+
+    restarted = JobQueue(path, runner=runner)
+    restarted._start()
+    job = wait_for(restarted, job_id, "done")
+    assert runner.calls == 1
+
+    # The old worker finishing late doesn't overwrite the new run's result
+    dead_runner.release.set()
+    dead.close()
+    assert restarted.get(job_id)["finished"] == job["finished"]
+    restarted.close()
+
+
+def test_deferred_review_is_filled_in(path):
+    review = Future()
+    queue = JobQueue(path, runner=lambda request, on_token: {"quiz": "{}", "review": None, "review_future": review})
+    job_id = queue.submit(INPUTS, mode="deferred")
+    job = wait_for(queue, job_id, "done")
+    assert job["review_pending"] and job["result"]["review"] is None
+
+    review.set_result("Suits the students.")
+    job = queue.get(job_id)
+    assert not job["review_pending"]
+    assert job["result"]["review"] == "Suits the students."
+    queue.close()
+
+
+def test_lost_deferred_review_is_marked_unavailable(path):
+    queue = JobQueue(path, runner=lambda request, on_token: {"quiz": "{}", "review": None, "review_future": Future()})
+    job_id = queue.submit(INPUTS, mode="deferred")
+    wait_for(queue, job_id, "done")
+    queue.close()
+    # After a restart the review future is gone and the lease runs out
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE jobs SET lease = ? WHERE id = ?", (time.time() - 1, job_id))
+
+    job = JobQueue(path).get(job_id)
+    assert not job["review_pending"]
+    assert job["result"]["review"] == REVIEW_UNAVAILABLE
+
+
+def test_incremental_jobs_use_the_bank(fresh_cache, quiz_inputs, tmp_path, monkeypatch):
+    from mcqgenerator import mcqgenerator
+    from mcqgenerator.jobs import run_generation
+    from mcqgenerator.question_bank import QuestionBank
+
+    bank = QuestionBank(str(tmp_path / "bank.sqlite"))
+    monkeypatch.setattr(mcqgenerator, "get_question_bank", lambda: bank)
+    request = {"inputs": quiz_inputs, "mode": "standard", "bypass_cache": False, "use_bank": True,
+               "document": f"{tmp_path.name}.pdf", "source_hash": "doc", "output": "text"}
+
+    first = run_generation(request)
+    assert first["bank"]["added"] == 3 and bank.count(source_hash="doc") == 3
+
+    revised = {**quiz_inputs, "text": quiz_inputs["text"] + "\n\nStomata let carbon dioxide into the leaf."}
+    second = run_generation({**request, "inputs": revised})
+    assert second["incremental"]["generated"] >= 1
+    assert bank.count(source_hash="doc") == 3 + second["bank"]["added"] and second["bank"]["added"] >= 1
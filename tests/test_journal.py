@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from mcqgenerator import journal, mcqgenerator
+from mcqgenerator.journal import inputs_hash, read_journal, recorded_responses, replay, response_key
+from mcqgenerator.mcqgenerator import generate_quiz, get_chains
+
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch, fresh_cache):
+    """A journal for the test, with the chains rebuilt to record into it (replay's env changes are undone)"""
+    path = str(tmp_path / "journal.jsonl")
+    monkeypatch.setenv("MCQGEN_JOURNAL_PATH", path)
+    monkeypatch.setenv("MCQGEN_BACKEND", "fake")
+    monkeypatch.setenv("MCQGEN_REPLAY_JOURNAL", "")
+    for getter in (journal.get_journal, mcqgenerator.get_callbacks, mcqgenerator._get_chains):
+        getter.cache_clear()
+    yield path
+    for getter in (journal.get_journal, mcqgenerator.get_callbacks, mcqgenerator._get_chains):
+        getter.cache_clear()
+
+
+def test_generate_quiz_writes_one_entry_with_each_stage_output(journal_path, quiz_inputs):
+    result = generate_quiz(quiz_inputs, mode="standard")
+    (entry,) = read_journal(journal_path)
+    assert entry["kind"] == "generate_quiz" and entry["error"] is None
+    assert entry["inputs_hash"] == inputs_hash(quiz_inputs) and entry["params"]["mode"] == "standard"
+    assert entry["run_id"] == result["metrics"]["run_id"]
+    outputs = {call["stage"]: call["output"] for call in entry["llm_calls"]}
+    assert set(outputs) == {"quiz_chain", "review_chain"} and outputs["review_chain"] == result["review"]
+    assert json.loads(outputs["quiz_chain"]) == json.loads(result["quiz"])
+    assert {"quiz_chain", "review_chain"} <= set(entry["stages"])
+
+
+def test_chain_invocations_are_journaled_and_cached_outputs_too(journal_path, quiz_inputs):
+    get_chains().generate_evaluate_chain.invoke(quiz_inputs)
+    get_chains().generate_evaluate_chain.invoke(quiz_inputs)
+    first, second = read_journal(journal_path)
+    assert first["kind"] == second["kind"] == "generate_evaluate_chain"
+    # The second call is served by the response cache but still records the outputs replay needs
+    assert [call["output"] for call in first["llm_calls"]] == [call["output"] for call in second["llm_calls"]]
+    assert len(recorded_responses(journal_path)) == 2
+
+
+def test_failed_request_and_half_written_line(journal_path, quiz_inputs, monkeypatch):
+    def fail(*args):
+        raise Exception("model down")
+
+    monkeypatch.setattr(mcqgenerator, "_generate_quiz", fail)
+    with pytest.raises(Exception, match="model down"):
+        generate_quiz(quiz_inputs)
+    with open(journal_path, "a") as f:
+        f.write('{"kind": "generate_qu')
+    (entry,) = read_journal(journal_path)
+    assert entry["error"] == "model down" and entry["llm_calls"] == []
+
+
+def test_replay_answers_from_the_journal(journal_path, quiz_inputs):
+    recorded = generate_quiz(quiz_inputs, mode="standard")
+    generate_quiz({**quiz_inputs, "subject": "Chemistry"}, mode="fused")
+    stats = replay(journal_path, qps=100, repeat=2, export=True)
+    assert stats["requests"] == 4 and stats["errors"] == 0 and stats["replay_misses"] == 0
+    assert get_chains().llm.model_name == "replay"
+    # Replayed generations return the recorded text, not a fresh model answer
+    (entry, _) = read_journal(journal_path)
+    replayed = journal._replay_one(entry, export=False)
+    assert (replayed["quiz"], replayed["review"]) == (recorded["quiz"], recorded["review"])
+
+
+def test_structured_responses_are_keyed_by_output_mode():
+    assert response_key("abc") == "abc"
+    assert response_key("abc", "json_mode") == "json_mode:abc"
+    assert json.loads(json.dumps({"k": inputs_hash({"b": 1, "a": 2})}))["k"] == inputs_hash({"a": 2, "b": 1})
@@ -0,0 +1,113 @@
+import json
+import socket
+import urllib.request
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from mcqgenerator import metrics
+from mcqgenerator.callbacks import StageCallbackHandler
+from mcqgenerator.mcqgenerator import generate_quiz
+from mcqgenerator.metrics import MetricsRecorder, current_run_id, get_metrics, serve_metrics, timed, track_run
+
+
+def test_events_are_grouped_by_run_and_summarised(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path / "events.jsonl"))
+    with track_run("run-a") as run_id:
+        assert current_run_id() == run_id == "run-a"
+        recorder.record("quiz_chain", 0.5, ttft_s=0.1, prompt_tokens=100, completion_tokens=50)
+        recorder.record("quiz_chain", 1.5, prompt_tokens=10, completion_tokens=150)
+    with track_run():
+        assert current_run_id() not in (None, "run-a")
+        recorder.record("review_chain", 0.2, error="boom")
+    assert current_run_id() is None
+
+    summary = recorder.summary("run-a")
+    assert summary == {"quiz_chain": {"calls": 2, "wall_s": 2.0, "ttft_s": 0.1, "prompt_tokens": 110,
+                                      "completion_tokens": 200, "tokens_per_s": 100.0}}
+    lines = (tmp_path / "events.jsonl").read_text().splitlines()
+    assert [json.loads(line)["stage"] for line in lines] == ["quiz_chain", "quiz_chain", "review_chain"]
+
+
+def test_prometheus_exposition():
+    recorder = MetricsRecorder()
+    recorder.record("quiz_chain", 0.3, ttft_s=0.02, prompt_tokens=7, completion_tokens=3)
+    recorder.record("quiz_chain", 3, error="timeout")
+    recorder.set_gauge("jobs_queued", 4, "Queued jobs.", priority="batch")
+    text = recorder.prometheus()
+    assert 'mcqgen_stage_calls_total{stage="quiz_chain"} 2' in text
+    assert 'mcqgen_stage_errors_total{stage="quiz_chain"} 1' in text
+    assert 'mcqgen_tokens_total{stage="quiz_chain",kind="prompt"} 7' in text
+    assert 'mcqgen_stage_seconds_bucket{stage="quiz_chain",le="0.5"} 1' in text
+    assert 'mcqgen_stage_seconds_bucket{stage="quiz_chain",le="+Inf"} 2' in text
+    assert 'mcqgen_time_to_first_token_seconds_count{stage="quiz_chain"} 1' in text
+    assert 'mcqgen_jobs_queued{priority="batch"} 4' in text
+    assert recorder.gauges("jobs_queued") == {(("priority", "batch"),): 4}
+
+
+def test_timed_records_calls_and_errors(monkeypatch):
+    recorder = MetricsRecorder()
+    monkeypatch.setattr(metrics, "get_metrics", lambda: recorder)
+
+    @timed("read_file")
+    def read(fail=False):
+        if fail:
+            raise ValueError("unreadable")
+        return "text"
+
+    assert read() == "text"
+    with pytest.raises(ValueError):
+        read(fail=True)
+    assert [(event["stage"], event["error"]) for event in recorder.events()] == [
+        ("read_file", None), ("read_file", "unreadable")]
+
+
+def test_callback_reports_outermost_stage_with_first_token_and_tokens():
+    recorder = MetricsRecorder()
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="alpha beta gamma")]))
+    inner = (PromptTemplate.from_template("{topic}") | llm | StrOutputParser()).with_config(run_name="quiz_chain")
+    chain = (inner | RunnableLambda(str.upper)).with_config(run_name="fused_chain")
+    with track_run("run-b"):
+        chunks = list(chain.stream({"topic": "cells"}, {"callbacks": [StageCallbackHandler(recorder)]}))
+    assert "".join(chunks) == "ALPHA BETA GAMMA"
+    # The nested quiz_chain belongs to the fused_chain stage and is not reported separately
+    (event,) = recorder.events("run-b")
+    assert event["stage"] == "fused_chain" and event["error"] is None
+    assert event["ttft_s"] is not None and event["ttft_s"] <= event["wall_s"]
+    assert event["completion_tokens"] == 5  # streamed chunks, as the fake model sends no usage
+
+
+def test_callback_records_failed_stage():
+    recorder = MetricsRecorder()
+
+    def fail(_):
+        raise RuntimeError("model down")
+
+    chain = RunnableLambda(fail).with_config(run_name="review_chain")
+    with pytest.raises(RuntimeError):
+        chain.invoke({}, {"callbacks": [StageCallbackHandler(recorder)]})
+    assert [(event["stage"], event["error"]) for event in recorder.events()] == [("review_chain", "model down")]
+
+
+def test_generation_stages_share_the_run(fresh_cache, quiz_inputs):
+    with track_run() as run_id:
+        generate_quiz(quiz_inputs, mode="standard")
+    assert {"quiz_chain", "review_chain"} <= set(get_metrics().summary(run_id))
+
+
+def test_metrics_endpoint():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = serve_metrics(port)
+    try:
+        get_metrics().record("endpoint_check", 0.01)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert 'mcqgen_stage_calls_total{stage="endpoint_check"}' in response.read().decode()
+    finally:
+        server.shutdown()
+        serve_metrics.cache_clear()
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from mcqgenerator import pdf_export
+from mcqgenerator.pdf_export import create_pdf, quiz_rows
+from mcqgenerator.quiz_table import quiz_table
+
+QUIZ = {
+    "1": {"no": "1", "mcq": "What do chloroplasts capture?", "options": {"a": "Light", "b": "Sound"}, "correct": "a"},
+    "2": {"no": "2", "mcq": "Which cycle fixes CO2?", "options": {"a": "Krebs", "b": "Calvin"}, "correct": "b"},
+}
+WHEN = datetime(2026, 1, 2, 3, 4)
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    monkeypatch.setattr(pdf_export, "_memo", type(pdf_export._memo)())
+    calls = []
+    render = pdf_export.render_quiz_pdf
+    monkeypatch.setattr(pdf_export, "render_quiz_pdf", lambda *args: calls.append(args) or render(*args))
+    return calls
+
+
+def quiz_df():
+    df = quiz_table(QUIZ).to_dataframe()
+    df.index = df.index + 1
+    return df
+
+
+def test_reruns_reuse_the_rendered_pdf(renders):
+    first = create_pdf(quiz_df(), "Good", "Biology", 2, "Easy", WHEN).getvalue()
+    assert first.startswith(b"%PDF")
+    assert create_pdf(quiz_df(), "Good", "Biology", 2, "Easy", WHEN).getvalue() == first
+    assert len(renders) == 1
+    # A new review is a new document
+    create_pdf(quiz_df(), "Better", "Biology", 2, "Easy", WHEN)
+    assert len(renders) == 2
+
+
+def test_quiz_key_hits_skip_building_rows(renders, monkeypatch):
+    df = quiz_df()
+    create_pdf(df, "Good", "Biology", 2, "Easy", WHEN, quiz_key="job-1")
+    built = []
+    monkeypatch.setattr(pdf_export, "quiz_rows", lambda df: built.append(df) or quiz_rows(df))
+    create_pdf(df, "Good", "Biology", 2, "Easy", WHEN, quiz_key="job-1")
+    assert len(renders) == 1 and built == []
+    create_pdf(df, "Good", "Biology", 2, "Easy", WHEN, quiz_key="job-2")
+    assert len(renders) == 2 and len(built) == 1
+
+
+def test_rows_from_either_dataframe_layout():
+    rows = quiz_rows(quiz_df())
+    assert rows[0] == (1, "What do chloroplasts capture?", (("a", "Light"), ("b", "Sound")), "a")
+    choices = pd.DataFrame({"MCQ": ["Q"], "Choices": ["a -> x || b -> y"], "Correct": ["a"]})
+    assert quiz_rows(choices) == [(0, "Q", "a -> x || b -> y", "a")]
+
+
+def test_memo_is_bounded(renders, monkeypatch):
+    monkeypatch.setattr(pdf_export, "MEMO_SIZE", 2)
+    for key in range(3):
+        create_pdf(quiz_df(), "", "Biology", 2, "Easy", WHEN, quiz_key=key)
+    assert len(pdf_export._memo) == 2
+    create_pdf(quiz_df(), "", "Biology", 2, "Easy", WHEN, quiz_key=0)
+    assert len(renders) == 4
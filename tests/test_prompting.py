@@ -0,0 +1,52 @@
+import pytest
+
+from mcqgenerator.mcqgenerator import load_response_json
+from mcqgenerator.prompting import build_quiz_inputs, count_tokens, select_paragraphs, strip_boilerplate
+
+BODY = "F = m a\nAnswer\n42\n"
+
+
+def pdf_text(pages):
+    """Text and page offsets of pages with a running header and a page number footer"""
+    texts = [f"Physics 101 - Lecture notes\nExample {chr(64 + number)}: Newton's second law\n{BODY}"
+             f"A net force of {number} N accelerates the cart [3].\n{number}\n" for number in range(1, pages + 1)]
+    offsets = [sum(len(text) for text in texts[:index]) for index in range(pages)]
+    return "".join(texts), offsets
+
+
+def test_page_edges_are_stripped_and_bodies_kept():
+    text, offsets = pdf_text(6)
+    stripped = strip_boilerplate(text, offsets)
+    assert "Lecture notes" not in stripped
+    # Repeated formulas, headings and number-only answers inside pages are content
+    assert stripped.count("F = m a") == 6
+    assert stripped.count("\n42\n") == 6
+    assert stripped.splitlines()[:4] == ["Example A: Newton's second law", "F = m a", "Answer", "42"]
+    assert "[3]" not in stripped
+    assert not any(line.strip() in {"1", "2", "5", "6"} for line in stripped.splitlines())
+
+
+def test_without_page_offsets_only_reference_markers_go():
+    text, _ = pdf_text(6)
+    stripped = strip_boilerplate(text)
+    assert stripped.count("Physics 101 - Lecture notes") == 6
+    assert "[3]" not in stripped and stripped.endswith("\n6")
+
+
+def test_select_paragraphs_keeps_dense_ones_in_order():
+    filler = "It is what it is and it was what it was and that is that."
+    paragraphs = ["Mitochondria produce ATP through oxidative phosphorylation.", filler,
+                  "Ribosomes translate messenger RNA into polypeptide chains."]
+    text = "\n\n".join(paragraphs)
+    budget = count_tokens(paragraphs[0]) + count_tokens(paragraphs[2])
+    assert select_paragraphs(text, budget) == f"{paragraphs[0]}\n\n{paragraphs[2]}"
+
+
+def test_context_budget():
+    response_json = load_response_json()
+    with pytest.raises(Exception, match="context budget"):
+        build_quiz_inputs("Cells divide.", 50, "Biology", "Simple", response_json, context_tokens=2000)
+    text = "\n\n".join(f"Paragraph {i} about enzymes, substrates and activation energy." for i in range(200))
+    fitted = build_quiz_inputs(text, 3, "Biology", "Simple", response_json, context_tokens=1000, fit_context=True)
+    assert count_tokens(fitted["text"]) < 1000 < count_tokens(text)
+    assert build_quiz_inputs(text, 3, "Biology", "Simple", response_json, context_tokens=1000)["text"] == text
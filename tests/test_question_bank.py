@@ -0,0 +1,62 @@
+import io
+import sqlite3
+import threading
+import time
+
+from mcqgenerator.mcqgenerator import generate_quiz
+from mcqgenerator.question_bank import QuestionBank, document_hash
+
+
+def mcq(text, correct="a"):
+    return {"mcq": text, "options": {"a": "yes", "b": "no"}, "correct": correct}
+
+
+def filled_bank(path):
+    bank = QuestionBank(str(path))
+    bank.add_mcqs([mcq("Do plants photosynthesize?"), mcq("Do rocks photosynthesize?", "b")], "Biology", "Simple",
+                  "doc1", "Fine.")
+    bank.add_mcqs([mcq("Is mitosis cell division?")], "Biology", "Hard", "doc2")
+    bank.add_mcqs([mcq("Is iron a metal?")], "Chemistry", "Simple", "doc3")
+    return bank
+
+
+def test_query_filters_search_and_limit(tmp_path):
+    bank = filled_bank(tmp_path / "bank.sqlite")
+    assert [row["mcq"] for row in bank.query(subject="biology", tone="simple")] == [
+        "Do plants photosynthesize?", "Do rocks photosynthesize?"]
+    assert [row["mcq"] for row in bank.query(search="photosynthesize", limit=1)] == ["Do plants photosynthesize?"]
+    assert bank.count(subject="Biology") == 3 and bank.count(source_hash="doc3") == 1
+    assert list(bank.iter_query(batch_size=1)) == bank.query()
+    # The same question from the same source is stored once
+    assert bank.add_mcqs([mcq("Do plants photosynthesize?")], "Biology", "Simple", "doc1") == 0
+
+
+def test_export_and_import_round_trip(tmp_path):
+    bank = filled_bank(tmp_path / "bank.sqlite")
+    out = io.StringIO()
+    assert bank.export_jsonl(out, subject="Biology") == 3
+    copy = QuestionBank(str(tmp_path / "copy.sqlite"))
+    assert copy.import_jsonl(out.getvalue().splitlines()) == 3
+    assert copy.query() == bank.query(subject="Biology")
+    assert copy.import_jsonl(out.getvalue().splitlines()) == 0
+
+
+def test_writes_wait_for_another_writer(tmp_path):
+    bank = filled_bank(tmp_path / "bank.sqlite")
+    other = sqlite3.connect(str(tmp_path / "bank.sqlite"), check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.3, other.commit).start()
+    # e.g. the CLI writing while a job worker stores its quiz
+    assert bank.add_mcqs([mcq("Is water wet?")], "Physics", "Simple", "doc4") == 1
+    other.close()
+
+
+def test_deferred_review_is_stored_in_the_bank(fresh_cache, quiz_inputs, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite"))
+    result = generate_quiz(quiz_inputs, mode="deferred", bank=bank)
+    assert result["bank"]["added"] == 3
+    review = result["review_future"].result(10)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and {row["review"] for row in bank.query()} != {review}:
+        time.sleep(0.01)
+    assert {row["review"] for row in bank.query(source_hash=document_hash(quiz_inputs["text"]))} == {review}
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mcqgenerator.rate_limit import BATCH, INTERACTIVE, RateLimiter
+
+
+def test_async_waits_do_not_hold_executor_threads():
+    # One request per second: 40 waiters would fill the default executor if each waited in a thread
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=10 ** 9)
+    limiter.requests.level = 0
+
+    async def main():
+        waiters = [asyncio.create_task(limiter.acquire_async(1)) for _ in range(40)]
+        await asyncio.sleep(0.05)
+        threads = threading.active_count()
+        start = time.monotonic()
+        await asyncio.wait_for(asyncio.to_thread(time.sleep, 0), 1)
+        unrelated = time.monotonic() - start
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return threads, unrelated
+
+    threads, unrelated = asyncio.run(main())
+    assert threads < 10
+    assert unrelated < 0.5
+    assert limiter._queue == [] and limiter._async_waiters == {}
+
+
+def test_cancelled_wait_takes_nothing():
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=10 ** 9)
+    limiter.acquire(10)  # empties the requests bucket
+
+    async def main():
+        waiter = asyncio.create_task(limiter.acquire_async(10))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert limiter._queue == []
+    # The cancelled request never took its unit: the bucket is just refilling from empty
+    assert limiter.requests.wait_time(1, time.monotonic()) > 55
+
+
+def test_sync_and_async_waiters_share_the_priority_queue():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10 ** 9)  # one request per 0.1 s
+    limiter.requests.level = 0
+    order = []
+
+    def batch_request():
+        limiter.acquire(1, BATCH)
+        order.append("batch")
+
+    async def main():
+        thread = threading.Thread(target=batch_request)
+        thread.start()
+        await asyncio.sleep(0.02)
+        await limiter.acquire_async(1, INTERACTIVE)
+        order.append("interactive")
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch"]
+
+
+def test_async_client_survives_consecutive_event_loops(groq_chain):
+    from mcqgenerator.batch import generate_quizzes
+    from mcqgenerator.utils import parse_quiz_json
+
+    jobs = [(f"Cells divide by mitosis, part {i}.", 2, "Biology", "Simple") for i in range(3)]
+    # Each call runs its own event loop; the second used to hit the first loop's pooled connections
+    for _ in range(2):
+        responses = generate_quizzes(jobs, chain=groq_chain)
+        assert [len(parse_quiz_json(response)) for response in responses] == [2, 2, 2]
@@ -0,0 +1,50 @@
+import json
+
+from mcqgenerator.mcqgenerator import stream_quiz
+from mcqgenerator.utils import MCQStreamParser, iter_mcqs
+
+QUIZ = {
+    "1": {"no": "1", "mcq": 'Which "organelle" holds {DNA}?', "options": {"a": "Nucleus", "b": "Ribosome"},
+          "correct": "a"},
+    "2": {"no": "2", "mcq": "What does a back\\slash} do?", "options": {"a": "Escape", "b": "Nothing"},
+          "correct": "a"},
+}
+
+
+def test_each_mcq_is_yielded_once_when_its_brace_arrives():
+    text = "Here is the quiz:\n```json\n" + json.dumps(QUIZ, indent=2) + "\n```"
+    parser = MCQStreamParser()
+    seen = []
+    for i, ch in enumerate(text):
+        for key, mcq in parser.feed(ch):
+            seen.append((key, mcq))
+            # Yielded on the MCQ's own closing brace, before the next one starts
+            assert ch == "}"
+            assert '"2"' not in text[:i + 1] if key == "1" else text[i + 1:].strip() == "}\n```"
+    assert seen == list(QUIZ.items())
+    assert parser.text == text
+
+
+def test_chunk_boundaries_do_not_matter():
+    text = json.dumps(QUIZ)
+    for size in (1, 3, 7, len(text)):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(iter_mcqs(chunks)) == list(QUIZ.items())
+
+
+def test_truncated_mcq_is_not_yielded():
+    text = json.dumps(QUIZ)
+    assert list(iter_mcqs([text[:text.index('"2"') + 30]])) == [("1", QUIZ["1"])]
+
+
+def test_list_items_at_depth_three():
+    parser = MCQStreamParser(item_depth=3)
+    text = json.dumps({"mcqs": list(QUIZ.values())})
+    assert [mcq for _, mcq in parser.feed(text[:len(text) // 2]) + parser.feed(text[len(text) // 2:])] == \
+        list(QUIZ.values())
+
+
+def test_streamed_quiz_is_parsed_as_it_arrives(fresh_cache, quiz_inputs):
+    mcqs = list(iter_mcqs(stream_quiz(quiz_inputs)))
+    assert [key for key, _ in mcqs] == ["1", "2", "3"]
+    assert all(mcq["mcq"] and mcq["options"] for _, mcq in mcqs)
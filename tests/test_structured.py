@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from mcqgenerator.mcqgenerator import chunk_inputs_for, generate_quiz, generate_structured_quiz, structured_quiz
+
+
+@pytest.mark.parametrize("output", ["json_mode", "function_calling"])
+def test_cache_hit_counts_accepted_mcqs(fresh_cache, quiz_inputs, output):
+    first = generate_quiz(quiz_inputs, mode="skip", output=output)
+    second = generate_quiz(quiz_inputs, mode="skip", output=output)
+
+    assert first["structured"]["accepted"] == 3
+    assert second["structured"]["attempts"] == 0
+    assert second["structured"]["accepted"] == 3
+    assert second["quiz"] == first["quiz"]
+
+
+def test_chunk_stats_sum_cached_and_fresh_chunks(fresh_cache, quiz_inputs):
+    inputs = {**quiz_inputs, "number": 4, "text": "\n\n".join(
+        f"Section {i}. {quiz_inputs['text']} Stomata {i} regulate transpiration and gas exchange." for i in range(40))}
+    chunks = chunk_inputs_for(inputs, max_tokens=400)
+    assert len(chunks) > 1
+    structured_quiz(chunks[0], "json_mode")  # only the first chunk is cached
+
+    quiz, stats = generate_structured_quiz(inputs, "json_mode", max_tokens=400)
+    assert stats["accepted"] == len(json.loads(quiz)) == 4
+    assert stats["attempts"] == len(chunks) - 1
+
+
+def test_generate_structured_quiz_single_chunk(fresh_cache, quiz_inputs):
+    quiz, stats = generate_structured_quiz(quiz_inputs, "function_calling")
+    assert len(json.loads(quiz)) == stats["accepted"] == 3
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from mcqgenerator.mcqgenerator import split_fused_response
+from mcqgenerator.utils import get_table_data, parse_quiz_json, scan_json_object
+
+MCQ = {"no": "1", "mcq": "Q1", "options": {"a": "x", "b": "y"}, "correct": "a"}
+
+
+def quiz_text(count):
+    return json.dumps({str(i): {**MCQ, "no": str(i), "mcq": f"Q{i}"} for i in range(1, count + 1)})
+
+
+def test_complete_object_is_returned_as_is():
+    text = f"Here you go:\n```json\n{quiz_text(2)}\n```\nDone."
+    scan = scan_json_object(text)
+    assert scan.json == quiz_text(2)
+    assert scan.repairs == []
+
+
+@pytest.mark.parametrize("cut", ['"options": {', '"options": {"a": "x"', '"mcq": "Q', '"no"', ""])
+def test_truncated_only_mcq_is_dropped(cut):
+    text = '{"1": {"no": "1", ' + cut
+    scan = scan_json_object(text)
+    assert json.loads(scan.json) == {}
+    assert "dropped an incomplete trailing item" in scan.repairs
+
+
+def test_truncated_last_mcq_is_dropped():
+    complete = quiz_text(2)
+    text = complete[:-1] + ', "3": {"no": "3", "mcq": "Q3", "options": {"a": "x"'
+    assert json.loads(scan_json_object(text).json) == json.loads(complete)
+
+
+def test_truncated_between_mcqs_keeps_all():
+    complete = quiz_text(2)
+    for tail in (", ", ', "3', ', "3": '):
+        assert json.loads(scan_json_object(complete[:-1] + tail).json) == json.loads(complete)
+
+
+def test_truncated_first_mcq_gives_no_table_rows():
+    assert get_table_data('{"1": {"no":"1","mcq":"Q1","options":{') == []
+    rows = get_table_data(quiz_text(1)[:-1] + ', "2": {"no": "2", "mcq": "Q2", "options": {')
+    assert [row["MCQ"] for row in rows] == ["Q1"]
+
+
+def test_fused_response_keeps_complete_mcqs_of_a_truncated_quiz():
+    response = '{"quiz": ' + quiz_text(2)[:-1] + ', "3": {"no": "3", "mcq": "Q3"'
+    quiz, review = split_fused_response(response)
+    assert list(json.loads(quiz)) == ["1", "2"]
+    assert review == ""
+
+
+def test_list_items_at_depth_three():
+    text = '{"mcqs": [' + json.dumps(MCQ) + ', {"no": "2", "mcq": "Q2"'
+    assert parse_quiz_json(text, item_depth=3) == {"mcqs": [MCQ]}
+
+
+def test_no_object():
+    assert scan_json_object("no json here") == (None, [])
+
+
+def test_complete_object_before_a_fence_wins():
+    text = json.dumps({"mcqs": [MCQ]}) + '\n```json\n{"example": true}\n```'
+    assert scan_json_object(text) == (json.dumps({"mcqs": [MCQ]}), [])
+
+
+def test_fenced_object_after_brace_prose():
+    text = 'Here are {n} questions:\n```json\n' + json.dumps({"mcqs": [MCQ]}) + "\n```"
+    assert scan_json_object(text) == (json.dumps({"mcqs": [MCQ]}), [])
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from mcqgenerator import validation
+from mcqgenerator.mcqgenerator import get_chains, load_response_json
+from mcqgenerator.validation import BANDS, NUM_PERMUTATIONS, filter_quiz, near_duplicates, validate_quiz
+
+MCQ = {"mcq": "Which pigment in chloroplasts absorbs mostly blue and red light?",
+       "options": {"a": "Chlorophyll", "b": "Keratin", "c": "Melanin", "d": "Hemoglobin"}, "correct": "a"}
+
+
+def flawed_quiz():
+    """One good MCQ, a near-duplicate of it and one without an answer"""
+    duplicate = {**MCQ, "mcq": "which pigment in chloroplasts absorbs mostly blue and red light"}
+    unanswered = {key: value for key, value in MCQ.items() if key != "correct"}
+    unanswered["mcq"] = "What does the Calvin cycle fix into sugars?"
+    return json.dumps({str(i): {"no": str(i), **mcq} for i, mcq in enumerate([MCQ, duplicate, unanswered], 1)})
+
+
+def test_rejects_duplicates_and_schema_failures():
+    report = filter_quiz(json.loads(flawed_quiz()), load_response_json())
+    assert [mcq["mcq"] for mcq in report.accepted] == [MCQ["mcq"]]
+    assert sorted(reason for _, reason in report.rejected) == ["missing correct", "near-duplicate question"]
+    assert near_duplicates(["Cells divide by mitosis.", "Light drives photosynthesis in leaves."]) == set()
+
+
+def test_without_a_chain_rejected_mcqs_are_dropped(quiz_inputs):
+    quiz, stats = validate_quiz(quiz_inputs, flawed_quiz(), load_response_json())
+    assert list(json.loads(quiz).values()) == [{**MCQ, "no": "1"}]
+    assert stats == {"rejected": 2, "regenerated": 0, "rounds": 0, "accepted": 1}
+
+
+def test_only_rejected_mcqs_are_regenerated(fresh_cache, quiz_inputs):
+    quiz, stats = validate_quiz(quiz_inputs, flawed_quiz(), load_response_json(), get_chains().quiz_chain)
+    items = list(json.loads(quiz).values())
+    assert stats == {"rejected": 2, "regenerated": 2, "rounds": 1, "accepted": 3}
+    assert [item["no"] for item in items] == ["1", "2", "3"]
+    assert items[0]["mcq"] == MCQ["mcq"]
+    # The replacements pass the same checks as the kept MCQ
+    assert len(filter_quiz(json.loads(quiz), load_response_json()).accepted) == 3
+
+
+def test_duplicates_found_behind_an_unrelated_band_collision(monkeypatch):
+    rows = NUM_PERMUTATIONS // BANDS
+    unrelated = np.arange(NUM_PERMUTATIONS, dtype=np.uint64) + 1000
+    first = np.arange(NUM_PERMUTATIONS, dtype=np.uint64)
+    # The pair agrees on the whole first band and 3 of 4 rows of every other band (49/64)
+    second = first.copy()
+    second[rows::rows] += 5000
+    unrelated[:rows] = first[:rows]  # ...and the unrelated text collides with both in that one band
+    monkeypatch.setattr(validation, "minhash_signatures", lambda texts: np.array([unrelated, first, second]))
+    assert near_duplicates(["unrelated", "first", "second"]) == {2}